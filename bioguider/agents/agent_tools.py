@@ -5,7 +5,7 @@ from markdownify import markdownify as md
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from bioguider.database.summarized_file_db import SummarizedFilesDb
 from bioguider.utils.file_utils import get_file_type
-from bioguider.agents.agent_utils import read_directory, read_file, summarize_file
+from bioguider.agents.agent_utils import get_model_id, read_directory, read_file, summarize_file
 from bioguider.rag.data_pipeline import count_tokens
 
 logger = logging.getLogger(__name__)
@@ -81,7 +81,7 @@ Returns:
         self.summary_file_db = db
         self.summarize_instruction = summaize_instruction
 
-    def _retrive_from_summary_file_db(self, file_path: str, prompt: str = "N/A") -> str | None:
+    def _retrive_from_summary_file_db(self, file_path: str, source_path: str, prompt: str = "N/A") -> str | None:
         if self.summary_file_db is None:
             return None
         return self.summary_file_db.select_summarized_text(
@@ -89,8 +89,12 @@ Returns:
             instruction=self.summarize_instruction,
             summarize_level=self.detailed_level,
             summarize_prompt=prompt,
+            source_path=source_path,
+            model_id=get_model_id(self.llm),
         )
-    def _save_to_summary_file_db(self, file_path: str, prompt: str, summarized_text: str, token_usage: dict):
+    def _save_to_summary_file_db(
+        self, file_path: str, source_path: str, prompt: str, summarized_text: str, token_usage: dict
+    ):
         if self.summary_file_db is None:
             return
         self.summary_file_db.upsert_summarized_file(
@@ -100,6 +104,8 @@ Returns:
             summarize_prompt=prompt,
             summarized_text=summarized_text,
             token_usage=token_usage,
+            source_path=source_path,
+            model_id=get_model_id(self.llm),
         )
     def run(self, file_path: str, summarize_prompt: str = "N/A") -> str | None:
         if file_path is None:
@@ -115,6 +121,7 @@ Returns:
             return f"{file_path} is not a file."
         summarized_content = self._retrive_from_summary_file_db(
             file_path=file_path,
+            source_path=abs_file_path,
             prompt=summarize_prompt,
         )
         if summarized_content is not None:
@@ -136,6 +143,7 @@ Returns:
         )
         self._save_to_summary_file_db(
             file_path=file_path,
+            source_path=abs_file_path,
             prompt=summarize_prompt,
             summarized_text=summarized_content,
             token_usage=token_usage,
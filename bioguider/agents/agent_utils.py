@@ -272,6 +272,10 @@ Now, let's start to summarize.
 """)
 
 
+def get_model_id(llm: BaseChatOpenAI) -> str:
+    """The model a summary cached in SummarizedFilesDb is keyed by."""
+    return getattr(llm, "model_name", None) or getattr(llm, "deployment_name", None) or ""
+
 def summarize_file(
     llm: BaseChatOpenAI, 
     name: str | Path, 
@@ -289,15 +293,18 @@ def summarize_file(
         except Exception as e:
             logger.error(e)
             return ""
+    level = level if level > 0 else 1
+    level = level if level < MAX_SENTENCE_NUM+1 else MAX_SENTENCE_NUM
     # First, query from database
     if db is not None:
-        res = db.select_summarized_text(name, summary_instructions, level)
+        res = db.select_summarized_text(
+            name, summary_instructions, level, summarize_prompt,
+            content=content, model_id=get_model_id(llm),
+        )
         if res is not None:
             return res, {**DEFAULT_TOKEN_USAGE}
 
     file_content = content
-    level = level if level > 0 else 1
-    level = level if level < MAX_SENTENCE_NUM+1 else MAX_SENTENCE_NUM
     if len(file_content) > MAX_FILE_LENGTH:
         file_content = content[:MAX_FILE_LENGTH] + " ..."
     prompt = EVALUATION_SUMMARIZE_FILE_PROMPT.format(
@@ -327,6 +334,8 @@ def summarize_file(
             summarize_prompt=summarize_prompt,
             summarized_text=out,
             token_usage=token_usage,
+            content=content,
+            model_id=get_model_id(llm),
         )
     
     return out, token_usage
@@ -15,6 +15,7 @@ class ConsistencyQueryStep(CommonStep):
     def _execute_directly(self, state: ConsistencyEvaluationState):
         functions_and_classes = state["functions_and_classes"]
         all_rows: list[any] = []
+        specs: list[tuple] = []
         for function_or_class in functions_and_classes:
             function_or_class_name = function_or_class["name"] if "name" in function_or_class else "N/A"
             function_or_class_file_path = function_or_class["file_path"] if "file_path" in function_or_class else "N/A"
@@ -35,36 +36,11 @@ class ConsistencyQueryStep(CommonStep):
                 parent = function_or_class["parent"]
             if "name" in function_or_class and function_or_class["name"] != "N/A":
                 name = function_or_class["name"]
-            
-            rows: list[any] | None = None
-            if name is None:
-                if file_path is not None:
-                    rows = self.code_structure_db.select_by_path(file_path)
-                elif parent is not None:
-                    rows = self.code_structure_db.select_by_parent(parent)
-            else:
-                if file_path is not None and parent is not None:
-                    rows = self.code_structure_db.select_by_name_and_parent_and_path(name, parent, file_path)
-                    rows = rows if rows is None else [rows]
-                    if rows is None or len(rows) == 0:
-                        rows = self.code_structure_db.select_by_name_and_path(name, file_path)
-                        rows = rows if rows is None else [rows]
-                    if rows is None or len(rows) == 0:
-                        rows = self.code_structure_db.select_by_name_and_parent(name, parent)
-                    if rows is None or len(rows) == 0:
-                        rows = self.code_structure_db.select_by_name(name)
-                elif file_path is not None:
-                    rows = self.code_structure_db.select_by_name_and_path(name, file_path)
-                    rows = rows if rows is None else [rows]
-                    if rows is None or len(rows) == 0:
-                        rows = self.code_structure_db.select_by_name(name)
-                elif parent is not None:
-                    rows = self.code_structure_db.select_by_name_and_parent(name, parent)
-                    if rows is None or len(rows) == 0:
-                        rows = self.code_structure_db.select_by_name(name)
-                else:
-                    rows = self.code_structure_db.select_by_name(name)
-            if rows is None or len(rows) == 0:
+            specs.append((name, parent, file_path))
+
+        # all functions and classes in one query
+        for (name, _, _), rows in zip(specs, self.code_structure_db.lookup_many(specs)):
+            if len(rows) == 0:
                 self._print_step(state, step_output=f"No such function or class {name}")
                 continue
             all_rows.extend(rows)
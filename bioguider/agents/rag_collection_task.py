@@ -1,11 +1,15 @@
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from adalflow import Document
+from adalflow.core.types import RetrieverOutput
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 from .common_agent_2step import CommonAgentTwoSteps
 from ..rag.rag import RAG
+from ..rag.config import configs, get_collection_score_thresholds, get_retrieval_mode
+from ..rag.index_registry import get_index_registry
 
 RAG_COLLECT_SYSTEM_PROMPT = ChatPromptTemplate.from_template("""
 You are an expert in repository documents retrieval and collection.
@@ -47,31 +51,83 @@ RAGCollectResultSchema = {
 }
 
 class RAGCollectionTaskItem:
-    def __init__(self, llm, rag: RAG, step_callback, batch_size: int = 5):
+    def __init__(
+        self,
+        llm,
+        rag: RAG,
+        step_callback,
+        batch_size: int = 5,
+        max_concurrency: int | None = None,
+        accept_score: float | None = None,
+        reject_score: float | None = None,
+    ):
         """
         Initialize the RAGCollectionTaskItem with a repository URL or local path.
 
+        Retrieval scores are on the scale of the retrieval mode of the RAG instance:
+        probabilities in [0, 1] in vector mode, reciprocal rank fusion scores of
+        about 0.03 at most in hybrid mode, unbounded BM25 scores in lexical mode.
+        Thresholds default to configs["rag_collection"]["score_thresholds"] of that mode.
+
         Args:
             rag: An instance of the RAG class
+            max_concurrency: Batches of documents judged by the LLM at the same time,
+                configs["rag_collection"]["max_concurrency"] by default
+            accept_score: Documents retrieved with at least this score are relevant, without LLM call
+            reject_score: Documents retrieved with a lower score are not relevant, without LLM call
         """
         self.llm = llm
         self.rag = rag
         self.batch_size = batch_size
+        if max_concurrency is None:
+            max_concurrency = configs["rag_collection"]["max_concurrency"]
+        self.max_concurrency = max(1, max_concurrency)
+        if accept_score is None and reject_score is None:
+            retrieval_mode = getattr(rag, "retrieval_mode", None) or get_retrieval_mode()
+            accept_score, reject_score = get_collection_score_thresholds(retrieval_mode)
+        self.accept_score = accept_score
+        self.reject_score = reject_score
         self.step_callback = step_callback
 
-    def collect(self, query: str, rag_documents: list[Document]) -> list[Document]:
-        relevant_documents = []
-        for i in range(0, len(rag_documents), self.batch_size):
-            contents = [' - ' + doc.text for doc in rag_documents[i:i + self.batch_size]]
-            documents_text = "\n".join(contents)
-            prompt = RAG_COLLECT_SYSTEM_PROMPT.format(query=query, documents=documents_text)
-            prompt = prompt.replace("{", "{{").replace("}", "}}")  # Escape curly braces for LangChain
-            agent = CommonAgentTwoSteps(llm=self.llm)
-            res, _, token_usage, reasoning = agent.go(
-                system_prompt=prompt,
-                instruction_prompt="Please analyze the documents and determine their relevance to the query.",
-                schema=RAGCollectResultSchema,
-            )
+    def collect_retrieved(self, query: str, retrieved: RetrieverOutput) -> list[Document]:
+        """Collect the relevant documents of a retrieval result, pre-pruned with its scores."""
+        return self.collect(query, retrieved.documents or [], retrieved.doc_scores)
+
+    def collect(
+        self,
+        query: str,
+        rag_documents: list[Document],
+        scores: list[float] | None = None,
+    ) -> list[Document]:
+        """
+        Collect the documents relevant to the query, in retrieval order.
+
+        Documents whose retrieval score passes accept_score or fails reject_score
+        are decided without the LLM. The others are judged by the LLM in batches
+        of batch_size, up to max_concurrency batches at a time.
+        """
+        relevance: list[bool | None] = [None] * len(rag_documents)
+        if scores is not None and len(scores) == len(rag_documents):
+            for ix, score in enumerate(scores):
+                if self.accept_score is not None and score >= self.accept_score:
+                    relevance[ix] = True
+                elif self.reject_score is not None and score < self.reject_score:
+                    relevance[ix] = False
+        undecided = [ix for ix, relevant in enumerate(relevance) if relevant is None]
+        batches = [undecided[i:i + self.batch_size] for i in range(0, len(undecided), self.batch_size)]
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            results = [self._judge_batch(query, [rag_documents[ix] for ix in batch]) for batch in batches]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_concurrency, len(batches)),
+                thread_name_prefix="rag_collection",
+            ) as executor:
+                results = list(executor.map(
+                    lambda batch: self._judge_batch(query, [rag_documents[ix] for ix in batch]),
+                    batches,
+                ))
+        # report in batch order, from the calling thread
+        for batch, (res, token_usage, reasoning) in zip(batches, results):
             self.step_callback(
                 step_output=f"**Reasoning Process**: {reasoning}\n",
             )
@@ -81,13 +137,22 @@ class RAGCollectionTaskItem:
             self.step_callback(
                 token_usage=token_usage,
             )
-            res = RAGCollectResult(**res)
-            relevants = self._collect_documents(
-                rag_documents[i:i + self.batch_size],
-                res.relevance
-            )
-            relevant_documents.extend(relevants)
-        return relevant_documents
+            for ix, relevant in zip(batch, res.relevance):
+                relevance[ix] = relevant
+        return self._collect_documents(rag_documents, [bool(relevant) for relevant in relevance])
+
+    def _judge_batch(self, query: str, docs: list[Document]) -> tuple[RAGCollectResult, dict, str]:
+        contents = [' - ' + doc.text for doc in docs]
+        documents_text = "\n".join(contents)
+        prompt = RAG_COLLECT_SYSTEM_PROMPT.format(query=query, documents=documents_text)
+        prompt = prompt.replace("{", "{{").replace("}", "}}")  # Escape curly braces for LangChain
+        agent = CommonAgentTwoSteps(llm=self.llm)
+        res, _, token_usage, reasoning = agent.go(
+            system_prompt=prompt,
+            instruction_prompt="Please analyze the documents and determine their relevance to the query.",
+            schema=RAGCollectResultSchema,
+        )
+        return RAGCollectResult(**res), token_usage, reasoning
 
     def _collect_documents(self, docs: list[Document], relevants: list[bool]) -> list[Document]:
         """
@@ -105,14 +170,24 @@ class RAGCollectionTaskItem:
             
 
 class RAGCollectionTask:
-    def __init__(self, rag: RAG):
+    def __init__(
+        self,
+        rag: RAG | None = None,
+        repo_url_or_path: str | None = None,
+        access_token: str | None = None,
+    ):
         """
-        Initialize the RAGCollectionTask with a repository URL or local path.
+        Initialize the RAGCollectionTask with a RAG instance, or a repository URL or local path.
 
         Args:
-            repo_url_or_path: URL or local path to the repository
+            rag: An instance of the RAG class
+            repo_url_or_path: URL or local path to the repository, queried through the index registry
             access_token: Optional access token for private repositories
         """
+        if rag is None:
+            if repo_url_or_path is None:
+                raise ValueError("Either rag or repo_url_or_path is required")
+            rag = get_index_registry().open_repo(repo_url_or_path, access_token)
         self.rag = rag
         
     
@@ -128,3 +203,31 @@ class RAGCollectionTask:
         """
         return self.rag.query_doc(query)
 
+
+    def collect(self, query: str, llm, step_callback, batch_size: int = 5) -> list[Document]:
+        """
+        Retrieve the documents of a query and keep those relevant to it, pre-pruned
+        with the score thresholds of the retrieval mode, see RAGCollectionTaskItem.
+
+        Args:
+            query: The user's query
+            llm: The LLM judging the relevance of the documents
+            step_callback: Receives the reasoning, results and token usage of every batch
+
+        Returns:
+            The relevant documents, in retrieval order
+        """
+        item = RAGCollectionTaskItem(llm, self.rag, step_callback, batch_size=batch_size)
+        return item.collect_retrieved(query, self.query(query)[0])
+
+    def query_many(self, queries: list[str]) -> list:
+        """
+        Process several queries using RAG, embedded in one request.
+
+        Args:
+            queries: The user's queries
+
+        Returns:
+            retrieved_documents: One retrieval result per query, in order
+        """
+        return self.rag.query_doc_many(queries)
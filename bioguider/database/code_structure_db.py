@@ -2,10 +2,13 @@ import sqlite3
 from sqlite3 import Connection
 import os
 from time import strftime
-from typing import Optional, List, Dict, Any
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence
 import logging
 import json
 
+from .connection_pool import close_connections, get_connection
+
 logging = logging.getLogger(__name__)
 
 CODE_STRUCTURE_TABLE_NAME = "SourceCodeStructure"
@@ -27,6 +30,16 @@ CREATE TABLE IF NOT EXISTS {CODE_STRUCTURE_TABLE_NAME} (
 );
 """
 
+# Applied in order to every database, see connection_pool.get_connection
+code_structure_migrations = [
+    # 1: lookups by name (and parent, path), by parent (and path) and by path
+    [
+        f"CREATE INDEX IF NOT EXISTS idx_code_structure_name_parent_path ON {CODE_STRUCTURE_TABLE_NAME}(name, parent, path);",
+        f"CREATE INDEX IF NOT EXISTS idx_code_structure_parent_path ON {CODE_STRUCTURE_TABLE_NAME}(parent, path);",
+        f"CREATE INDEX IF NOT EXISTS idx_code_structure_path ON {CODE_STRUCTURE_TABLE_NAME}(path);",
+    ],
+]
+
 code_structure_insert_query = f"""
 INSERT INTO {CODE_STRUCTURE_TABLE_NAME}(name, path, start_lineno, end_lineno, parent, doc_string, params, reference_to, reference_by, datetime)
 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
@@ -92,66 +105,118 @@ FROM {CODE_STRUCTURE_TABLE_NAME}
 WHERE name = ? AND parent = ?;
 """
 
+def _code_structure_row(code_structure: tuple) -> tuple:
+    """The insert query parameters of an insert_code_structure argument tuple."""
+    name, path, start_lineno, end_lineno, parent, doc_string, params, reference_to, reference_by = (
+        tuple(code_structure) + (None,) * (9 - len(code_structure))
+    )
+    return (
+        name,
+        path if path is not None else "",
+        start_lineno,
+        end_lineno,
+        parent if parent is not None else "",
+        doc_string,
+        json.dumps(params) if params is not None else None,
+        reference_to,
+        reference_by,
+    )
+
+def _batched(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+# Specs of lookup_many, in a temporary table of the connection
+code_structure_create_lookup_specs_query = """
+CREATE TEMP TABLE IF NOT EXISTS code_structure_lookup_specs (
+    spec_id INTEGER PRIMARY KEY,
+    name VARCHAR(256),
+    parent VARCHAR(256),
+    path VARCHAR(512)
+);
+"""
+
+# The rows matching every spec at its first level with a match, where the
+# levels try the spec from the most to the least specific columns:
+# 1 name, parent and path    2 name and path    3 name and parent    4 name
+# and for a spec without name: 5 path    6 parent (spec without path either)
+# CROSS JOIN keeps the join order: the planner has no statistics on the specs
+code_structure_lookup_many_query = f"""
+WITH matches AS (
+    SELECT s.spec_id, 1 AS level, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON c.name = s.name AND c.parent = s.parent AND c.path = s.path
+    UNION ALL
+    SELECT s.spec_id, 2, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON c.name = s.name AND c.path = s.path
+    UNION ALL
+    SELECT s.spec_id, 3, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON c.name = s.name AND c.parent = s.parent
+    UNION ALL
+    SELECT s.spec_id, 4, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON c.name = s.name
+    UNION ALL
+    SELECT s.spec_id, 5, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON s.name IS NULL AND c.path = s.path
+    UNION ALL
+    SELECT s.spec_id, 6, c.id FROM code_structure_lookup_specs s
+    JOIN {CODE_STRUCTURE_TABLE_NAME} c ON s.name IS NULL AND s.path IS NULL AND c.parent = s.parent
+),
+best AS (
+    SELECT spec_id, MIN(level) AS level FROM matches GROUP BY spec_id
+)
+SELECT m.spec_id, m.level, c.id, c.name, c.path, c.start_lineno, c.end_lineno, c.parent, c.doc_string, c.params, c.reference_to, c.reference_by, c.datetime
+FROM best b
+CROSS JOIN matches m ON m.spec_id = b.spec_id AND m.level = b.level
+CROSS JOIN {CODE_STRUCTURE_TABLE_NAME} c ON c.id = m.id
+ORDER BY m.spec_id, c.id;
+"""
+
+def _row_to_dict(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "name": row[1],
+        "path": row[2],
+        "start_lineno": row[3],
+        "end_lineno": row[4],
+        "parent": row[5],
+        "doc_string": row[6],
+        "params": row[7],
+        "reference_to": row[8],
+        "reference_by": row[9],
+        "datetime": row[10]
+    }
+
 class CodeStructureDb:
     def __init__(self, author: str, repo_name: str, data_folder: str = None):
         self.author = author
         self.repo_name = repo_name
         self.data_folder = data_folder
-        self.connection: Connection | None = None
+        # overrides the database file derived from data_folder, author and repo_name
+        self.db_file: str | None = None
 
-    def _ensure_tables(self) -> bool:
-        if self.connection is None:
-            return False
+    def _get_connection(self) -> Connection | None:
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(code_structure_create_table_query)
-            self.connection.commit()
-            return True
+            return get_connection(
+                self.get_db_file(),
+                schema=[code_structure_create_table_query],
+                migrations=code_structure_migrations,
+            )
         except Exception as e:
             logging.error(e)
-            return False
-        
-    def _connect_to_db(self) -> bool:
-        if self.connection is not None:
-            return True
-        db_path = self.data_folder
-        if db_path is None:
-            db_path = os.environ.get("DATA_FOLDER", "./data")
-        db_path = os.path.join(db_path, "databases")
-        if not os.path.exists(db_path):
-            try:
-                os.makedirs(db_path, exist_ok=True)
-            except Exception as e:
-                logging.error(e)
-                return False        
-        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}_code_structure.db")
-        if not os.path.exists(db_path):
-            try:
-                with open(db_path, "w"):
-                    pass
-            except Exception as e:
-                logging.error(e)
-                return False
-        self.connection = sqlite3.connect(db_path)
-        return True
-    
+            return None
+
     def is_database_built(self) -> bool:
-        res = self._connect_to_db()
-        if not res:
-            return False
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return False
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"SELECT * FROM {CODE_STRUCTURE_TABLE_NAME}")
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT 1 FROM {CODE_STRUCTURE_TABLE_NAME} LIMIT 1")
             return cursor.fetchone() is not None
         except Exception as e:
             logging.error(e)
             return False
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def insert_code_structure(
         self,
@@ -166,41 +231,60 @@ class CodeStructureDb:
         reference_by: str = None
     ) -> bool:
         """Insert a new code structure entry into the database."""
-        if parent is None:
-            parent = ""
-        if path is None:
-            path = ""
-        res = self._connect_to_db()
-        if not res:
-            return False
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return False
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(
                 code_structure_insert_query, 
-                (name, path, start_lineno, end_lineno, parent, doc_string, json.dumps(params) if params is not None else None, reference_to, reference_by)
+                _code_structure_row((name, path, start_lineno, end_lineno, parent, doc_string, params, reference_to, reference_by))
             )
-            self.connection.commit()
+            connection.commit()
             return True
         except Exception as e:
             logging.error(e)
+            connection.rollback()
+            return False
+
+    def insert_code_structures(self, code_structures: Iterable[tuple], batch_size: int = 1000) -> bool:
+        """
+        Insert code structure entries in a single transaction, batch_size rows per executemany.
+
+        Args:
+            code_structures (Iterable[tuple]): The entries, as the arguments of insert_code_structure
+                from name to reference_by; they are consumed as they come, e.g. from a parser.
+            batch_size (int): The number of rows sent to sqlite at a time.
+
+        Returns:
+            bool: Whether all entries were inserted; on error, none of them is.
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return False
+        count = 0
+        try:
+            cursor = connection.cursor()
+            for batch in _batched(map(_code_structure_row, code_structures), batch_size):
+                cursor.executemany(code_structure_insert_query, batch)
+                count += len(batch)
+            # refresh the statistics the query planner chooses indexes with
+            cursor.execute(f"ANALYZE {CODE_STRUCTURE_TABLE_NAME}")
+            connection.commit()
+            logging.info(f"Inserted {count} code structures into {self.get_db_file()}")
+            return True
+        except Exception as e:
+            logging.error(e)
+            connection.rollback()
             return False
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_path(self, path: str) -> List[Dict[str, Any]]:
         """Select all code structures by file path."""
-        res = self._connect_to_db()
-        if not res:
-            return []
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return []
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_path_query, (path,))
             rows = cursor.fetchall()
             return [
@@ -222,20 +306,14 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return []
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_name(self, name: str) -> List[Dict[str, Any]]:
         """Select all code structures by name."""
-        res = self._connect_to_db()
-        if not res:
-            return []
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return []
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_name_query, (name,))
             rows = cursor.fetchall()
             return [
@@ -257,20 +335,14 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return []
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_name_and_path(self, name: str, path: str) -> Optional[Dict[str, Any]]:
         """Select a code structure by name and path."""
-        res = self._connect_to_db()
-        if not res:
-            return None
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return None
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_name_and_path_query, (name, path))
             row = cursor.fetchone()
             if row is None:
@@ -291,20 +363,14 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return None
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_name_and_parent(self, name: str, parent: str) -> List[Dict[str, Any]]:
         """Select all code structures by name and parent."""
-        res = self._connect_to_db()
-        if not res:
-            return []
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return []
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_name_and_parent_query, (name, parent))
             rows = cursor.fetchall()
             return [
@@ -326,21 +392,15 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return []
-        finally:
-            self.connection.close()
-            self.connection = None
 
 
     def select_by_name_and_parent_and_path(self, name: str, parent: str, path: str) -> Optional[Dict[str, Any]]:
         """Select a code structure by name and parent."""
-        res = self._connect_to_db()
-        if not res:
-            return None
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return None
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_name_and_parent_and_path_query, (name, parent, path))
             row = cursor.fetchone()
             if row is None:
@@ -361,20 +421,14 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return None
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_id(self, id: int) -> Optional[Dict[str, Any]]:
         """Select a code structure by ID."""
-        res = self._connect_to_db()
-        if not res:
-            return None
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return None
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_select_by_id_query, (id,))
             row = cursor.fetchone()
             if row is None:
@@ -395,9 +449,47 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return None
+
+    def lookup_many(self, specs: Sequence[tuple]) -> List[List[Dict[str, Any]]]:
+        """
+        Resolve many symbols in one query, falling back from the most specific match
+        to the least: name, parent and path, then name and path, name and parent,
+        and name alone. A spec without name is resolved by path, or by parent.
+        A match on name and path, with or without parent, is a single row.
+
+        Args:
+            specs (Sequence[tuple]): (name, parent, path) tuples, None for an unknown field.
+
+        Returns:
+            List[List[Dict]]: The rows of every spec, in order; empty when nothing matches.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in specs]
+        if len(specs) == 0:
+            return results
+        connection = self._get_connection()
+        if connection is None:
+            return results
+        try:
+            cursor = connection.cursor()
+            cursor.execute(code_structure_create_lookup_specs_query)
+            cursor.execute("DELETE FROM code_structure_lookup_specs")
+            cursor.executemany(
+                "INSERT INTO code_structure_lookup_specs(spec_id, name, parent, path) VALUES (?, ?, ?, ?)",
+                [(ix, name, parent, path) for ix, (name, parent, path) in enumerate(specs)],
+            )
+            cursor.execute(code_structure_lookup_many_query)
+            for row in cursor.fetchall():
+                spec_id, level = row[0], row[1]
+                if level <= 2 and len(results[spec_id]) > 0:
+                    continue
+                results[spec_id].append(_row_to_dict(row[2:]))
+            return results
+        except Exception as e:
+            logging.error(e)
+            return [[] for _ in specs]
         finally:
-            self.connection.close()
-            self.connection = None
+            # ends the transaction of the temporary table, and the read snapshot with it
+            connection.commit()
 
     def update_code_structure(
         self,
@@ -413,37 +505,29 @@ class CodeStructureDb:
         reference_by: str = None
     ) -> bool:
         """Update an existing code structure entry."""
-        res = self._connect_to_db()
-        if not res:
-            return False
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return False
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(
                 code_structure_update_query, 
                 (name, path, start_lineno, end_lineno, parent, doc_string, params, reference_to, reference_by, id)
             )
-            self.connection.commit()
+            connection.commit()
             return cursor.rowcount > 0
         except Exception as e:
             logging.error(e)
+            connection.rollback()
             return False
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_by_parent(self, parent: str, path: str | None = None) -> List[Dict[str, Any]]:
         """Select all code structures by parent."""
-        res = self._connect_to_db()
-        if not res:
-            return []
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return []
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             if path is not None:
                 cursor.execute(code_structure_select_by_parent_and_parentpath_query, (parent, path))
             else:
@@ -468,33 +552,60 @@ class CodeStructureDb:
         except Exception as e:
             logging.error(e)
             return []
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def delete_code_structure(self, id: int) -> bool:
         """Delete a code structure entry by ID."""
-        res = self._connect_to_db()
-        if not res:
-            return False
-        res = self._ensure_tables()
-        if not res:
+        connection = self._get_connection()
+        if connection is None:
             return False
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(code_structure_delete_query, (id,))
-            self.connection.commit()
+            connection.commit()
             return cursor.rowcount > 0
         except Exception as e:
             logging.error(e)
+            connection.rollback()
             return False
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def get_db_file(self) -> str:
         """Get the database file path."""
-        db_path = os.environ.get("DATA_FOLDER", "./data")
+        if self.db_file is not None:
+            return self.db_file
+        db_path = self.data_folder
+        if db_path is None:
+            db_path = os.environ.get("DATA_FOLDER", "./data")
         db_path = os.path.join(db_path, "databases")
-        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}.db")
+        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}_code_structure.db")
         return db_path
+
+    def create_staging_db(self) -> "CodeStructureDb":
+        """
+        An empty database next to this one, to be filled and then published with
+        publish_staging_db, so that readers never see a partially built database.
+        """
+        staging_db = CodeStructureDb(self.author, self.repo_name, self.data_folder)
+        staging_db.db_file = f"{self.get_db_file()}.tmp.{os.getpid()}"
+        staging_db._remove_db_files()
+        return staging_db
+
+    def publish_staging_db(self, staging_db: "CodeStructureDb"):
+        """
+        Atomically replace the content of this database with a staging database,
+        in one transaction of the SQLite backup API: pooled connections to this
+        database, in this process or others, stay valid and see the new content.
+        """
+        staging_file = staging_db.get_db_file()
+        staging_connection = staging_db._get_connection()
+        connection = self._get_connection()
+        if staging_connection is None or connection is None:
+            raise RuntimeError(f"Unable to publish {staging_file} to {self.get_db_file()}")
+        staging_connection.backup(connection)
+        staging_db._remove_db_files()
+
+    def _remove_db_files(self):
+        db_file = self.get_db_file()
+        close_connections(db_file)
+        for path in (db_file, f"{db_file}-wal", f"{db_file}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
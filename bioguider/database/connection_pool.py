@@ -0,0 +1,117 @@
+"""
+A per-process pool of long-lived SQLite connections, one per database file and
+thread (sqlite3 connections cannot be shared between threads).
+
+Connections are opened once, in WAL journal mode with synchronous=NORMAL, so
+that readers do not block the writer and a commit does not wait for an fsync.
+The sqlite3 module caches the prepared statements of a connection, which are
+reused as long as the connection lives. The schema is created, and pending
+migrations applied, when a connection is opened, not before every statement.
+PRAGMA user_version records the number of migrations applied to a database.
+
+A pooled connection is reopened when its database file has been deleted or
+replaced, and connections inherited through fork() are never used by the child.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+# prepared statements cached by each connection
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+# connections inherited from a parent process, kept referenced so that they are never closed by the child
+_inherited_connections: list = []
+
+def _get_pool() -> Dict[str, Tuple[sqlite3.Connection, Tuple[int, int]]]:
+    if getattr(_local, "pid", None) != os.getpid():
+        _inherited_connections.extend(getattr(_local, "connections", {}).values())
+        _local.pid = os.getpid()
+        _local.connections = {}
+    return _local.connections
+
+def _file_id(db_file: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(db_file)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+def _open_connection(db_file: str) -> sqlite3.Connection:
+    db_dir = os.path.dirname(db_file)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(db_file, cached_statements=CACHED_STATEMENTS)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+def _migrate(connection: sqlite3.Connection, migrations: Sequence[Sequence[str]]):
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(migrations):
+        return
+    # take the write lock before reading the version again, concurrent connections migrate once
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        for number in range(version + 1, len(migrations) + 1):
+            for statement in migrations[number - 1]:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {number}")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+def get_connection(
+    db_file: str,
+    schema: Sequence[str] = (),
+    migrations: Sequence[Sequence[str]] = (),
+) -> sqlite3.Connection:
+    """
+    Get the connection of the calling thread to a database file, creating the
+    file and its schema if needed.
+
+    Args:
+        db_file (str): The database file.
+        schema (Sequence[str]): Idempotent statements (CREATE ... IF NOT EXISTS)
+            run when a connection is opened.
+        migrations (Sequence[Sequence[str]]): The statements of every schema migration,
+            in order; those not yet applied to the database run after the schema.
+
+    Returns:
+        sqlite3.Connection: A connection owned by the pool, not to be closed by the caller.
+    """
+    db_file = os.path.abspath(db_file)
+    pool = _get_pool()
+    pooled = pool.get(db_file)
+    if pooled is not None:
+        connection, file_id = pooled
+        if _file_id(db_file) == file_id:
+            return connection
+        # the file was deleted or replaced since the connection was opened
+        pool.pop(db_file)
+        connection.close()
+
+    connection = _open_connection(db_file)
+    for statement in schema:
+        connection.execute(statement)
+    connection.commit()
+    _migrate(connection, migrations)
+    pool[db_file] = (connection, _file_id(db_file))
+    return connection
+
+def close_connections(db_file: Optional[str] = None):
+    """
+    Close the connections of the calling thread.
+
+    Args:
+        db_file (str, optional): Only close the connection to this database file.
+    """
+    pool = _get_pool()
+    db_files = [os.path.abspath(db_file)] if db_file is not None else list(pool)
+    for path in db_files:
+        pooled = pool.pop(path, None)
+        if pooled is not None:
+            pooled[0].close()
@@ -7,8 +7,10 @@ from typing import Optional
 import logging
 from string import Template
 import json
+import hashlib
 
 from bioguider.utils.constants import DEFAULT_TOKEN_USAGE
+from .connection_pool import get_connection
 
 logging = logging.getLogger(__name__)
 
@@ -26,61 +28,96 @@ CREATE TABLE IF NOT EXISTS {SUMMARIZED_FILES_TABLE_NAME} (
     UNIQUE (file_path, instruction, summarize_level, summarize_prompt)
 );
 """
+# Applied in order to every database, see connection_pool.get_connection
+summarized_files_migrations = [
+    # 1: summaries are keyed by the model and the content hash of the file too,
+    # with the size and mtime of the file to validate them without hashing it
+    [
+        f"""
+        CREATE TABLE {SUMMARIZED_FILES_TABLE_NAME}_v1 (
+            file_path VARCHAR(512),
+            instruction TEXT NOT NULL DEFAULT '',
+            summarize_prompt TEXT,
+            summarize_level INTEGER,
+            summarized_text TEXT,
+            token_usage  VARCHAR(512),
+            datetime TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            model_id VARCHAR(256) NOT NULL DEFAULT '',
+            content_hash VARCHAR(64) NOT NULL DEFAULT '',
+            file_size INTEGER,
+            file_mtime_ns INTEGER,
+            UNIQUE (file_path, instruction, summarize_level, summarize_prompt, model_id, content_hash)
+        );
+        """,
+        # existing summaries have no content hash: they only serve files that cannot be read
+        f"""
+        INSERT OR IGNORE INTO {SUMMARIZED_FILES_TABLE_NAME}_v1(file_path, instruction, summarize_prompt, summarize_level, summarized_text, token_usage, datetime)
+        SELECT file_path, COALESCE(instruction, ''), summarize_prompt, summarize_level, summarized_text, token_usage, datetime
+        FROM {SUMMARIZED_FILES_TABLE_NAME} ORDER BY datetime DESC;
+        """,
+        f"DROP TABLE {SUMMARIZED_FILES_TABLE_NAME};",
+        f"ALTER TABLE {SUMMARIZED_FILES_TABLE_NAME}_v1 RENAME TO {SUMMARIZED_FILES_TABLE_NAME};",
+    ],
+]
+
 summarized_files_upsert_query = f"""
-INSERT INTO {SUMMARIZED_FILES_TABLE_NAME}(file_path, instruction, summarize_level, summarize_prompt, summarized_text, token_usage, datetime)
-VALUES (?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
-ON CONFLICT(file_path, instruction, summarize_level, summarize_prompt) DO UPDATE SET summarized_text=excluded.summarized_text,
+INSERT INTO {SUMMARIZED_FILES_TABLE_NAME}(file_path, instruction, summarize_level, summarize_prompt, summarized_text, token_usage, model_id, content_hash, file_size, file_mtime_ns, datetime)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+ON CONFLICT(file_path, instruction, summarize_level, summarize_prompt, model_id, content_hash) DO UPDATE SET summarized_text=excluded.summarized_text,
+token_usage=excluded.token_usage, file_size=excluded.file_size, file_mtime_ns=excluded.file_mtime_ns,
 datetime=strftime('%Y-%m-%d %H:%M:%f', 'now');
 """
-summarized_files_select_query = f"""
+summarized_files_select_by_stat_query = f"""
 SELECT summarized_text, datetime FROM {SUMMARIZED_FILES_TABLE_NAME} 
-where file_path = ? and instruction = ? and summarize_level = ? and summarize_prompt=?;
+where file_path = ? and instruction = ? and summarize_level = ? and summarize_prompt=? and model_id = ? and file_size = ? and file_mtime_ns = ?
+ORDER BY datetime DESC LIMIT 1;
+"""
+summarized_files_select_by_hash_query = f"""
+SELECT rowid, summarized_text, datetime FROM {SUMMARIZED_FILES_TABLE_NAME} 
+where file_path = ? and instruction = ? and summarize_level = ? and summarize_prompt=? and model_id = ? and content_hash = ?;
+"""
+summarized_files_update_stat_query = f"""
+UPDATE {SUMMARIZED_FILES_TABLE_NAME} SET file_size = ?, file_mtime_ns = ? WHERE rowid = ?;
 """
 
+def _hash_content(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+def _hash_file(path: str) -> str | None:
+    sha = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    except OSError:
+        return None
+    return sha.hexdigest()
+
+def _stat_file(path: str | None) -> tuple[int, int] | None:
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
 class SummarizedFilesDb:
     def __init__(self, author: str, repo_name: str, data_folder: str = None):
         self.author = author
         self.repo_name = repo_name
-        self.connection: Connection | None = None
         self.data_folder = data_folder
 
-    def _ensure_tables(self) -> bool:
-        if self.connection is None:
-            return False
+    def _get_connection(self) -> Connection | None:
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                summarized_files_create_table_query
+            return get_connection(
+                self.get_db_file(),
+                schema=[summarized_files_create_table_query],
+                migrations=summarized_files_migrations,
             )
-            self.connection.commit()
-            return True
-        except Exception as e:
-            logging.error(e)
-            return False
-        
-    def _connect_to_db(self) -> bool:
-        if self.connection is not None:
-            return True
-        db_path = self.data_folder
-        if db_path is None:
-            db_path = os.environ.get("DATA_FOLDER", "./data")
-        db_path = os.path.join(db_path, "databases")
-        # Ensure the local path exists
-        try:
-            os.makedirs(db_path, exist_ok=True)
         except Exception as e:
             logging.error(e)
-            return False
-        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}_summarized_file.db")
-        if not os.path.exists(db_path):
-            try:
-                with open(db_path, "w"):
-                    pass
-            except Exception as e:
-                logging.error(e)
-                return False
-        self.connection = sqlite3.connect(db_path)
-        return True
+            return None
     
     def upsert_summarized_file(
         self,
@@ -89,28 +126,45 @@ class SummarizedFilesDb:
         summarize_level: int,
         summarize_prompt: str,
         summarized_text: str,
-        token_usage: dict | None = None
+        token_usage: dict | None = None,
+        source_path: str | None = None,
+        content: str | None = None,
+        model_id: str | None = None,
     ):
+        """
+        Save the summary of a version of a file.
+
+        Args:
+            source_path (str, optional): The file summarized, file_path if not provided.
+            content (str, optional): The content summarized, keyed by its hash instead of the file's.
+            model_id (str, optional): The model that summarized it.
+        """
         token_usage = token_usage if token_usage is not None else {**DEFAULT_TOKEN_USAGE}
         token_usage = json.dumps(token_usage)
-        res = self._connect_to_db()
-        assert res
-        res = self._ensure_tables()
-        assert res
+        if content is not None:
+            stat, content_hash = None, _hash_content(content)
+        else:
+            # stat before hashing: a file changed in between is hashed again on lookup
+            stat = _stat_file(source_path or file_path)
+            content_hash = (_hash_file(source_path or file_path) or "") if stat is not None else ""
+        file_size, file_mtime_ns = stat if stat is not None else (None, None)
+        connection = self._get_connection()
+        assert connection is not None
         try:
-            cursor = self.connection.cursor()
+            cursor = connection.cursor()
             cursor.execute(
                 summarized_files_upsert_query, 
-                (file_path, instruction, summarize_level, summarize_prompt, summarized_text, token_usage, )
+                (
+                    file_path, instruction or "", summarize_level, summarize_prompt, summarized_text, token_usage,
+                    model_id or "", content_hash, file_size, file_mtime_ns,
+                )
             )
-            self.connection.commit()
+            connection.commit()
             return True
         except Exception as e:
             logging.error(e)
+            connection.rollback()
             return False
-        finally:
-            self.connection.close()
-            self.connection = None
 
     def select_summarized_text(
         self,
@@ -118,29 +172,88 @@ class SummarizedFilesDb:
         instruction: str,
         summarize_level: int,
         summarize_prompt: str = "N/A",
+        source_path: str | None = None,
+        content: str | None = None,
+        model_id: str | None = None,
     ) -> str | None:
-        self._connect_to_db()
-        self._ensure_tables()
+        """
+        Get the summary of the current version of a file. A summary saved for the
+        same size and mtime is returned without reading the file; otherwise the
+        file is hashed, and the summary of the same content is returned.
+
+        Args:
+            source_path (str, optional): The file summarized, file_path if not provided.
+            content (str, optional): The content to summarize, hashed instead of the file.
+            model_id (str, optional): The model that summarizes it.
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return None
+        key = (file_path, instruction or "", summarize_level, summarize_prompt, model_id or "")
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                summarized_files_select_query, 
-                (file_path, instruction, summarize_level, summarize_prompt,)
-            )
+            cursor = connection.cursor()
+            stat = None
+            if content is not None:
+                content_hash = _hash_content(content)
+            else:
+                stat = _stat_file(source_path or file_path)
+                if stat is not None:
+                    cursor.execute(summarized_files_select_by_stat_query, (*key, *stat))
+                    row = cursor.fetchone()
+                    if row is not None:
+                        return row[0]
+                content_hash = (_hash_file(source_path or file_path) or "") if stat is not None else ""
+            cursor.execute(summarized_files_select_by_hash_query, (*key, content_hash))
             row = cursor.fetchone()
             if row is None:
                 return None
-            return row[0]
+            if stat is not None:
+                # the content did not change, e.g. the file was touched: take the fast path next time
+                cursor.execute(summarized_files_update_stat_query, (*stat, row[0]))
+                connection.commit()
+            return row[1]
         except Exception as e:
             logging.error(e)
+            connection.rollback()
             return None
-        finally:
-            self.connection.close()
-            self.connection = None
+
+    def purge_missing_sources(self, root: str | None = None) -> int:
+        """
+        Delete the summaries of files that no longer exist.
+
+        Args:
+            root (str, optional): The directory relative file paths are resolved against.
+
+        Returns:
+            int: The number of summaries deleted.
+        """
+        connection = self._get_connection()
+        if connection is None:
+            return 0
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT DISTINCT file_path FROM {SUMMARIZED_FILES_TABLE_NAME}")
+            missing = [
+                (file_path,) for (file_path,) in cursor.fetchall()
+                if file_path is None or not os.path.exists(os.path.join(root, file_path) if root is not None else file_path)
+            ]
+            total_changes = connection.total_changes
+            cursor.executemany(f"DELETE FROM {SUMMARIZED_FILES_TABLE_NAME} WHERE file_path IS ?", missing)
+            deleted = connection.total_changes - total_changes
+            connection.commit()
+            logging.info(f"Purged {deleted} summaries of {len(missing)} missing files from {self.get_db_file()}")
+            return deleted
+        except Exception as e:
+            logging.error(e)
+            connection.rollback()
+            return 0
         
     def get_db_file(self):
-        db_path = os.environ.get("DATA_FOLDER", "./data")
-        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}.db")
+        db_path = self.data_folder
+        if db_path is None:
+            db_path = os.environ.get("DATA_FOLDER", "./data")
+        db_path = os.path.join(db_path, "databases")
+        db_path = os.path.join(db_path, f"{self.author}_{self.repo_name}_summarized_file.db")
         return db_path
 
 
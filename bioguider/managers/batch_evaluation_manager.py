@@ -1,4 +1,5 @@
 import logging
+from contextlib import closing
 from typing import Callable, Optional
 
 from langchain_openai.chat_models.base import BaseChatOpenAI
@@ -51,6 +52,17 @@ def evaluate_repository(
     Returns:
         BatchRepoEvaluationResult with per-step results, token usage, and errors.
     """
+    # release the repositories prepared by the manager, whatever the outcome
+    with closing(EvaluationManager(llm, step_callback)) as mgr:
+        return _evaluate_repository(mgr, repo_url, step_callback, steps)
+
+
+def _evaluate_repository(
+    mgr: EvaluationManager,
+    repo_url: str,
+    step_callback: Optional[Callable],
+    steps: Optional[list[EvaluationStepEnum]],
+) -> BatchRepoEvaluationResult:
     if steps is None:
         steps = list(ALL_STEPS)
 
@@ -63,8 +75,6 @@ def evaluate_repository(
         },
     )
 
-    mgr = EvaluationManager(llm, step_callback)
-
     # --- prepare repo (required for all steps) ---
     try:
         _report_step(step_callback, "prepare_repo")
@@ -6,7 +6,10 @@ from bioguider.database.code_structure_db import CodeStructureDb
 from bioguider.utils.constants import ProjectMetadata
 
 from ..agents.identification_task import IdentificationTask
-from ..rag.rag import RAG
+from ..rag.index_registry import get_index_registry
+from ..rag.config import configs
+from ..rag.cache_manager import CacheManager, collect_garbage
+from ..rag.repo_cache import get_repo_name
 from ..utils.file_utils import parse_refined_repo_path, parse_repo_url
 from ..utils.code_structure_builder import CodeStructureBuilder
 from ..database.summarized_file_db import SummarizedFilesDb
@@ -22,13 +25,19 @@ class EvaluationManager:
         self.repo_url: str | None = None
         self.project_metadata: ProjectMetadata | None = None
         self.refined_project_metadata: ProjectMetadata | None = None
+        # shared locks keeping the prepared repositories from being evicted
+        self.repo_leases = []
+
+    def close(self):
+        """Release the prepared repositories, they may be evicted from the cache again."""
+        for lease in self.repo_leases:
+            lease.release()
+        self.repo_leases = []
 
     def prepare_refined_repo(self, refined_repo_url: str):
         self.prepare_repo(refined_repo_url)
         self.refined_repo_path = refined_repo_url
-        self.refined_rag = RAG()
-        self.refined_rag.initialize_db_manager()
-        self.refined_rag.initialize_repo(repo_url_or_path=refined_repo_url)
+        self.refined_rag = get_index_registry().open_repo(refined_repo_url)
 
         author, repo_name = parse_refined_repo_path(refined_repo_url)
         self.refined_summary_file_db = SummarizedFilesDb(author, repo_name)
@@ -47,9 +56,10 @@ class EvaluationManager:
 
     def prepare_repo(self, repo_url: str):
         self.repo_url = repo_url
-        self.rag = RAG()
-        self.rag.initialize_db_manager()
-        self.rag.initialize_repo(repo_url_or_path=repo_url)
+        self.repo_leases.append(CacheManager().lease(get_repo_name(repo_url)))
+        if configs["cache_quota"].get("collect_before_prepare", True):
+            collect_garbage()
+        self.rag = get_index_registry().open_repo(repo_url)
         
         author, repo_name = parse_repo_url(repo_url)
         self.summary_file_db = SummarizedFilesDb(author, repo_name)
@@ -0,0 +1,239 @@
+import os
+import re
+import glob
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.types import Document, RetrieverOutput
+
+from .faiss_index import get_corpus_fingerprint
+from .vector_store import CompactDocuments, MmapVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Bump when tokenization or scoring changes, so that persisted indexes are rebuilt
+BM25_INDEX_VERSION = 1
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+_SUBWORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words of a text. Identifiers are kept whole and also split into their
+    snake_case / camelCase parts, so "read_all_documents" matches both the exact
+    identifier and "documents".
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall(text):
+        tokens.append(word.lower())
+        parts = [part.lower() for piece in word.split("_") for part in _SUBWORD_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class BM25Index:
+    """
+    An Okapi BM25 inverted index over the chunks of a corpus, in compressed sparse
+    row form: the postings of term t are doc_ids[indptr[t]:indptr[t + 1]] with
+    their term frequencies in tfs. Searching needs no embedding, hence no network call.
+    """
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_lens: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.terms = terms
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        num_docs = len(doc_lens)
+        self.avg_doc_len = float(doc_lens.mean()) if num_docs > 0 else 0.0
+        doc_freqs = np.diff(indptr).astype(np.float64)
+        self.idf = np.log(1.0 + (num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+    def __len__(self) -> int:
+        return len(self.doc_lens)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index, terms included."""
+        arrays = (self.indptr, self.doc_ids, self.tfs, self.doc_lens, self.idf)
+        return sum(array.nbytes for array in arrays) + sum(len(term) + 80 for term in self.terms)
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Build the index of a corpus.
+
+        Args:
+            texts (Sequence[str]): The text of every chunk, in corpus order.
+        """
+        postings: Dict[str, List[tuple]] = defaultdict(list)
+        doc_lens = np.zeros(len(texts), dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+
+        terms = {}
+        indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        doc_ids = np.zeros(sum(len(p) for p in postings.values()), dtype=np.int32)
+        tfs = np.zeros(len(doc_ids), dtype=np.float32)
+        position = 0
+        for term_id, (term, term_postings) in enumerate(postings.items()):
+            terms[term] = term_id
+            for doc_id, tf in term_postings:
+                doc_ids[position] = doc_id
+                tfs[position] = tf
+                position += 1
+            indptr[term_id + 1] = position
+        return cls(terms, indptr, doc_ids, tfs, doc_lens, k1=k1, b=b)
+
+    def save(self, index_path: str):
+        """Atomically write the index to a .npz file."""
+        terms = np.array(sorted(self.terms, key=self.terms.get), dtype=str)
+        tmp_path = f"{index_path}.tmp.{os.getpid()}.npz"
+        np.savez(
+            tmp_path,
+            terms=terms,
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            tfs=self.tfs,
+            doc_lens=self.doc_lens,
+            params=np.array([self.k1, self.b], dtype=np.float64),
+        )
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> "BM25Index":
+        with np.load(index_path, allow_pickle=False) as data:
+            terms = {term: term_id for term_id, term in enumerate(data["terms"].tolist())}
+            k1, b = data["params"].tolist()
+            return cls(terms, data["indptr"], data["doc_ids"], data["tfs"], data["doc_lens"], k1=k1, b=b)
+
+    def get_scores(self, query: str) -> np.ndarray:
+        """The BM25 score of every chunk for a query."""
+        scores = np.zeros(len(self), dtype=np.float64)
+        if len(self) == 0:
+            return scores
+        for term, query_tf in Counter(tokenize(query)).items():
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            doc_ids = self.doc_ids[start:end]
+            tfs = self.tfs[start:end]
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens[doc_ids] / max(self.avg_doc_len, 1e-9))
+            scores[doc_ids] += query_tf * self.idf[term_id] * tfs * (self.k1 + 1.0) / (tfs + norm)
+        return scores
+
+    def search(self, query: str, top_k: int) -> RetrieverOutput:
+        """
+        Retrieve the top_k chunks of a query. Chunks sharing no term with the query are not returned.
+
+        Returns:
+            RetrieverOutput: doc_indices and doc_scores, best first.
+        """
+        scores = self.get_scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return RetrieverOutput(
+            doc_indices=candidates.tolist(),
+            doc_scores=scores[candidates].tolist(),
+            query=query,
+        )
+
+def get_bm25_index_path(db_path: str, fingerprint: str) -> str:
+    """Get the path of the persisted BM25 index of a corpus, next to its database."""
+    key = hashlib.sha256(f"{BM25_INDEX_VERSION}:{fingerprint}".encode("utf-8")).hexdigest()[:16]
+    return f"{os.path.splitext(db_path)[0]}.{key}.bm25.npz"
+
+def _get_texts(documents: Sequence[Document]) -> List[str]:
+    if isinstance(documents, MmapVectorStore):
+        return [documents.get_document(ix, with_vector=False).text for ix in range(len(documents))]
+    if isinstance(documents, CompactDocuments):
+        return [documents.get_text(ix) for ix in range(len(documents))]
+    return [doc.text for doc in documents]
+
+def build_bm25_index(
+    documents: Sequence[Document],
+    db_path: Optional[str] = None,
+    persist: bool = True,
+) -> BM25Index:
+    """
+    Build a BM25 index over the transformed documents, reusing the index
+    persisted for the same corpus fingerprint if there is one.
+
+    Args:
+        documents (Sequence[Document]): The transformed documents, or a MmapVectorStore.
+        db_path (str, optional): The corpus database path, next to which the index is persisted.
+        persist (bool): Whether to read and write persisted indexes.
+    """
+    index_path = None
+    if persist and db_path is not None and len(documents) > 0:
+        index_path = get_bm25_index_path(db_path, get_corpus_fingerprint(documents))
+        if os.path.exists(index_path):
+            try:
+                index = BM25Index.load(index_path)
+                if len(index) == len(documents):
+                    logger.info(f"Loaded BM25 index {index_path}")
+                    return index
+            except Exception as e:
+                logger.error(f"Error reading BM25 index {index_path}: {e}")
+
+    index = BM25Index.build(_get_texts(documents))
+    if index_path is not None:
+        try:
+            index.save(index_path)
+            logger.info(f"Saved BM25 index {index_path}")
+            base_path = os.path.splitext(db_path)[0]
+            for stale_path in glob.glob(f"{glob.escape(base_path)}.*.bm25.npz"):
+                if stale_path != index_path:
+                    os.remove(stale_path)
+        except Exception as e:
+            logger.error(f"Error saving BM25 index {index_path}: {e}")
+    return index
+
+def reciprocal_rank_fusion(
+    outputs: Sequence[RetrieverOutput],
+    top_k: int,
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+) -> RetrieverOutput:
+    """
+    Fuse the rankings of several retrievers for one query: a chunk scores
+    sum(weight / (k + rank)) over the rankings it appears in.
+
+    Args:
+        outputs (Sequence[RetrieverOutput]): One output per retriever, best first.
+        top_k (int): The number of fused results.
+        k (int): Damps the weight of the first ranks.
+        weights (Sequence[float], optional): The weight of every retriever, 1.0 by default.
+    """
+    weights = weights or [1.0] * len(outputs)
+    scores: Dict[int, float] = defaultdict(float)
+    for output, weight in zip(outputs, weights):
+        for rank, doc_index in enumerate(output.doc_indices):
+            if doc_index >= 0:
+                scores[doc_index] += weight / (k + rank + 1)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return RetrieverOutput(
+        doc_indices=[doc_index for doc_index, _ in ranked],
+        doc_scores=[score for _, score in ranked],
+        query=outputs[0].query if outputs else None,
+    )
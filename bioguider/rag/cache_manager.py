@@ -0,0 +1,300 @@
+"""
+Disk quota for the per-repository assets under DATA_FOLDER:
+
+- {DATA_FOLDER}/.adalflow/repos/{name}, its {name}.repo.json record and leftover clones
+- {DATA_FOLDER}/.adalflow/databases/{name}_doc.* and {name}_code.* (RAG databases,
+  vector stores, manifests, FAISS and BM25 indexes)
+- {DATA_FOLDER}/databases/{name}_code_structure.db and {name}_summarized_file.db
+
+Jobs hold a shared lock on {DATA_FOLDER}/.adalflow/locks/{name}.lock while they
+use a repository (a DatabaseManager holds it while it is set up on the
+repository), and the lock file's mtime records the last access. Eviction takes
+the lock and the build lock below exclusively without waiting, so a repository
+in use or being built is never deleted, and a job starting meanwhile waits for
+the eviction to finish.
+
+Preparing a repository (clone or refresh, RAG indexing, code structure) takes
+{DATA_FOLDER}/.adalflow/locks/{name}.build.lock exclusively, between threads and
+processes: the first job builds the assets, concurrent jobs wait and reuse them.
+
+Usage:
+    python -m bioguider.rag.cache_manager list
+    python -m bioguider.rag.cache_manager collect --max-size-gb 50 [--dry-run]
+    python -m bioguider.rag.cache_manager evict owner_repo
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ..utils.file_lock import FileLock
+from .config import configs
+
+logger = logging.getLogger(__name__)
+
+_GB = 1024 ** 3
+
+# asset file names, by the directory they live in, relative to DATA_FOLDER
+_ASSET_PATTERNS = {
+    os.path.join(".adalflow", "repos"): re.compile(r"^(?P<name>.+?)(\.repo\.json)?(\.tmp\.\d+)?$"),
+    os.path.join(".adalflow", "databases"): re.compile(r"^(?P<name>.+)_(doc|code)(\..+)?$"),
+    "databases": re.compile(r"^(?P<name>.+)_(code_structure|summarized_file)\.db(-wal|-shm|-journal)?$"),
+}
+
+@dataclass
+class RepoCacheEntry:
+    name: str
+    paths: List[str] = field(default_factory=list)
+    size: int = 0
+    last_access: float = 0.0
+
+@dataclass
+class CollectionResult:
+    total_size: int
+    freed: int = 0
+    evicted: List[str] = field(default_factory=list)
+    # repositories that would have been evicted but are in use or were accessed recently
+    skipped: List[str] = field(default_factory=list)
+
+def _get_size(path: str) -> int:
+    """The disk usage of a file or directory, symlinks are not followed."""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+    except OSError:
+        return 0
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class CacheManager:
+    """
+    Tracks the size and last access of every repository cached under DATA_FOLDER
+    and evicts the least recently used ones to keep them under a quota.
+    """
+
+    def __init__(self, data_folder: Optional[str] = None):
+        self.data_folder = os.path.abspath(data_folder or os.environ.get("DATA_FOLDER", "./data"))
+        self.lock_dir = os.path.join(self.data_folder, ".adalflow", "locks")
+
+    def get_lock_path(self, name: str) -> str:
+        return os.path.join(self.lock_dir, f"{name}.lock")
+
+    def get_build_lock_path(self, name: str) -> str:
+        return os.path.join(self.lock_dir, f"{name}.build.lock")
+
+    def build_lock(self, name: str) -> FileLock:
+        """
+        The lock to hold while building the assets of a repository, so that
+        concurrent jobs never clone or index it twice. Builders check for up to
+        date assets once they hold it, and publish new ones with an atomic rename.
+
+        Args:
+            name (str): The repository name, see repo_cache.get_repo_name.
+
+        Returns:
+            FileLock: The exclusive lock, not acquired yet.
+        """
+        return FileLock(self.get_build_lock_path(name))
+
+    def touch(self, name: str):
+        """Record an access to a repository."""
+        lock_path = self.get_lock_path(name)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        with open(lock_path, "a"):
+            os.utime(lock_path)
+
+    def lease(self, name: str) -> FileLock:
+        """
+        Mark a repository in use until the returned lock is released, waiting for
+        a running eviction of it to finish.
+
+        Args:
+            name (str): The repository name, see repo_cache.get_repo_name.
+
+        Returns:
+            FileLock: The shared lock held on the repository.
+        """
+        lock = FileLock(self.get_lock_path(name), shared=True)
+        lock.acquire()
+        self.touch(name)
+        return lock
+
+    def list_entries(self) -> List[RepoCacheEntry]:
+        """The cached repositories, least recently used first."""
+        entries: Dict[str, RepoCacheEntry] = {}
+        for directory, pattern in _ASSET_PATTERNS.items():
+            directory = os.path.join(self.data_folder, directory)
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                match = pattern.match(file_name)
+                if match is None:
+                    continue
+                name = match.group("name")
+                path = os.path.join(directory, file_name)
+                entry = entries.setdefault(name, RepoCacheEntry(name=name))
+                entry.paths.append(path)
+                entry.size += _get_size(path)
+                try:
+                    entry.last_access = max(entry.last_access, os.lstat(path).st_mtime)
+                except OSError:
+                    pass
+        for entry in entries.values():
+            # recorded accesses, the newest asset for repositories never leased
+            try:
+                entry.last_access = os.stat(self.get_lock_path(entry.name)).st_mtime
+            except OSError:
+                pass
+        return sorted(entries.values(), key=lambda e: (e.last_access, e.name))
+
+    def evict(self, entry: RepoCacheEntry) -> bool:
+        """
+        Delete all assets of a repository, unless it is in use: leased, or being
+        built by a job holding its build lock.
+
+        Returns:
+            bool: Whether the repository was evicted.
+        """
+        lock = FileLock(self.get_lock_path(entry.name))
+        if not lock.acquire(blocking=False):
+            logger.info(f"Repository {entry.name} is in use, not evicting it")
+            return False
+        build_lock = self.build_lock(entry.name)
+        try:
+            if not build_lock.acquire(blocking=False):
+                logger.info(f"Repository {entry.name} is being built, not evicting it")
+                return False
+            try:
+                for path in entry.paths:
+                    _remove(path)
+            finally:
+                build_lock.release()
+        finally:
+            lock.release()
+        logger.info(f"Evicted repository {entry.name} ({entry.size / _GB:.2f} GB)")
+        return True
+
+    def collect(
+        self,
+        max_size_bytes: int,
+        min_idle_seconds: float = 0,
+        dry_run: bool = False,
+    ) -> CollectionResult:
+        """
+        Evict least recently used repositories until the cache fits in max_size_bytes.
+
+        Args:
+            max_size_bytes (int): The quota.
+            min_idle_seconds (float): Repositories accessed more recently are kept.
+            dry_run (bool): Only report what would be evicted.
+
+        Returns:
+            CollectionResult: The cache size before collection and what was evicted.
+        """
+        entries = self.list_entries()
+        result = CollectionResult(total_size=sum(e.size for e in entries))
+        remaining = result.total_size
+        now = time.time()
+        for entry in entries:
+            if remaining <= max_size_bytes:
+                break
+            if now - entry.last_access < min_idle_seconds or (not dry_run and not self.evict(entry)):
+                result.skipped.append(entry.name)
+                continue
+            result.evicted.append(entry.name)
+            result.freed += entry.size
+            remaining -= entry.size
+        if remaining > max_size_bytes:
+            logger.warning(
+                f"Cache at {self.data_folder} is {remaining / _GB:.2f} GB after collection, "
+                f"over its {max_size_bytes / _GB:.2f} GB quota"
+            )
+        return result
+
+def collect_garbage(
+    data_folder: Optional[str] = None,
+    max_size_gb: Optional[float] = None,
+    dry_run: bool = False,
+) -> Optional[CollectionResult]:
+    """
+    Enforce configs["cache_quota"], None if no quota is configured.
+    """
+    quota_config = configs["cache_quota"]
+    max_size_gb = max_size_gb if max_size_gb is not None else quota_config.get("max_size_gb")
+    if max_size_gb is None:
+        return None
+    return CacheManager(data_folder).collect(
+        int(max_size_gb * _GB),
+        min_idle_seconds=quota_config.get("min_idle_seconds", 0),
+        dry_run=dry_run,
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--data-folder", default=None, help="Defaults to $DATA_FOLDER or ./data")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List cached repositories, least recently used first")
+    collect_parser = subparsers.add_parser("collect", help="Evict repositories to enforce the quota")
+    collect_parser.add_argument("--max-size-gb", type=float, default=None,
+                                help="Defaults to configs['cache_quota']['max_size_gb'] ($BIOGUIDER_CACHE_MAX_GB)")
+    collect_parser.add_argument("--dry-run", action="store_true")
+    evict_parser = subparsers.add_parser("evict", help="Evict repositories, unless in use")
+    evict_parser.add_argument("names", nargs="+")
+    args = parser.parse_args(argv)
+
+    manager = CacheManager(args.data_folder)
+    if args.command == "list":
+        entries = manager.list_entries()
+        for entry in entries:
+            last_access = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.last_access))
+            print(f"{entry.size / _GB:10.3f} GB  {last_access}  {entry.name}")
+        print(f"{sum(e.size for e in entries) / _GB:10.3f} GB  total")
+        return 0
+    if args.command == "collect":
+        result = collect_garbage(args.data_folder, args.max_size_gb, args.dry_run)
+        if result is None:
+            print("No quota configured, pass --max-size-gb or set BIOGUIDER_CACHE_MAX_GB", file=sys.stderr)
+            return 2
+        action = "Would evict" if args.dry_run else "Evicted"
+        print(f"{action} {len(result.evicted)} repositories, {result.freed / _GB:.3f} GB "
+              f"of {result.total_size / _GB:.3f} GB: {', '.join(result.evicted) or '-'}")
+        if result.skipped:
+            print(f"Skipped, in use or accessed recently: {', '.join(result.skipped)}")
+        return 0
+    entries = {entry.name: entry for entry in manager.list_entries()}
+    status = 0
+    for name in args.names:
+        if name not in entries:
+            print(f"{name} is not cached", file=sys.stderr)
+            status = 1
+        elif not manager.evict(entries[name]):
+            print(f"{name} is in use", file=sys.stderr)
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import re
+import zlib
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document, RetrieverOutput
+
+from .config import configs
+
+logger = logging.getLogger(__name__)
+
+# meta_data key of the locations of the copies of a chunk that were not stored
+DUPLICATE_LOCATIONS_KEY = "duplicate_locations"
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_MINHASH_PRIME = (1 << 31) - 1
+
+def get_chunk_hash(text: str) -> str:
+    """The hash of a chunk text, ignoring differences in whitespace."""
+    normalized = _WHITESPACE_PATTERN.sub(" ", text or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def get_location(doc: Document) -> dict:
+    """The location of a chunk: the file-level meta_data of its source and its order in the file."""
+    location = {k: v for k, v in (doc.meta_data or {}).items() if k != DUPLICATE_LOCATIONS_KEY}
+    location["order"] = doc.order
+    return location
+
+def drop_removed_locations(doc: Document, removed_paths: set) -> Optional[Document]:
+    """
+    Drop the locations of a stored chunk that come from removed_paths. If the chunk's
+    own file was removed, the first remaining copy takes its place.
+
+    Returns:
+        Document | None: The updated chunk, None if no location remains.
+    """
+    meta_data = doc.meta_data or {}
+    locations = [
+        location for location in meta_data.get(DUPLICATE_LOCATIONS_KEY) or []
+        if location.get("file_path") not in removed_paths
+    ]
+    if meta_data.get("file_path") in removed_paths:
+        if not locations:
+            return None
+        promoted = dict(locations.pop(0))
+        doc.order = promoted.pop("order", doc.order)
+        meta_data = promoted
+    else:
+        meta_data = {k: v for k, v in meta_data.items() if k != DUPLICATE_LOCATIONS_KEY}
+    if locations:
+        meta_data[DUPLICATE_LOCATIONS_KEY] = locations
+    doc.meta_data = meta_data
+    return doc
+
+def deduplicate_retriever_output(output: RetrieverOutput) -> RetrieverOutput:
+    """
+    Drop the retrieved chunks whose text repeats a better-ranked chunk, e.g. in
+    corpora built without deduplication. The output must have its documents.
+    """
+    seen, kept = set(), []
+    for position, doc in enumerate(output.documents or []):
+        chunk_hash = get_chunk_hash(doc.text)
+        if chunk_hash not in seen:
+            seen.add(chunk_hash)
+            kept.append(position)
+    if len(kept) < len(output.documents or []):
+        output.doc_indices = [output.doc_indices[position] for position in kept]
+        output.doc_scores = [output.doc_scores[position] for position in kept] if output.doc_scores else output.doc_scores
+        output.documents = [output.documents[position] for position in kept]
+    return output
+
+def apply_duplicate_locations(
+    documents: Sequence[Document], duplicate_locations: Dict[str, List[dict]]
+) -> None:
+    """Add the locations of the dropped copies to the meta_data of the stored chunks, in place."""
+    if not duplicate_locations:
+        return
+    for doc in documents:
+        locations = duplicate_locations.get(doc.id)
+        if locations:
+            # splitters share one meta_data dict between the chunks of a document
+            doc.meta_data = dict(doc.meta_data or {})
+            doc.meta_data[DUPLICATE_LOCATIONS_KEY] = list(doc.meta_data.get(DUPLICATE_LOCATIONS_KEY) or []) + locations
+
+class MinHashLSH:
+    """
+    Near-duplicate detection: MinHash signatures of word shingles, bucketed by
+    bands (locality-sensitive hashing). Candidates sharing a band are confirmed
+    when their estimated Jaccard similarity reaches the threshold.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 0,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.int64)
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        words = text.split()
+        size = min(self.shingle_size, max(len(words), 1))
+        shingles = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.int64, count=len(shingles)
+        ) % _MINHASH_PRIME
+        return ((hashes[:, None] * self._a[None, :] + self._b[None, :]) % _MINHASH_PRIME).min(axis=0)
+
+    def _bands(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    def query(self, signature: np.ndarray) -> Optional[str]:
+        """The key of an indexed near-duplicate of the signature, if any."""
+        for band, bucket in zip(self._bands(signature), self._buckets):
+            for key in bucket.get(band, ()):
+                if np.mean(self._signatures[key] == signature) >= self.threshold:
+                    return key
+        return None
+
+    def insert(self, key: str, signature: np.ndarray):
+        self._signatures[key] = signature
+        for band, bucket in zip(self._bands(signature), self._buckets):
+            bucket[band].append(key)
+
+class ChunkDeduplicator(DataComponent):
+    r"""
+    Drop the chunks whose text was already seen, before they are embedded. Chunks
+    are compared by the hash of their whitespace-normalized text and, with
+    near_duplicates, by MinHash similarity.
+
+    The deduplicator is stateful: one instance deduplicates a whole ingestion,
+    batch after batch. The locations of the dropped copies are collected in
+    duplicate_locations, keyed by the id of the stored chunk, since that chunk
+    may already have been written in a previous batch.
+    """
+
+    def __init__(
+        self,
+        near_duplicates: bool = False,
+        minhash_threshold: float = 0.9,
+        minhash_num_perm: int = 128,
+        minhash_bands: int = 32,
+        shingle_size: int = 5,
+    ):
+        super().__init__()
+        self.near_duplicates = near_duplicates
+        self.minhash_threshold = minhash_threshold
+        self.minhash_num_perm = minhash_num_perm
+        self.minhash_bands = minhash_bands
+        self.shingle_size = shingle_size
+        self.reset()
+
+    def reset(self):
+        self._ids_by_hash: Dict[str, str] = {}
+        self._lsh = MinHashLSH(
+            threshold=self.minhash_threshold,
+            num_perm=self.minhash_num_perm,
+            bands=self.minhash_bands,
+            shingle_size=self.shingle_size,
+        ) if self.near_duplicates else None
+        self.duplicate_locations: Dict[str, List[dict]] = defaultdict(list)
+        self.num_duplicates = 0
+
+    def _find(self, doc: Document) -> Optional[str]:
+        """The id of the stored copy of a chunk, registering the chunk if it is new."""
+        chunk_hash = get_chunk_hash(doc.text)
+        stored_id = self._ids_by_hash.get(chunk_hash)
+        if stored_id is not None:
+            return stored_id
+        if self._lsh is not None:
+            signature = self._lsh.signature(doc.text)
+            stored_id = self._lsh.query(signature)
+            if stored_id is not None:
+                return stored_id
+            self._lsh.insert(doc.id, signature)
+        self._ids_by_hash[chunk_hash] = doc.id
+        return None
+
+    def seed(self, documents: Sequence[Document]):
+        """Register chunks that are already stored, e.g. the kept chunks of an incremental update."""
+        for doc in documents:
+            self._find(doc)
+
+    def call(self, documents: Sequence[Document]) -> List[Document]:
+        unique_docs = []
+        for doc in documents:
+            stored_id = self._find(doc)
+            if stored_id is None:
+                unique_docs.append(doc)
+            else:
+                self.duplicate_locations[stored_id].append(get_location(doc))
+                self.num_duplicates += 1
+        if len(unique_docs) < len(documents):
+            logger.info(f"Dropped {len(documents) - len(unique_docs)} duplicate chunks out of {len(documents)}")
+        return unique_docs
+
+    def _extra_repr(self) -> str:
+        s = f"near_duplicates={self.near_duplicates}, minhash_threshold={self.minhash_threshold}"
+        return s
+
+def create_chunk_deduplicator() -> Optional[ChunkDeduplicator]:
+    """Create the deduplicator configured in configs["deduplication"], None if it is disabled."""
+    dedup_config = configs.get("deduplication", {})
+    if not dedup_config.get("enabled", False):
+        return None
+    return ChunkDeduplicator(
+        near_duplicates=dedup_config.get("near_duplicates", False),
+        minhash_threshold=dedup_config.get("minhash_threshold", 0.9),
+        minhash_num_perm=dedup_config.get("minhash_num_perm", 128),
+        minhash_bands=dedup_config.get("minhash_bands", 32),
+        shingle_size=dedup_config.get("shingle_size", 5),
+    )
@@ -0,0 +1,234 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document
+
+from ..utils.python_file_handler import PythonFileHandler
+from ..utils.r_file_handler import RFileHandler
+from .token_splitter import TokenTextSplitter
+from .tokenizer import count_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+# File handlers producing symbol boundaries, by lowercase file extension
+CODE_FILE_HANDLERS = {
+    ".py": PythonFileHandler,
+    ".r": RFileHandler,
+}
+
+@dataclass
+class CodeSymbol:
+    name: str
+    parent: Optional[str]
+    start_line: int
+    end_line: int
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "parent": self.parent, "start_line": self.start_line, "end_line": self.end_line}
+
+@dataclass
+class CodeChunk:
+    """A range of lines (1-based, inclusive) and the symbols it holds."""
+    start_line: int
+    end_line: int
+    num_tokens: int
+    symbols: List[CodeSymbol] = field(default_factory=list)
+    # set for the pieces of a single line too long for one chunk
+    text: Optional[str] = None
+
+class CodeTextSplitter(DataComponent):
+    r"""
+    Split code documents along their symbols: one chunk per function, class or
+    method, as reported by PythonFileHandler and RFileHandler.
+
+    - Symbols up to chunk_size tokens make one chunk. Larger classes are split
+      into their methods, larger functions into windows of whole lines.
+    - Code between symbols (imports, module-level statements) makes chunks of its own.
+    - Chunks under min_chunk_size tokens, e.g. decorators, comments and short
+      functions, are merged with their neighbours up to chunk_size tokens.
+
+    Every chunk carries "symbol", "parent", "start_line" and "end_line" in its
+    meta_data, plus all its symbols in "symbols", so a hit maps to CodeStructureDb
+    rows (name, parent, path, start_lineno, end_lineno). Chunks of whole symbols
+    need no overlap. Other documents, and files that cannot be parsed, are split
+    by token_splitter.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        min_chunk_size: int = 256,
+        model: Optional[str] = None,
+    ):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.model = model
+        self.token_splitter = TokenTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, model=model)
+
+    def get_symbols(self, file_path: str, text: str) -> Optional[List[CodeSymbol]]:
+        """
+        The symbols of a code file, None if the file type is not supported or the file cannot be parsed.
+        """
+        _, ext = os.path.splitext(file_path or "")
+        handler_class = CODE_FILE_HANDLERS.get(ext.lower())
+        if handler_class is None:
+            return None
+        try:
+            symbols = handler_class(file_path, content=text).get_functions_and_classes()
+        except Exception as e:
+            logger.warning(f"Unable to parse {file_path}, splitting it by tokens: {e}")
+            return None
+        return [
+            CodeSymbol(name=name, parent=parent, start_line=start_line, end_line=end_line)
+            for name, parent, start_line, end_line, *_ in symbols
+        ]
+
+    def split_code(self, text: str, symbols: List[CodeSymbol]) -> List[Tuple[str, CodeChunk]]:
+        """
+        Split a code text along its symbols.
+
+        Returns:
+            List[Tuple[str, CodeChunk]]: Every chunk text with its line range and symbols.
+        """
+        lines = text.splitlines(keepends=True)
+        if not lines:
+            return []
+        line_tokens = count_tokens_batch(lines, self.model)
+        prefix = [0]
+        for num_tokens in line_tokens:
+            prefix.append(prefix[-1] + num_tokens)
+
+        def _tokens(start_line: int, end_line: int) -> int:
+            return prefix[end_line] - prefix[start_line - 1]
+
+        def _windows(start_line: int, end_line: int, owner: Optional[CodeSymbol]) -> List[CodeChunk]:
+            """Windows of whole lines up to chunk_size tokens, longer lines are split by tokens."""
+            owners = [owner] if owner is not None else []
+            chunks = []
+            window_start = start_line
+            for line in range(start_line, end_line + 1):
+                if line_tokens[line - 1] > self.chunk_size:
+                    if window_start < line:
+                        chunks.append(CodeChunk(window_start, line - 1, _tokens(window_start, line - 1), owners))
+                    chunks.extend(
+                        CodeChunk(line, line, num_tokens, owners, text=piece)
+                        for piece, num_tokens in self.token_splitter.split_text(lines[line - 1])
+                    )
+                    window_start = line + 1
+                elif _tokens(window_start, line) > self.chunk_size:
+                    chunks.append(CodeChunk(window_start, line - 1, _tokens(window_start, line - 1), owners))
+                    window_start = line
+            if window_start <= end_line:
+                chunks.append(CodeChunk(window_start, end_line, _tokens(window_start, end_line), owners))
+            return chunks
+
+        def _span(start_line: int, end_line: int, owner: Optional[CodeSymbol]) -> List[CodeChunk]:
+            if "".join(lines[start_line - 1:end_line]).strip() == "":
+                return []
+            if _tokens(start_line, end_line) > self.chunk_size:
+                return _windows(start_line, end_line, owner)
+            return [CodeChunk(start_line, end_line, _tokens(start_line, end_line), [owner] if owner else [])]
+
+        def _partition(
+            start_line: int, end_line: int, candidates: List[CodeSymbol], owner: Optional[CodeSymbol]
+        ) -> List[CodeChunk]:
+            # outermost symbols of the range, in order; overlapping symbols are ignored
+            outer, last_end = [], start_line - 1
+            for symbol in candidates:
+                if symbol.start_line > last_end and start_line <= symbol.start_line and symbol.end_line <= end_line:
+                    outer.append(symbol)
+                    last_end = symbol.end_line
+            chunks, cursor = [], start_line
+            for symbol in outer:
+                chunks.extend(_span(cursor, symbol.start_line - 1, owner))
+                children = [
+                    child for child in candidates
+                    if symbol.start_line <= child.start_line and child.end_line <= symbol.end_line
+                    and (child.start_line, child.end_line) != (symbol.start_line, symbol.end_line)
+                ]
+                if owner is None and children and _tokens(symbol.start_line, symbol.end_line) > self.chunk_size:
+                    # a large class: its methods make chunks, the code between them belongs to the class
+                    chunks.extend(_partition(symbol.start_line, symbol.end_line, children, symbol))
+                else:
+                    chunks.extend(_span(symbol.start_line, symbol.end_line, symbol))
+                cursor = symbol.end_line + 1
+            chunks.extend(_span(cursor, end_line, owner))
+            return chunks
+
+        symbols = sorted(
+            (
+                CodeSymbol(s.name, s.parent, max(1, s.start_line), min(len(lines), s.end_line))
+                for s in symbols
+            ),
+            key=lambda s: (s.start_line, -s.end_line),
+        )
+        symbols = [s for s in symbols if s.start_line <= s.end_line]
+        chunks = self._merge_small_chunks(_partition(1, len(lines), symbols, None), _tokens)
+        return [
+            (chunk.text if chunk.text is not None else "".join(lines[chunk.start_line - 1:chunk.end_line]), chunk)
+            for chunk in chunks
+        ]
+
+    def _merge_small_chunks(self, chunks: List[CodeChunk], count_tokens) -> List[CodeChunk]:
+        merged: List[CodeChunk] = []
+        for chunk in chunks:
+            previous = merged[-1] if merged else None
+            if (
+                previous is not None
+                and previous.text is None and chunk.text is None
+                and (previous.num_tokens < self.min_chunk_size or chunk.num_tokens < self.min_chunk_size)
+                and count_tokens(previous.start_line, chunk.end_line) <= self.chunk_size
+            ):
+                merged[-1] = CodeChunk(
+                    previous.start_line,
+                    chunk.end_line,
+                    count_tokens(previous.start_line, chunk.end_line),
+                    previous.symbols + [s for s in chunk.symbols if s not in previous.symbols],
+                )
+            else:
+                merged.append(chunk)
+        return merged
+
+    def call(self, documents: List[Document]) -> List[Document]:
+        split_docs = []
+        num_code_documents = 0
+        for doc in documents:
+            if doc.text is None:
+                raise ValueError(f"Text should not be None. Doc id: {doc.id}")
+            meta_data = doc.meta_data or {}
+            symbols = self.get_symbols(meta_data.get("file_path"), doc.text)
+            if not symbols:
+                split_docs.extend(self.token_splitter([doc]))
+                continue
+            num_code_documents += 1
+            for i, (text, chunk) in enumerate(self.split_code(doc.text, symbols)):
+                first_symbol = chunk.symbols[0] if chunk.symbols else None
+                chunk_meta_data: Dict = {
+                    **meta_data,
+                    "symbol": first_symbol.name if first_symbol else None,
+                    "parent": first_symbol.parent if first_symbol else None,
+                    "start_line": chunk.start_line,
+                    "end_line": chunk.end_line,
+                    "symbols": [symbol.to_dict() for symbol in chunk.symbols],
+                }
+                split_docs.append(Document(
+                    text=text,
+                    meta_data=chunk_meta_data,
+                    parent_doc_id=f"{doc.id}",
+                    order=i,
+                    vector=[],
+                    estimated_num_tokens=chunk.num_tokens,
+                ))
+        logger.info(
+            f"Split {len(documents)} documents ({num_code_documents} by symbol) into {len(split_docs)} chunks"
+        )
+        return split_docs
+
+    def _extra_repr(self) -> str:
+        s = f"chunk_size={self.chunk_size}, min_chunk_size={self.min_chunk_size}"
+        return s
@@ -28,7 +28,14 @@ DEFAULT_EXCLUDED_FILES: List[str] = [
 
 configs = {
     "embedder": {
-        "batch_size": 500,
+        # "openai": OpenAI, or Azure OpenAI with OPENAI_API_TYPE=azure
+        # "local": deterministic hashing-trick embeddings computed in process, for
+        #          offline runs and benchmarks, see local_embedder.py
+        "backend": os.environ.get("BIOGUIDER_EMBEDDER_BACKEND", "openai"),
+        # Maximum number of texts per embedding request
+        "batch_size": 2048,
+        # Requests are packed with chunks up to this many tokens
+        "max_batch_tokens": 250000,
         "model_client": OpenAIClient,
         "model_kwargs": {
             "model": "text-embedding-3-small",
@@ -36,9 +43,127 @@ configs = {
             "encoding_format": "float",
         },
     },
+    "embedding_cache": {
+        # Disk-backed cache of chunk embeddings shared across repositories and runs,
+        # stored in {DATA_FOLDER}/.adalflow/embedding_cache.db unless "path" is set
+        "enabled": True,
+        "path": None,
+        "max_size_mb": 1024,
+    },
+    "embedding_executor": {
+        # Number of embedding batches in flight
+        "max_concurrency": 4,
+        # Client-side limits, None disables them
+        "requests_per_minute": None,
+        "tokens_per_minute": None,
+        # Retries of rate-limited (429) and transient failures, with exponential backoff
+        "max_retries": 6,
+        "backoff_base": 1.0,
+        "backoff_max": 60.0,
+    },
+    "ingestion": {
+        # Threads reading and tokenizing files
+        "max_workers": 8,
+        # Files read ahead of the splitter and embedder
+        "prefetch_files": 256,
+        # Documents are split and embedded in batches of at most this many tokens and documents
+        "batch_tokens": 1000000,
+        "batch_documents": 2000,
+    },
+    "deduplication": {
+        # Chunks with the same text (ignoring whitespace) are stored and embedded once,
+        # with the locations of their copies in meta_data["duplicate_locations"]
+        "enabled": True,
+        # Also drop near-duplicate chunks, detected with MinHash LSH over word shingles
+        "near_duplicates": False,
+        "minhash_threshold": 0.9,
+        "minhash_num_perm": 128,
+        "minhash_bands": 32,
+        "shingle_size": 5,
+    },
+    "repo_cache": {
+        # Clones in {DATA_FOLDER}/.adalflow/repos are shallow and fetch no blobs
+        # outside the checkout; None clones the full history
+        "depth": 1,
+        "filter": "blob:none",
+        # Refresh existing checkouts with git fetch + reset, at most once per
+        # refresh_interval seconds
+        "refresh": True,
+        "refresh_interval": 600,
+        "submodules": True,
+    },
+    "cache_quota": {
+        # Disk quota for the per-repository assets under DATA_FOLDER (clones, RAG
+        # databases, code structure and summary databases); None disables eviction
+        "max_size_gb": float(os.environ["BIOGUIDER_CACHE_MAX_GB"]) if os.environ.get("BIOGUIDER_CACHE_MAX_GB") else None,
+        # Evict least recently used repositories before each EvaluationManager.prepare_repo
+        "collect_before_prepare": True,
+        # Repositories accessed within this many seconds are never evicted
+        "min_idle_seconds": 300,
+    },
+    "database": {
+        # "mmap": vectors in a float32 .npy opened with mmap, chunks read lazily (default)
+        # "pickle": the whole adalflow LocalDB pickled in one file
+        "format": "mmap",
+    },
     "retriever": {
         "top_k": 20,
     },
+    "retrieval": {
+        # "vector": FAISS over the chunk embeddings
+        # "hybrid": FAISS and BM25 rankings fused with reciprocal rank fusion
+        # "lexical": BM25 only, corpora are built without embeddings and queries
+        #            need no network call
+        "mode": os.environ.get("BIOGUIDER_RETRIEVAL_MODE", "vector"),
+        # Candidates taken from each ranking before fusion, as a multiple of top_k
+        "candidates_factor": 2,
+        "rrf_k": 60,
+        "lexical_weight": 1.0,
+        "vector_weight": 1.0,
+        # Persist BM25 indexes next to the corpus, keyed by corpus fingerprint
+        "persist_bm25": True,
+    },
+    "rag_collection": {
+        # Batches of retrieved documents judged by the LLM at the same time
+        "max_concurrency": 4,
+        # Retrieved documents scoring at least "accept" are relevant, and those
+        # under "reject" are not, without asking the LLM; None disables a threshold.
+        # Scores are on the scale of the retrieval mode, hence thresholds per mode:
+        # - vector: FAISSRetriever scores, probabilities in [0, 1] with the "prob" metric
+        # - hybrid: reciprocal rank fusion, at most
+        #           (vector_weight + lexical_weight) / (rrf_k + 1), about 0.033
+        # - lexical: BM25 scores, unbounded and dependent on the corpus
+        "score_thresholds": {
+            "vector": {"accept": None, "reject": None},
+            "hybrid": {"accept": None, "reject": None},
+            "lexical": {"accept": None, "reject": None},
+        },
+    },
+    "faiss_index": {
+        # Persist built FAISS indexes next to the corpus, keyed by corpus fingerprint
+        "persist": True,
+        # Memory-map persisted indexes instead of reading them into memory
+        "mmap": False,
+        # The recall@top_k approximate (IVF) indexes are calibrated to reach;
+        # 0.99 and more always selects the exact flat index
+        "recall_target": 0.95,
+        # Corpora up to this many chunks use an exact flat index
+        "flat_max_vectors": 100_000,
+        # Corpora up to this many chunks use IVF-Flat, larger ones IVF-SQ8 or IVF-PQ
+        "ivf_flat_max_vectors": 1_000_000,
+        # IVF indexes are trained on up to this many vectors per inverted list
+        "train_vectors_per_list": 64,
+        # Number of sample queries used to calibrate nprobe
+        "calibration_queries": 256,
+        # A FAISS index_factory description (e.g. "IVF4096,PQ32") overriding the choice above
+        "factory": None,
+    },
+    "index_registry": {
+        # Loaded corpora (chunk offsets, FAISS and BM25 indexes) are shared by the RAG
+        # instances of a process; least recently used ones are dropped above this
+        # budget and reloaded from disk on demand. None keeps every corpus loaded.
+        "max_memory_mb": float(os.environ["BIOGUIDER_INDEX_MEMORY_MB"]) if os.environ.get("BIOGUIDER_INDEX_MEMORY_MB") else 4096,
+    },
     "generator": {
         "model_client": GoogleGenAIClient,
         "model_kwargs": {
@@ -48,9 +173,15 @@ configs = {
         },
     },
     "text_splitter": {
-        "split_by": "word",
-        "chunk_size": 350,
-        "chunk_overlap": 100,
+        # "token" splits in tokenizer units with TokenTextSplitter, other values
+        # ("word", "sentence"...) use adalflow's TextSplitter
+        "split_by": "token",
+        "chunk_size": 512,
+        "chunk_overlap": 64,
+        # With split_by="token", Python and R files are split along their functions,
+        # classes and methods; chunks under min_code_chunk_size tokens are merged
+        "split_code_by_symbol": True,
+        "min_code_chunk_size": 256,
     },
     "file_filters": {
         "excluded_dirs": [
@@ -88,10 +219,36 @@ configs = {
     },
 }
 
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical")
+
+def get_retrieval_mode() -> str:
+    mode = configs["retrieval"]["mode"]
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode}, expected one of {RETRIEVAL_MODES}")
+    return mode
+
+def get_collection_score_thresholds(mode: str) -> tuple:
+    """The (accept, reject) retrieval scores of RAG collection in a retrieval mode, None when disabled."""
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode}, expected one of {RETRIEVAL_MODES}")
+    thresholds = configs["rag_collection"]["score_thresholds"].get(mode) or {}
+    return thresholds.get("accept"), thresholds.get("reject")
+
+EMBEDDER_BACKENDS = ("openai", "local")
+
+def get_embedder_backend() -> str:
+    backend = configs["embedder"]["backend"]
+    if backend not in EMBEDDER_BACKENDS:
+        raise ValueError(f"Unknown embedder backend {backend}, expected one of {EMBEDDER_BACKENDS}")
+    return backend
+
 def get_embedder_config():
     return configs["embedder"]
 
 def create_model_client():
+    if get_embedder_backend() == "local":
+        from .local_embedder import HashingEmbeddingClient
+        return HashingEmbeddingClient()
     openai_type = os.environ.get("OPENAI_API_TYPE")
     is_azure = openai_type == "azure" if openai_type is not None else False
     if not is_azure:
@@ -102,6 +259,12 @@ def create_model_client():
         azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT"),
     )
 def create_model_kwargs():
+    if get_embedder_backend() == "local":
+        from .local_embedder import LOCAL_EMBEDDING_MODEL
+        return {
+            "model": LOCAL_EMBEDDING_MODEL,
+            "dimensions": 256,
+        }
     openai_type = os.environ.get("OPENAI_API_TYPE")
     is_azure = openai_type == "azure" if openai_type is not None else False
     if not is_azure:
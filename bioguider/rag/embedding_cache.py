@@ -0,0 +1,270 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from copy import deepcopy
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.component import DataComponent
+from adalflow.core.embedder import Embedder
+from adalflow.core.types import Document
+
+from ..utils.file_utils import retrieve_data_root_path
+from .config import configs
+from .embedding_executor import EmbeddingExecutor
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_TABLE_NAME = "EmbeddingCache"
+
+embedding_cache_create_table_query = f"""
+CREATE TABLE IF NOT EXISTS {EMBEDDING_CACHE_TABLE_NAME} (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+embedding_cache_create_index_query = f"""
+CREATE INDEX IF NOT EXISTS idx_{EMBEDDING_CACHE_TABLE_NAME}_last_access
+ON {EMBEDDING_CACHE_TABLE_NAME}(last_access);
+"""
+embedding_cache_upsert_query = f"""
+INSERT INTO {EMBEDDING_CACHE_TABLE_NAME}(key, vector, nbytes, last_access)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET vector=excluded.vector, nbytes=excluded.nbytes, last_access=excluded.last_access;
+"""
+embedding_cache_touch_query = f"""
+UPDATE {EMBEDDING_CACHE_TABLE_NAME} SET last_access = ? WHERE key = ?;
+"""
+embedding_cache_size_query = f"""
+SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM {EMBEDDING_CACHE_TABLE_NAME};
+"""
+embedding_cache_lru_query = f"""
+SELECT key, nbytes FROM {EMBEDDING_CACHE_TABLE_NAME} ORDER BY last_access ASC;
+"""
+embedding_cache_delete_query = f"""
+DELETE FROM {EMBEDDING_CACHE_TABLE_NAME} WHERE key = ?;
+"""
+
+# sqlite limits the number of host parameters in one statement
+_SELECT_CHUNK_SIZE = 500
+# put_many calls between two reads of the cache size, which other processes change too
+_SIZE_RESYNC_INTERVAL = 100
+
+def get_embedding_cache_path() -> str:
+    """Get the default path of the embedding cache, shared by all repositories."""
+    return str(retrieve_data_root_path() / "embedding_cache.db")
+
+class EmbeddingCache:
+    """
+    A disk-backed, content-addressed cache of embedding vectors.
+
+    Vectors are keyed by hash(text, model, dimensions) and stored as float32 blobs in
+    a SQLite file, so identical chunks are embedded once across repositories and runs.
+    When the cache grows over max_size_mb, the least recently used vectors are evicted.
+    """
+
+    def __init__(self, db_path: str | None = None, max_size_mb: float = 1024):
+        self.db_path = db_path if db_path is not None else get_embedding_cache_path()
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        # the size of the cache, read from the table then kept up to date by put_many
+        self._total_bytes: int | None = None
+        self._puts_since_resync = 0
+
+    def __getstate__(self):
+        # the connection and lock can't be pickled, they are recreated on demand
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_lock"] = None
+        state["_total_bytes"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text: str, model: str | None, dimensions: int | None) -> str:
+        sha = hashlib.sha256()
+        sha.update(f"{model}\x00{dimensions}\x00".encode("utf-8"))
+        sha.update(text.encode("utf-8"))
+        return sha.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(embedding_cache_create_table_query)
+        connection.execute(embedding_cache_create_index_query)
+        connection.commit()
+        self._connection = connection
+        return connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Look up vectors by key, counting hits and misses.
+
+        Returns:
+            dict: key -> vector for every key found in the cache.
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+        with self._lock:
+            connection = self._connect()
+            for i in range(0, len(keys), _SELECT_CHUNK_SIZE):
+                chunk = keys[i:i + _SELECT_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, vector FROM {EMBEDDING_CACHE_TABLE_NAME} WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                connection.executemany(
+                    embedding_cache_touch_query, [(now, key) for key in found]
+                )
+                connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, Sequence[float]]):
+        """Store vectors by key, then evict least recently used entries over the size cap."""
+        if not vectors:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(embedding_cache_upsert_query, rows)
+            connection.commit()
+            if self._total_bytes is None or self._puts_since_resync >= _SIZE_RESYNC_INTERVAL:
+                self._total_bytes = connection.execute(embedding_cache_size_query).fetchone()[1]
+                self._puts_since_resync = 0
+            else:
+                # overestimated when vectors are replaced, the exact size is read before evicting
+                self._total_bytes += sum(row[2] for row in rows)
+                self._puts_since_resync += 1
+            if self._total_bytes > self.max_size_bytes:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        _, total_bytes = connection.execute(embedding_cache_size_query).fetchone()
+        self._total_bytes = total_bytes
+        self._puts_since_resync = 0
+        if total_bytes <= self.max_size_bytes:
+            return
+        # evict down to 90% of the cap so that eviction doesn't run on every insert
+        target = int(self.max_size_bytes * 0.9)
+        evicted = []
+        cursor = connection.execute(embedding_cache_lru_query)
+        for key, nbytes in cursor:
+            if total_bytes <= target:
+                break
+            evicted.append((key,))
+            total_bytes -= nbytes
+        cursor.close()
+        connection.executemany(embedding_cache_delete_query, evicted)
+        connection.commit()
+        self._total_bytes = total_bytes
+        logger.info(f"Evicted {len(evicted)} vectors from embedding cache {self.db_path}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size_bytes = self._connect().execute(embedding_cache_size_query).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_bytes": size_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+def create_embedding_cache() -> Optional[EmbeddingCache]:
+    """Create the embedding cache from configs, or None if it is disabled."""
+    cache_config = configs.get("embedding_cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+    return EmbeddingCache(
+        db_path=cache_config.get("path"),
+        max_size_mb=cache_config.get("max_size_mb", 1024),
+    )
+
+class CachedToEmbeddings(DataComponent):
+    r"""
+    Embed a sequence of Documents, serving vectors from an EmbeddingCache.
+
+    Only texts missing from the cache are sent to the embedder, deduplicated and
+    packed into batches of batch_size, through an EmbeddingExecutor that may keep
+    several batches in flight. Like ToEmbeddings, it operates on a copy of the input data.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        batch_size: int = 500,
+        cache: EmbeddingCache | None = None,
+        executor: EmbeddingExecutor | None = None,
+    ) -> None:
+        super().__init__(batch_size=batch_size)
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.cache = cache
+        self.executor = executor or EmbeddingExecutor(embedder, batch_size=batch_size)
+
+    def _embed(self, texts: List[str], token_counts: Optional[List[int]] = None) -> List[List[float]]:
+        if token_counts is not None and any(count is None for count in token_counts):
+            token_counts = None
+        return self.executor.embed(texts, token_counts)
+
+    def __call__(self, input: Sequence[Document]) -> Sequence[Document]:
+        output = deepcopy(input)
+        model = self.embedder.model_kwargs.get("model")
+        dimensions = self.embedder.model_kwargs.get("dimensions")
+        keys = [EmbeddingCache.make_key(doc.text, model, dimensions) for doc in output]
+
+        vectors = self.cache.get_many(keys) if self.cache is not None else {}
+        num_cached = sum(1 for key in keys if key in vectors)
+        missing = {key: doc for key, doc in zip(keys, output) if key not in vectors}
+        if missing:
+            missing_keys = list(missing.keys())
+            new_vectors = dict(zip(missing_keys, self._embed(
+                [missing[k].text for k in missing_keys],
+                [missing[k].estimated_num_tokens for k in missing_keys],
+            )))
+            if self.cache is not None:
+                self.cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+        logger.info(
+            f"Embedded {len(output)} documents: {num_cached} from cache, "
+            f"{len(missing)} unique texts sent to the embedder"
+        )
+        for key, doc in zip(keys, output):
+            doc.vector = vectors[key]
+        return output
+
+    def _extra_repr(self) -> str:
+        s = f"batch_size={self.batch_size}, max_concurrency={self.executor.max_concurrency}"
+        return s
@@ -0,0 +1,210 @@
+import re
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from adalflow.core.embedder import Embedder
+
+from .config import configs
+from .tokenizer import count_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: rate limits, server-side failures and dropped connections
+RETRYABLE_ERROR_PATTERN = re.compile(
+    r"\b(429|500|502|503|504)\b|rate.?limit|timed? ?out|connection",
+    re.IGNORECASE,
+)
+
+def pack_batches(
+    token_counts: List[int],
+    max_batch_size: int,
+    max_batch_tokens: Optional[int] = None,
+) -> List[range]:
+    """
+    Pack consecutive texts into batches of at most max_batch_size texts and
+    max_batch_tokens tokens. A text over max_batch_tokens gets a batch of its own.
+
+    Args:
+        token_counts (List[int]): The number of tokens of every text.
+        max_batch_size (int): The maximum number of texts per batch.
+        max_batch_tokens (int, optional): The maximum number of tokens per batch.
+
+    Returns:
+        List[range]: The indices of the texts of every batch, in order.
+    """
+    batches = []
+    start, batch_tokens = 0, 0
+    for ix, num_tokens in enumerate(token_counts):
+        is_full = ix - start >= max_batch_size or (
+            max_batch_tokens is not None and batch_tokens + num_tokens > max_batch_tokens
+        )
+        if is_full and ix > start:
+            batches.append(range(start, ix))
+            start, batch_tokens = ix, 0
+        batch_tokens += num_tokens
+    if start < len(token_counts):
+        batches.append(range(start, len(token_counts)))
+    return batches
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at rate_per_minute, holding
+    at most one minute worth of tokens. A rate of None or 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute: Optional[float] = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute or 0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rate_per_minute)
+
+    def acquire(self, amount: float = 1.0):
+        """
+        Block until amount tokens are available and take them. Amounts larger than
+        the bucket capacity wait for a full bucket instead of blocking forever.
+        """
+        if not self.enabled:
+            return
+        amount = min(float(amount), self.capacity)
+        rate_per_second = self.rate_per_minute / 60.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * rate_per_second)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / rate_per_second
+            time.sleep(wait)
+
+class EmbeddingExecutor:
+    r"""
+    Embed texts in batches with up to max_concurrency requests in flight. Batches
+    hold at most batch_size texts and, if set, max_batch_tokens tokens.
+
+    Every request first takes one token from the requests/min bucket and the
+    batch token count from the tokens/min bucket. Rate-limited (429) and other
+    transient failures are retried with exponential backoff and jitter. The
+    returned vectors are in the order of the input texts.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        batch_size: int = 500,
+        max_batch_tokens: Optional[int] = None,
+        max_concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @staticmethod
+    def is_retryable_error(error: str) -> bool:
+        return RETRYABLE_ERROR_PATTERN.search(error or "") is not None
+
+    def _get_backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _embed_batch(self, batch: List[str], num_tokens: int) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self.request_bucket.acquire(1)
+            if self.token_bucket.enabled:
+                self.token_bucket.acquire(num_tokens)
+            output = self.embedder(input=batch)
+            if not output.error and len(output.data) == len(batch):
+                return [embedding.embedding for embedding in output.data]
+            if attempt >= self.max_retries or not self.is_retryable_error(output.error):
+                raise ValueError(f"Error embedding documents: {output.error}")
+            delay = self._get_backoff(attempt)
+            attempt += 1
+            logger.warning(
+                f"Embedding request failed ({output.error}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+    def embed(self, texts: List[str], token_counts: Optional[List[int]] = None) -> List[List[float]]:
+        """
+        Embed texts.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            token_counts (List[int], optional): The number of tokens of every text,
+                counted with tiktoken if needed and not provided.
+
+        Returns:
+            List[List[float]]: One vector per text, in order.
+        """
+        if token_counts is None and (self.max_batch_tokens is not None or self.token_bucket.enabled):
+            token_counts = count_tokens_batch(texts, self.embedder.model_kwargs.get("model"))
+        if token_counts is None:
+            token_counts = [0] * len(texts)
+        batches = [
+            ([texts[ix] for ix in indices], sum(token_counts[ix] for ix in indices))
+            for indices in pack_batches(token_counts, self.batch_size, self.max_batch_tokens)
+        ]
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} requests")
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            results = [self._embed_batch(batch, num_tokens) for batch, num_tokens in batches]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_concurrency, len(batches)),
+                thread_name_prefix="embedding",
+            ) as executor:
+                futures = [
+                    executor.submit(self._embed_batch, batch, num_tokens) for batch, num_tokens in batches
+                ]
+                try:
+                    results = [future.result() for future in futures]
+                except Exception:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+def create_embedding_executor(embedder: Embedder, batch_size: int) -> EmbeddingExecutor:
+    """Create the embedding executor configured in configs["embedding_executor"]."""
+    executor_config = configs.get("embedding_executor", {})
+    return EmbeddingExecutor(
+        embedder=embedder,
+        batch_size=batch_size,
+        max_batch_tokens=configs["embedder"].get("max_batch_tokens"),
+        max_concurrency=executor_config.get("max_concurrency", 1),
+        requests_per_minute=executor_config.get("requests_per_minute"),
+        tokens_per_minute=executor_config.get("tokens_per_minute"),
+        max_retries=executor_config.get("max_retries", 6),
+        backoff_base=executor_config.get("backoff_base", 1.0),
+        backoff_max=executor_config.get("backoff_max", 60.0),
+    )
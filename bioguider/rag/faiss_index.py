@@ -0,0 +1,391 @@
+import os
+import glob
+import json
+import math
+import hashlib
+import logging
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from adalflow.core.embedder import Embedder
+from adalflow.core.types import Document, RetrieverOutput
+from adalflow.components.retriever.faiss_retriever import FAISSRetriever
+
+from .config import configs
+from .vector_store import CompactDocuments, MmapVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Bump when the way indexes are built changes, so that persisted indexes are rebuilt
+FAISS_INDEX_VERSION = 2
+
+# Vectors are normalized and added to indexes in batches of this many rows
+ADD_BATCH_SIZE = 65536
+
+def get_corpus_fingerprint(documents: Sequence[Document]) -> str:
+    """
+    Get a fingerprint of a corpus, which changes whenever any chunk or vector changes.
+
+    Args:
+        documents (Sequence[Document]): The transformed documents, a MmapVectorStore or CompactDocuments.
+
+    Returns:
+        str: The hex digest of the corpus.
+    """
+    if isinstance(documents, (MmapVectorStore, CompactDocuments)) and documents.fingerprint is not None:
+        return documents.fingerprint
+    sha = hashlib.sha256()
+    for doc in documents:
+        sha.update(str(doc.id).encode("utf-8"))
+        sha.update(np.asarray(doc.vector, dtype=np.float32).tobytes())
+    return sha.hexdigest()
+
+def get_index_path(db_path: str, fingerprint: str, index_key: str) -> str:
+    """
+    Get the path of the persisted FAISS index of a corpus, next to its database.
+
+    Args:
+        db_path (str): The path of the corpus database.
+        fingerprint (str): The corpus fingerprint.
+        index_key (str): Describes how the index is built (index type, metric...).
+    """
+    key = hashlib.sha256(
+        f"{FAISS_INDEX_VERSION}:{index_key}:{fingerprint}".encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{os.path.splitext(db_path)[0]}.{key}.faiss"
+
+def save_faiss_index(index: faiss.Index, index_path: str):
+    """Atomically write a FAISS index and remove the indexes of older corpus versions."""
+    base_path = index_path[:-len(".faiss")].rsplit(".", 1)[0]
+    tmp_path = f"{index_path}.tmp.{os.getpid()}"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+    for stale_path in glob.glob(f"{glob.escape(base_path)}.*.faiss"):
+        if stale_path != index_path:
+            try:
+                os.remove(stale_path)
+            except OSError as e:
+                logger.warning(f"Unable to remove stale index {stale_path}: {e}")
+
+def load_faiss_index(index_path: str, mmap: bool = False) -> Optional[faiss.Index]:
+    """
+    Read a persisted FAISS index.
+
+    Args:
+        index_path (str): The index file.
+        mmap (bool): Map the index file read-only instead of reading it into memory.
+
+    Returns:
+        faiss.Index | None: None if the index doesn't exist or can't be read.
+    """
+    if not os.path.exists(index_path):
+        return None
+    try:
+        if mmap:
+            io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            return faiss.read_index(index_path, io_flags)
+        return faiss.read_index(index_path)
+    except Exception as e:
+        logger.error(f"Error reading FAISS index {index_path}: {e}")
+        return None
+
+def _get_vectors(documents: Sequence[Document]) -> np.ndarray:
+    if isinstance(documents, (MmapVectorStore, CompactDocuments)):
+        return documents.vectors
+    return np.asarray([doc.vector for doc in documents], dtype=np.float32)
+
+def _uses_inner_product(metric: str) -> bool:
+    return metric in ("cosine", "prob")
+
+def choose_index_factory(
+    num_vectors: int,
+    dimensions: int,
+    recall_target: float = 0.95,
+    flat_max_vectors: int = 100_000,
+    ivf_flat_max_vectors: int = 1_000_000,
+) -> str:
+    """
+    Choose a FAISS index_factory description for a corpus:
+
+    - Flat: exact search, for corpora up to flat_max_vectors or a recall target of 0.99 and more
+    - IVF-Flat: inverted lists of full vectors, up to ivf_flat_max_vectors
+    - IVF-SQ8: inverted lists of int8-quantized vectors (4x smaller), for recall targets of 0.9 and more
+    - IVF-PQ: inverted lists of product-quantized vectors (dimensions / 8 bytes each) otherwise
+
+    Args:
+        num_vectors (int): The number of vectors in the corpus.
+        dimensions (int): The vector dimensions.
+        recall_target (float): The recall@k the index should reach.
+        flat_max_vectors (int): The largest corpus searched exhaustively.
+        ivf_flat_max_vectors (int): The largest corpus indexed with full vectors.
+
+    Returns:
+        str: The description, e.g. "IVF2048,Flat".
+    """
+    if num_vectors <= flat_max_vectors or recall_target >= 0.99:
+        return "Flat"
+    # about 4 * sqrt(N) lists, each trained on at least 39 vectors
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+    if num_vectors <= ivf_flat_max_vectors:
+        return f"IVF{nlist},Flat"
+    if recall_target >= 0.9 or dimensions % 8 != 0:
+        return f"IVF{nlist},SQ8"
+    return f"IVF{nlist},PQ{dimensions // 8}"
+
+def _iter_vector_batches(
+    vectors: np.ndarray, normalize: bool, batch_size: int = ADD_BATCH_SIZE
+) -> Iterator[np.ndarray]:
+    """Yield float32 copies of consecutive rows, L2-normalized if needed, so that memory-mapped vectors are never modified."""
+    for start in range(0, vectors.shape[0], batch_size):
+        batch = np.array(vectors[start:start + batch_size], dtype=np.float32, copy=True)
+        if normalize:
+            faiss.normalize_L2(batch)
+        yield batch
+
+def _exact_search(queries: np.ndarray, vectors: np.ndarray, top_k: int, inner_product: bool) -> np.ndarray:
+    """Brute-force top_k indices of every query, streaming over the vectors in batches."""
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_indices = np.zeros((len(queries), 0), dtype=np.int64)
+    for batch_ix, batch in enumerate(_iter_vector_batches(vectors, normalize=inner_product)):
+        if inner_product:
+            scores = queries @ batch.T
+        else:
+            scores = -((queries ** 2).sum(axis=1)[:, None] - 2 * queries @ batch.T + (batch ** 2).sum(axis=1)[None, :])
+        indices = np.broadcast_to(np.arange(batch.shape[0]) + batch_ix * ADD_BATCH_SIZE, scores.shape)
+        scores = np.hstack([best_scores, scores])
+        indices = np.hstack([best_indices, indices])
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_indices = np.take_along_axis(indices, top, axis=1)
+    return best_indices
+
+def calibrate_nprobe(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    top_k: int,
+    recall_target: float,
+    num_queries: int = 256,
+    inner_product: bool = True,
+    seed: int = 0,
+) -> Tuple[int, float]:
+    """
+    Find the smallest nprobe (a power of two) of an IVF index whose recall@top_k,
+    against exact search, reaches recall_target, or where recall stops improving.
+    Queries are perturbed corpus vectors.
+
+    Returns:
+        Tuple[int, float]: The nprobe, set on the index, and its measured recall.
+    """
+    ivf = faiss.extract_index_ivf(index)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(vectors.shape[0], size=min(num_queries, vectors.shape[0]), replace=False))
+    queries = np.array(vectors[sample], dtype=np.float32, copy=True)
+    queries += rng.normal(scale=0.05 * float(np.abs(queries).mean()), size=queries.shape).astype(np.float32)
+    if inner_product:
+        faiss.normalize_L2(queries)
+    top_k = min(top_k, vectors.shape[0])
+    exact = _exact_search(queries, vectors, top_k, inner_product)
+
+    nprobe, recall = 1, 0.0
+    while True:
+        ivf.nprobe = nprobe
+        _, found = index.search(queries, top_k)
+        previous_recall, recall = recall, float(np.mean([
+            len(set(row_found.tolist()) & set(row_exact.tolist())) / top_k
+            for row_found, row_exact in zip(found, exact)
+        ]))
+        if recall >= recall_target or nprobe >= ivf.nlist:
+            return nprobe, recall
+        if nprobe > 1 and recall - previous_recall < 0.005:
+            # quantization error bounds the recall, probing more lists only slows queries down
+            ivf.nprobe = nprobe // 2
+            logger.warning(f"Recall target {recall_target} is out of reach, recall@{top_k} plateaus at {previous_recall:.3f}")
+            return nprobe // 2, previous_recall
+        nprobe = min(nprobe * 2, ivf.nlist)
+
+def train_faiss_index(
+    vectors: np.ndarray,
+    metric: str = "prob",
+    top_k: int = 20,
+    index_config: Optional[dict] = None,
+) -> faiss.Index:
+    """
+    Build a FAISS index over the vectors of a corpus, with the index type chosen
+    by choose_index_factory unless index_config["factory"] is set. IVF indexes are
+    trained on a sample of the vectors and their nprobe is calibrated to reach
+    the recall target.
+
+    Args:
+        vectors (np.ndarray): The (N, D) corpus vectors, possibly memory-mapped.
+        metric (str): The FAISSRetriever metric, "prob", "cosine" or "euclidean".
+        top_k (int): The number of retrieved chunks the recall target applies to.
+        index_config (dict, optional): Overrides configs["faiss_index"].
+
+    Returns:
+        faiss.Index: The trained and filled index.
+    """
+    index_config = {**configs["faiss_index"], **(index_config or {})}
+    num_vectors, dimensions = vectors.shape
+    recall_target = index_config["recall_target"]
+    factory = index_config.get("factory") or choose_index_factory(
+        num_vectors,
+        dimensions,
+        recall_target=recall_target,
+        flat_max_vectors=index_config["flat_max_vectors"],
+        ivf_flat_max_vectors=index_config["ivf_flat_max_vectors"],
+    )
+    inner_product = _uses_inner_product(metric)
+    index = faiss.index_factory(
+        dimensions, factory, faiss.METRIC_INNER_PRODUCT if inner_product else faiss.METRIC_L2
+    )
+    if not index.is_trained:
+        rng = np.random.default_rng(0)
+        num_train = min(num_vectors, index_config["train_vectors_per_list"] * faiss.extract_index_ivf(index).nlist)
+        sample = np.sort(rng.choice(num_vectors, size=num_train, replace=False))
+        train_vectors = np.array(vectors[sample], dtype=np.float32, copy=True)
+        if inner_product:
+            faiss.normalize_L2(train_vectors)
+        logger.info(f"Training FAISS index {factory} on {num_train} vectors")
+        index.train(train_vectors)
+    for batch in _iter_vector_batches(vectors, normalize=inner_product):
+        index.add(batch)
+    if factory != "Flat":
+        nprobe, recall = calibrate_nprobe(
+            index,
+            vectors,
+            top_k=top_k,
+            recall_target=recall_target,
+            num_queries=index_config["calibration_queries"],
+            inner_product=inner_product,
+        )
+        logger.info(f"Calibrated {factory}: nprobe={nprobe}, recall@{top_k}={recall:.3f}")
+    logger.info(f"Built FAISS index {factory} with {index.ntotal} vectors")
+    return index
+
+def _get_index_key(metric: str, top_k: int) -> str:
+    index_config = configs["faiss_index"]
+    return json.dumps({
+        "metric": metric,
+        "top_k": top_k,
+        **{
+            key: index_config[key]
+            for key in ("factory", "recall_target", "flat_max_vectors", "ivf_flat_max_vectors")
+        },
+    }, sort_keys=True)
+
+def get_or_train_faiss_index(
+    documents: Sequence[Document],
+    db_path: Optional[str] = None,
+    metric: str = "prob",
+    top_k: int = 20,
+    persist: bool = True,
+    mmap: bool = False,
+    load: bool = True,
+) -> Optional[faiss.Index]:
+    """
+    Load the FAISS index persisted for the corpus, or train and persist a new one.
+
+    Args:
+        documents (Sequence[Document]): The transformed documents, or a MmapVectorStore.
+        db_path (str, optional): The corpus database path, next to which the index is persisted.
+        metric (str): The FAISSRetriever metric.
+        top_k (int): The number of retrieved chunks.
+        persist (bool): Whether to read and write persisted indexes.
+        mmap (bool): Whether to memory-map persisted indexes.
+        load (bool): With False, only make sure that the index is persisted, e.g.
+            at ingest time, and return None if it already is.
+
+    Returns:
+        faiss.Index | None: The index, None for an empty corpus.
+    """
+    if len(documents) == 0:
+        return None
+    index_path = None
+    if persist and db_path is not None:
+        index_path = get_index_path(db_path, get_corpus_fingerprint(documents), _get_index_key(metric, top_k))
+        if not load and os.path.exists(index_path):
+            return None
+        index = load_faiss_index(index_path, mmap=mmap)
+        if index is not None and index.ntotal == len(documents):
+            logger.info(f"Loaded FAISS index {index_path} with {index.ntotal} vectors")
+            return index
+
+    index = train_faiss_index(_get_vectors(documents), metric=metric, top_k=top_k)
+    if index_path is not None:
+        try:
+            save_faiss_index(index, index_path)
+            logger.info(f"Saved FAISS index {index_path}")
+        except Exception as e:
+            logger.error(f"Error saving FAISS index {index_path}: {e}")
+    return index
+
+def build_retriever(
+    documents: Sequence[Document],
+    embedder: Embedder,
+    db_path: Optional[str] = None,
+    persist: bool = True,
+    mmap: bool = False,
+    **retriever_kwargs,
+) -> FAISSRetriever:
+    """
+    Build a FAISS retriever over the transformed documents, reusing the index
+    persisted for the same corpus fingerprint if there is one.
+
+    Args:
+        documents (Sequence[Document]): The transformed documents, or a MmapVectorStore.
+        embedder (Embedder): The embedder for string queries.
+        db_path (str, optional): The corpus database path, next to which the index is persisted.
+        persist (bool): Whether to read and write persisted indexes.
+        mmap (bool): Whether to memory-map persisted indexes.
+        retriever_kwargs: Passed to FAISSRetriever (top_k, metric). The dimensions
+            are taken from the corpus vectors.
+
+    Returns:
+        FAISSRetriever: The ready-to-query retriever.
+    """
+    retriever = FAISSRetriever(embedder=embedder, **retriever_kwargs)
+    index = get_or_train_faiss_index(
+        documents,
+        db_path=db_path,
+        metric=retriever.metric,
+        top_k=retriever.top_k,
+        persist=persist,
+        mmap=mmap,
+    )
+    if index is None:
+        return retriever
+    if retriever.dimensions and retriever.dimensions != index.d:
+        raise ValueError(f"Dimension mismatch: {retriever.dimensions} != {index.d}")
+    retriever.index = index
+    retriever.dimensions = index.d
+    retriever.total_documents = index.ntotal
+    retriever.documents = documents
+    retriever.indexed = True
+    return retriever
+
+def search_retriever(retriever: FAISSRetriever, query_vectors: np.ndarray, top_k: int) -> List[RetrieverOutput]:
+    """
+    Search the index of a retriever for a batch of query vectors, scored like
+    FAISSRetriever. Unlike FAISSRetriever, missing hits (id -1, e.g. from IVF
+    lists with fewer than top_k vectors, or top_k over the corpus size) are
+    dropped from their own query only, not from every query of the batch.
+
+    Returns:
+        List[RetrieverOutput]: One output per query vector, best first.
+    """
+    if not retriever.indexed or retriever.index.ntotal == 0:
+        raise ValueError("Index is empty. Please set the chunks to build the index from")
+    xq = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    distances, indices = retriever.index.search(xq, min(top_k, retriever.index.ntotal))
+    if retriever.metric == "prob":
+        distances = retriever._convert_cosine_similarity_to_probability(distances)
+    outputs = []
+    for row_indices, row_distances in zip(indices, distances):
+        valid = row_indices >= 0
+        outputs.append(RetrieverOutput(
+            doc_indices=row_indices[valid].tolist(),
+            doc_scores=row_distances[valid].tolist(),
+        ))
+    return outputs
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+def compute_file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the sha256 digest of a file, reading it in chunks.
+
+    Args:
+        file_path (str): The path of the file.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+
+@dataclass
+class ManifestDiff:
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.modified or self.deleted)
+
+    @property
+    def changed(self) -> List[str]:
+        """Files whose content has to be (re-)indexed."""
+        return self.added + self.modified
+
+    @property
+    def removed(self) -> List[str]:
+        """Files whose existing chunks have to be dropped."""
+        return self.modified + self.deleted
+
+class FileManifest:
+    """
+    A manifest of (relative path, size, mtime, sha256) for every file indexed
+    into a database, together with the settings the database was built with
+    and the commit of the checkout, if any.
+    """
+
+    def __init__(
+        self,
+        entries: Dict[str, FileEntry] | None = None,
+        settings: dict | None = None,
+        commit: str | None = None,
+    ):
+        self.entries: Dict[str, FileEntry] = entries if entries is not None else {}
+        self.settings: dict = settings if settings is not None else {}
+        self.commit: str | None = commit
+
+    @classmethod
+    def build(
+        cls,
+        root: str,
+        relative_paths: Iterable[str],
+        previous: Optional["FileManifest"] = None,
+        settings: dict | None = None,
+        commit: str | None = None,
+    ) -> "FileManifest":
+        """
+        Build the manifest of the working tree.
+
+        Files whose size and mtime match the previous manifest reuse its sha256,
+        so only new or touched files are hashed.
+
+        Args:
+            root (str): The repository root.
+            relative_paths (Iterable[str]): Paths relative to root.
+            previous (FileManifest, optional): The manifest of the last run.
+            settings (dict, optional): The settings the database is built with.
+            commit (str, optional): The commit checked out in root.
+
+        Returns:
+            FileManifest: The manifest of the current working tree.
+        """
+        entries: Dict[str, FileEntry] = {}
+        for relative_path in relative_paths:
+            file_path = os.path.join(root, relative_path)
+            try:
+                stat = os.stat(file_path)
+            except OSError as e:
+                logger.warning(f"Unable to stat {file_path}: {e}")
+                continue
+            old = previous.entries.get(relative_path) if previous is not None else None
+            if old is not None and old.size == stat.st_size and old.mtime == stat.st_mtime:
+                sha256 = old.sha256
+            else:
+                try:
+                    sha256 = compute_file_sha256(file_path)
+                except OSError as e:
+                    logger.warning(f"Unable to hash {file_path}: {e}")
+                    continue
+            entries[relative_path] = FileEntry(
+                path=relative_path,
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                sha256=sha256,
+            )
+        return cls(entries=entries, settings=settings, commit=commit)
+
+    def diff(self, current: "FileManifest") -> ManifestDiff:
+        """
+        Compare this (previous) manifest with the current one.
+
+        Args:
+            current (FileManifest): The manifest of the current working tree.
+
+        Returns:
+            ManifestDiff: added, modified, deleted and unchanged relative paths.
+        """
+        result = ManifestDiff()
+        for path, entry in current.entries.items():
+            old = self.entries.get(path)
+            if old is None:
+                result.added.append(path)
+            elif old.sha256 != entry.sha256:
+                result.modified.append(path)
+            else:
+                result.unchanged.append(path)
+        result.deleted = [path for path in self.entries if path not in current.entries]
+        return result
+
+    @classmethod
+    def load(cls, manifest_path: str) -> Optional["FileManifest"]:
+        """
+        Load a manifest from disk.
+
+        Returns:
+            FileManifest | None: None if the file is missing, unreadable or
+            written by another manifest version.
+        """
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.info(f"Ignoring manifest {manifest_path} with version {data.get('version')}")
+                return None
+            entries = {
+                item["path"]: FileEntry(**item) for item in data.get("files", [])
+            }
+            return cls(entries=entries, settings=data.get("settings", {}), commit=data.get("commit"))
+        except Exception as e:
+            logger.error(f"Error loading manifest {manifest_path}: {e}")
+            return None
+
+    def save(self, manifest_path: str):
+        """Atomically write the manifest to disk."""
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "commit": self.commit,
+            "files": [asdict(entry) for entry in self.entries.values()],
+        }
+        tmp_path = f"{manifest_path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, manifest_path)
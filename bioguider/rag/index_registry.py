@@ -0,0 +1,202 @@
+"""
+A process-wide registry of loaded corpora: the chunks, FAISS retriever and BM25
+index of a repository's doc or code corpus, shared read-only by every RAG
+instance that queries the same corpus version.
+
+Corpora are keyed by database path, corpus fingerprint and retrieval mode, so
+a re-indexed corpus is a new entry. Under configs["index_registry"]["max_memory_mb"]
+the least recently used corpora are dropped; a RAG instance querying a dropped
+corpus reloads it from the vector store and the persisted indexes on disk.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Sequence
+
+import faiss
+from adalflow.core.types import Document
+from adalflow.components.retriever.faiss_retriever import FAISSRetriever
+
+from .bm25_index import BM25Index
+from .config import configs
+from .vector_store import CompactDocuments, MmapVectorStore
+
+if TYPE_CHECKING:
+    from .rag import RAG
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 ** 2
+
+@dataclass
+class LoadedCorpus:
+    documents: Sequence[Document]
+    retriever: Optional[FAISSRetriever] = None
+    bm25_index: Optional[BM25Index] = None
+    memory_bytes: int = 0
+
+def _index_memory_bytes(index: faiss.Index) -> int:
+    try:
+        code_size = index.sa_code_size()
+    except RuntimeError:
+        code_size = index.d * 4
+    return index.ntotal * code_size
+
+def estimate_memory_bytes(
+    documents: Sequence[Document],
+    retriever: Optional[FAISSRetriever] = None,
+    bm25_index: Optional[BM25Index] = None,
+) -> int:
+    """
+    Estimate the memory held by a loaded corpus. Memory-mapped chunks and vectors
+    are not counted: their pages belong to the page cache and can be dropped.
+    """
+    if isinstance(documents, MmapVectorStore):
+        size = 8 * (len(documents) + 1)
+    elif isinstance(documents, CompactDocuments):
+        size = documents.nbytes
+    else:
+        size = sum(len(doc.text or "") + 4 * len(doc.vector if doc.vector is not None else []) for doc in documents)
+    if retriever is not None and getattr(retriever, "index", None) is not None:
+        size += _index_memory_bytes(retriever.index)
+    if bm25_index is not None:
+        size += bm25_index.nbytes
+    return size
+
+class IndexRegistry:
+    """
+    Loaded corpora by key, least recently used first, within a memory budget.
+    Concurrent requests for a corpus that is not loaded wait for a single load.
+    """
+
+    def __init__(self, max_memory_bytes: Optional[int] = None):
+        self.max_memory_bytes = max_memory_bytes
+        self._entries: "OrderedDict[str, LoadedCorpus]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(db_path: str, fingerprint: str, retrieval_mode: str) -> str:
+        return f"{os.path.abspath(db_path)}:{fingerprint}:{retrieval_mode}"
+
+    def peek(self, key: Optional[str]) -> Optional[LoadedCorpus]:
+        """The corpus if it is loaded, without counting an access."""
+        with self._lock:
+            return self._entries.get(key) if key is not None else None
+
+    def get_or_load(self, key: str, loader: Callable[[], LoadedCorpus]) -> LoadedCorpus:
+        """
+        Get a loaded corpus, or load it.
+
+        Args:
+            key (str): See make_key.
+            loader (Callable): Loads the corpus, called once even if several threads miss it.
+
+        Returns:
+            LoadedCorpus: The corpus, shared with every caller of the same key.
+        """
+        with self._lock:
+            corpus = self._entries.get(key)
+            if corpus is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return corpus
+            self.misses += 1
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                corpus = self._entries.get(key)
+                if corpus is not None:
+                    # loaded by a concurrent caller while we waited
+                    self._entries.move_to_end(key)
+                    return corpus
+            try:
+                corpus = loader()
+                with self._lock:
+                    self._entries[key] = corpus
+                    self.resident_bytes += corpus.memory_bytes
+                    self.loads += 1
+                    self._evict_over_budget(keep=key)
+            finally:
+                # also if the loader raised, the next caller retries with a new lock
+                with self._lock:
+                    self._loading.pop(key, None)
+        logger.info(
+            f"Loaded corpus {key} ({corpus.memory_bytes / _MB:.1f} MB), "
+            f"{len(self._entries)} corpora resident in {self.resident_bytes / _MB:.1f} MB"
+        )
+        return corpus
+
+    def _evict_over_budget(self, keep: str):
+        if self.max_memory_bytes is None:
+            return
+        for key in list(self._entries):
+            if self.resident_bytes <= self.max_memory_bytes:
+                return
+            if key == keep:
+                continue
+            self._remove(key)
+        if self.resident_bytes > self.max_memory_bytes:
+            logger.warning(
+                f"Corpus {keep} alone exceeds the {self.max_memory_bytes / _MB:.0f} MB index memory budget"
+            )
+
+    def _remove(self, key: str):
+        # in-flight queries keep their reference, the memory is freed once they finish
+        corpus = self._entries.pop(key)
+        self.resident_bytes -= corpus.memory_bytes
+        self.evictions += 1
+        logger.info(f"Evicted corpus {key} ({corpus.memory_bytes / _MB:.1f} MB)")
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """Residency and hit-rate metrics."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def open_repo(self, repo_url_or_path: str, access_token: Optional[str] = None) -> "RAG":
+        """A RAG instance on a repository, which queries corpora loaded in this registry."""
+        from .rag import RAG
+        rag = RAG(registry=self)
+        rag.initialize_repo(repo_url_or_path, access_token)
+        return rag
+
+_registry: Optional[IndexRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_index_registry() -> IndexRegistry:
+    """The registry shared by the RAG instances of this process, created from configs["index_registry"]."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            max_memory_mb = configs["index_registry"].get("max_memory_mb")
+            _registry = IndexRegistry(int(max_memory_mb * _MB) if max_memory_mb is not None else None)
+        return _registry
@@ -0,0 +1,107 @@
+"""
+A deterministic embedding backend that needs no network, selected with
+configs["embedder"]["backend"] = "local" (BIOGUIDER_EMBEDDER_BACKEND=local).
+
+Texts are embedded with the hashing trick: every UTF-8 byte n-gram is hashed
+into one of `dimensions` buckets with a random sign, and the counts are
+L2-normalized, all in numpy over a whole batch. Vectors only capture lexical
+overlap, so the backend is meant for offline runs, CI and benchmarks of the
+ingestion pipeline, not for retrieval quality.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import Embedding, EmbedderOutput, ModelType
+
+LOCAL_EMBEDDING_MODEL = "local-hashing"
+
+# odd 64-bit constants of the splitmix64 finalizer
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scramble uint64 values, wrapping on overflow."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * _MIX_1
+    values = values ^ (values >> np.uint64(27))
+    values = values * _MIX_2
+    return values ^ (values >> np.uint64(31))
+
+def hashing_embeddings(
+    texts: Sequence[str],
+    dimensions: int,
+    ngram_size: int = 4,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Embed texts with signed feature hashing of their byte n-grams.
+
+    Args:
+        texts (Sequence[str]): The texts to embed.
+        dimensions (int): The number of dimensions of the vectors.
+        ngram_size (int): The n-gram length in bytes, from 1 to 8.
+        seed (int): Different seeds give unrelated embeddings.
+
+    Returns:
+        np.ndarray: The (len(texts), dimensions) float32 vectors, of unit norm
+            unless the text is shorter than ngram_size.
+    """
+    if not 1 <= ngram_size <= 8:
+        raise ValueError(f"ngram_size must be between 1 and 8, got {ngram_size}")
+    num_texts = len(texts)
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=num_texts)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    rows = np.repeat(np.arange(num_texts, dtype=np.int64), lengths)
+    num_ngrams = max(0, len(data) - ngram_size + 1)
+    # pack every window of ngram_size bytes into one integer
+    ngrams = data[:num_ngrams].copy()
+    for offset in range(1, ngram_size):
+        ngrams = (ngrams << np.uint64(8)) | data[offset:offset + num_ngrams]
+    # drop the windows that straddle two texts
+    in_text = rows[:num_ngrams] == rows[ngram_size - 1:ngram_size - 1 + num_ngrams]
+    ngram_rows = rows[:num_ngrams][in_text]
+    hashes = _mix(ngrams[in_text] ^ _mix(np.full(1, seed, dtype=np.uint64)))
+    buckets = (hashes % np.uint64(dimensions)).astype(np.int64)
+    signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+    vectors = np.bincount(
+        ngram_rows * dimensions + buckets,
+        weights=signs,
+        minlength=num_texts * dimensions,
+    ).reshape(num_texts, dimensions).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+class HashingEmbeddingClient(ModelClient):
+    """
+    An adalflow model client computing hashing-trick embeddings in process. The
+    vectors only depend on the texts, the dimensions and the seed.
+    """
+
+    def __init__(self, dimensions: int = 256, ngram_size: int = 4, seed: int = 0):
+        super().__init__()
+        self.dimensions = dimensions
+        self.ngram_size = ngram_size
+        self.seed = seed
+
+    def convert_inputs_to_api_kwargs(self, input=None, model_kwargs={}, model_type=ModelType.UNDEFINED):
+        if model_type != ModelType.EMBEDDER:
+            raise ValueError(f"{type(self).__name__} only supports embeddings, not {model_type}")
+        return {**model_kwargs, "input": input if isinstance(input, list) else [input]}
+
+    def embed(self, texts: List[str], dimensions: Optional[int] = None) -> np.ndarray:
+        return hashing_embeddings(texts, dimensions or self.dimensions, ngram_size=self.ngram_size, seed=self.seed)
+
+    def call(self, api_kwargs={}, model_type=ModelType.UNDEFINED):
+        # a list of rows, adalflow's Embedder tests the truth value of the response
+        return list(self.embed(api_kwargs["input"], api_kwargs.get("dimensions")))
+
+    async def acall(self, api_kwargs={}, model_type=ModelType.UNDEFINED):
+        return self.call(api_kwargs, model_type)
+
+    def parse_embedding_response(self, response: List[np.ndarray]) -> EmbedderOutput:
+        return EmbedderOutput(data=[
+            Embedding(embedding=vector.tolist(), index=i) for i, vector in enumerate(response)
+        ])
@@ -1,10 +1,13 @@
 import os
-from typing import Any, List, Tuple, Optional, Dict
+from typing import Any, List, Sequence, Tuple, Optional, Dict
 from uuid import uuid4
 import logging
 import re
+import numpy as np
 import adalflow as adal
 from adalflow.core.types import (
+    Document,
+    RetrieverOutput,
     Conversation,
     DialogTurn,
     UserQuery,
@@ -13,8 +16,13 @@ from adalflow.core.types import (
 from adalflow.components.retriever.faiss_retriever import FAISSRetriever
 from adalflow.components.model_client.openai_client import OpenAIClient
 from adalflow.components.model_client.azureai_client import AzureAIClient
-from .config import configs, create_model_client, create_model_kwargs
+from .config import configs, create_model_client, create_model_kwargs, get_retrieval_mode
 from .data_pipeline import DatabaseManager
+from .faiss_index import build_retriever, get_corpus_fingerprint, search_retriever
+from .bm25_index import BM25Index, build_bm25_index, reciprocal_rank_fusion
+from .embedding_cache import EmbeddingCache, create_embedding_cache
+from .chunk_dedup import deduplicate_retriever_output
+from .index_registry import IndexRegistry, LoadedCorpus, estimate_memory_bytes, get_index_registry
 
 logger = logging.getLogger(__name__)
 
@@ -25,19 +33,25 @@ class RAG(adal.Component):
     """RAG with one repo.
     If you want to load a new repos, call prepare_retriever(repo_url_or_path) first."""
 
-    def __init__(self, use_s3: bool = False):
+    def __init__(self, use_s3: bool = False, registry: IndexRegistry | None = None):
         """
         Initialize the RAG component.
 
         Args:
             use_s3: Whether to use S3 for database storage (default: False)
+            registry: Where loaded corpora are shared, the process-wide registry by default
         """
         super().__init__()
+        self.registry = registry or get_index_registry()
 
-        self.embedder = adal.Embedder(
+        self.retrieval_mode = get_retrieval_mode()
+        # The lexical mode never embeds, so it needs no model client nor API key
+        self.embedder = None if self.retrieval_mode == "lexical" else adal.Embedder(
             model_client=create_model_client(),
             model_kwargs=create_model_kwargs(),
         )
+        # Query embeddings share the persistent LRU cache of chunk embeddings
+        self.embedding_cache = create_embedding_cache() if self.embedder is not None else None
 
         self.initialize_db_manager()
 
@@ -50,42 +64,180 @@ class RAG(adal.Component):
     def initialize_db_manager(self):
         """Initialize the database manager with local storage"""
         self.db_manager = DatabaseManager()
-        self.transformed_doc_documents: list | None = None
-        self.transformed_code_documents: list | None = None
+        # registry keys of the corpora prepared by this instance, by kind
+        self.corpus_keys: Dict[str, str] = {}
         self.access_token: str | None = None
 
     def initialize_repo(self, repo_url_or_path: str, access_token: str = None):
         self.repo_url_or_path = repo_url_or_path
         self.access_token = access_token
+        self.corpus_keys = {}
         self.db_manager.reset_database_and_create_repo(repo_url_or_path, access_token)
 
     def _prepare_retriever(self):
         """
-        Prepare the retriever for a repository.
+        Prepare the retrievers of both corpora for a repository.
         Will load database from local storage if available.
         """
-        if self.transformed_code_documents is not None and self.transformed_doc_documents is not None:
-            # retrievers have been prepared
-            return
-        self.transformed_doc_documents, self.transformed_code_documents \
-            = self.db_manager.prepare_database()
-        logger.info(f"Loaded {len(self.transformed_doc_documents)} doc documents for retrieval")
-        logger.info(f"Loaded {len(self.transformed_code_documents)} code documents for retrieval")
-        self.doc_retriever = FAISSRetriever(
-            **configs["retriever"],
-            embedder=self.embedder,
-            documents=self.transformed_doc_documents,
-            document_map_func=lambda doc: doc.vector,
-            dimensions=256,
+        self._get_corpus("doc")
+        self._get_corpus("code")
+
+    def _get_corpus(self, kind: str) -> LoadedCorpus:
+        """
+        Get a corpus from the registry. On first use, the corpus is checked against
+        the working tree (loaded, updated or embedded and indexed), leaving the other
+        corpus untouched. A corpus evicted since is reloaded from disk as it is.
+        """
+        key = self.corpus_keys.get(kind)
+        if key is None:
+            documents = self.db_manager.prepare_corpus(kind)
+            key = self.registry.make_key(
+                self.db_manager.repo_paths[f"save_{kind}_db_file"],
+                get_corpus_fingerprint(documents),
+                self.retrieval_mode,
+            )
+            self.corpus_keys[kind] = key
+            return self.registry.get_or_load(key, lambda: self._load_corpus(kind, documents))
+        return self.registry.get_or_load(
+            key, lambda: self._load_corpus(kind, self.db_manager.load_corpus(kind))
         )
-        self.code_retriever = FAISSRetriever(
-            **configs["retriever"],
+
+    def _load_corpus(self, kind: str, documents: Sequence[Document]) -> LoadedCorpus:
+        logger.info(f"Loaded {len(documents)} {kind} documents for retrieval")
+        db_path = self.db_manager.repo_paths[f"save_{kind}_db_file"]
+        retriever = self._build_retriever(documents, db_path) if self.retrieval_mode != "lexical" else None
+        bm25_index = self._build_bm25_index(documents, db_path) if self.retrieval_mode != "vector" else None
+        return LoadedCorpus(
+            documents=documents,
+            retriever=retriever,
+            bm25_index=bm25_index,
+            memory_bytes=estimate_memory_bytes(documents, retriever, bm25_index),
+        )
+
+    def _peek_corpus(self, kind: str) -> LoadedCorpus | None:
+        return self.registry.peek(self.corpus_keys.get(kind))
+
+    @property
+    def transformed_doc_documents(self) -> Sequence[Document] | None:
+        corpus = self._peek_corpus("doc")
+        return corpus.documents if corpus is not None else None
+
+    @property
+    def transformed_code_documents(self) -> Sequence[Document] | None:
+        corpus = self._peek_corpus("code")
+        return corpus.documents if corpus is not None else None
+
+    @property
+    def doc_retriever(self) -> FAISSRetriever | None:
+        corpus = self._peek_corpus("doc")
+        return corpus.retriever if corpus is not None else None
+
+    @property
+    def code_retriever(self) -> FAISSRetriever | None:
+        corpus = self._peek_corpus("code")
+        return corpus.retriever if corpus is not None else None
+
+    @property
+    def doc_bm25_index(self) -> BM25Index | None:
+        corpus = self._peek_corpus("doc")
+        return corpus.bm25_index if corpus is not None else None
+
+    @property
+    def code_bm25_index(self) -> BM25Index | None:
+        corpus = self._peek_corpus("code")
+        return corpus.bm25_index if corpus is not None else None
+
+    def _build_bm25_index(self, documents: Sequence[Document], db_path: str) -> BM25Index:
+        """
+        Build a BM25 index over the transformed documents, reloading the index
+        persisted next to the corpus database when the corpus is unchanged.
+        """
+        return build_bm25_index(documents, db_path=db_path, persist=configs["retrieval"]["persist_bm25"])
+
+    def _build_retriever(self, documents: Sequence[Document], db_path: str) -> FAISSRetriever:
+        """
+        Build a FAISS retriever over the transformed documents, reloading the
+        index persisted next to the corpus database when the corpus is unchanged.
+        """
+        return build_retriever(
+            documents,
             embedder=self.embedder,
-            documents=self.transformed_code_documents,
-            document_map_func=lambda doc: doc.vector,
-            dimensions=256,
+            db_path=db_path,
+            persist=configs["faiss_index"]["persist"],
+            mmap=configs["faiss_index"]["mmap"],
+            **configs["retriever"],
         )
 
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed queries in a single request. Queries embedded before, by any RAG
+        instance and for any repository, are served from the embedding cache.
+
+        Returns:
+            np.ndarray: The (len(queries), D) float32 query vectors.
+        """
+        model = self.embedder.model_kwargs.get("model")
+        dimensions = self.embedder.model_kwargs.get("dimensions")
+        keys = [EmbeddingCache.make_key(query, model, dimensions) for query in queries]
+        vectors = self.embedding_cache.get_many(keys) if self.embedding_cache is not None else {}
+        missing = {key: query for key, query in zip(keys, queries) if key not in vectors}
+        if missing:
+            output = self.embedder(input=list(missing.values()))
+            if output.error or len(output.data) != len(missing):
+                raise ValueError(f"Error embedding queries: {output.error}")
+            new_vectors = {key: embedding.embedding for key, embedding in zip(missing, output.data)}
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+        return np.asarray([vectors[key] for key in keys], dtype=np.float32)
+
+    def _retrieve(
+        self,
+        queries: List[str],
+        documents: Sequence[Document],
+        retriever: FAISSRetriever | None,
+        bm25_index: BM25Index | None,
+    ) -> List[RetrieverOutput]:
+        """
+        Retrieve the chunks of a corpus for every query with the configured retrieval mode.
+        All queries are embedded in one request and searched in one batched FAISS search.
+        The hybrid mode fuses the vector and lexical rankings with reciprocal rank fusion.
+        """
+        top_k = configs["retriever"]["top_k"]
+        retrieval_config = configs["retrieval"]
+        num_candidates = top_k if self.retrieval_mode == "vector" else top_k * retrieval_config["candidates_factor"]
+
+        vector_outputs = []
+        if self.retrieval_mode != "lexical":
+            vector_outputs = [RetrieverOutput(doc_indices=[], doc_scores=[], query=query) for query in queries]
+            # like FAISSRetriever, empty queries retrieve nothing
+            valid_indices = [ix for ix, query in enumerate(queries) if query]
+            if valid_indices:
+                query_vectors = self._embed_queries([queries[ix] for ix in valid_indices])
+                for ix, output in zip(valid_indices, search_retriever(retriever, query_vectors, num_candidates)):
+                    vector_outputs[ix].doc_indices = output.doc_indices
+                    vector_outputs[ix].doc_scores = output.doc_scores
+
+        if self.retrieval_mode == "vector":
+            retrieved_documents = vector_outputs
+        elif self.retrieval_mode == "lexical":
+            retrieved_documents = [bm25_index.search(query, top_k) for query in queries]
+        else:
+            retrieved_documents = [
+                reciprocal_rank_fusion(
+                    [vector_output, bm25_index.search(query, num_candidates)],
+                    top_k=top_k,
+                    k=retrieval_config["rrf_k"],
+                    weights=[retrieval_config["vector_weight"], retrieval_config["lexical_weight"]],
+                )
+                for query, vector_output in zip(queries, vector_outputs)
+            ]
+        # Fill in the documents, each distinct chunk text once
+        for output in retrieved_documents:
+            output.documents = [documents[doc_index] for doc_index in output.doc_indices]
+            deduplicate_retriever_output(output)
+        return retrieved_documents
+
     def query_doc(self, query: str) -> List:
         """
         Process a query using RAG.
@@ -96,14 +248,20 @@ class RAG(adal.Component):
         Returns:
             retrieved_documents: List of documents retrieved based on the query
         """
-        self._prepare_retriever()
-        retrieved_documents = self.doc_retriever(query)
-        # Fill in the documents
-        retrieved_documents[0].documents = [
-            self.transformed_doc_documents[doc_index]
-            for doc_index in retrieved_documents[0].doc_indices
-        ]
-        return retrieved_documents
+        return self.query_doc_many([query])
+
+    def query_doc_many(self, queries: List[str]) -> List[RetrieverOutput]:
+        """
+        Process several queries using RAG, with one embedding request and one index search.
+
+        Args:
+            queries: The user's queries
+
+        Returns:
+            retrieved_documents: One RetrieverOutput per query, in order, with its documents
+        """
+        corpus = self._get_corpus("doc")
+        return self._retrieve(queries, corpus.documents, corpus.retriever, corpus.bm25_index)
     
     def query_code(self, query: str) -> List:
         """
@@ -115,13 +273,23 @@ class RAG(adal.Component):
         Returns:
             retrieved_documents: List of code documents retrieved based on the query
         """
+        return self.query_code_many([query])
+
+    def query_code_many(self, queries: List[str]) -> List[RetrieverOutput]:
+        """
+        Process several code queries using RAG, with one embedding request and one index search.
+
+        Args:
+            queries: The user's code queries
+
+        Returns:
+            retrieved_documents: One RetrieverOutput per query, in order, with its code documents
+        """
         try:
-            retrieved_documents = self.code_retriever(query)
-            # Fill in the documents
-            retrieved_documents[0].documents = [
-                self.transformed_code_documents[doc_index]
-                for doc_index in retrieved_documents[0].doc_indices
-            ]
+            corpus = self._get_corpus("code")
+            retrieved_documents = self._retrieve(
+                queries, corpus.documents, corpus.retriever, corpus.bm25_index
+            )
         except Exception as e:
             logger.error(e)
             raise e
@@ -0,0 +1,87 @@
+import logging
+from copy import deepcopy
+from typing import List, Optional, Tuple
+
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document
+
+from .tokenizer import get_encoding
+
+logger = logging.getLogger(__name__)
+
+class TokenTextSplitter(DataComponent):
+    r"""
+    Split documents into windows of chunk_size tokens overlapping by chunk_overlap tokens.
+
+    Unlike TextSplitter(split_by="token"), chunk texts are exact slices of the source
+    text, so multi-byte characters are never cut, and every chunk carries its token
+    count in estimated_num_tokens so it is not tokenized again. Files of any size are
+    chunked.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        model: Optional[str] = None,
+    ):
+        super().__init__()
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be greater than 0. Received value: {chunk_size}")
+        if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"chunk_overlap must be in [0, chunk_size). Received chunk_size: {chunk_size}, chunk_overlap: {chunk_overlap}"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.model = model
+
+    def split_text(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split a text into chunks.
+
+        Args:
+            text (str): The text to split.
+
+        Returns:
+            List[Tuple[str, int]]: Every chunk text with its number of tokens.
+        """
+        encoding = get_encoding(self.model)
+        tokens = encoding.encode_ordinary(text)
+        if len(tokens) <= self.chunk_size:
+            return [(text, len(tokens))] if text else []
+        # character offset where every token starts, in the decoded text
+        decoded_text, offsets = encoding.decode_with_offsets(tokens)
+        offsets.append(len(decoded_text))
+        chunks = []
+        step = self.chunk_size - self.chunk_overlap
+        for start in range(0, len(tokens), step):
+            end = min(start + self.chunk_size, len(tokens))
+            chunks.append((decoded_text[offsets[start]:offsets[end]], end - start))
+            if end == len(tokens):
+                break
+        return chunks
+
+    def call(self, documents: List[Document]) -> List[Document]:
+        split_docs = []
+        for doc in documents:
+            if doc.text is None:
+                raise ValueError(f"Text should not be None. Doc id: {doc.id}")
+            meta_data = deepcopy(doc.meta_data)
+            split_docs.extend(
+                Document(
+                    text=text,
+                    meta_data=meta_data,
+                    parent_doc_id=f"{doc.id}",
+                    order=i,
+                    vector=[],
+                    estimated_num_tokens=num_tokens,
+                )
+                for i, (text, num_tokens) in enumerate(self.split_text(doc.text))
+            )
+        logger.info(f"Split {len(documents)} documents into {len(split_docs)} chunks")
+        return split_docs
+
+    def _extra_repr(self) -> str:
+        s = f"chunk_size={self.chunk_size}, chunk_overlap={self.chunk_overlap}"
+        return s
@@ -0,0 +1,489 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import shutil
+import logging
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.types import Document
+
+from .chunk_dedup import DUPLICATE_LOCATIONS_KEY
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_VERSION = 1
+
+VECTORS_FILE_NAME = "vectors.npy"
+OFFSETS_FILE_NAME = "offsets.npy"
+CHUNKS_FILE_NAME = "chunks.bin"
+META_FILE_NAME = "meta.json"
+# Locations of the dropped duplicates of stored chunks, keyed by chunk id
+DUPLICATES_FILE_NAME = "duplicates.json"
+# Vectors are appended to this raw float32 file, then moved into vectors.npy on commit
+RAW_VECTORS_FILE_NAME = "vectors.f32"
+# The name of the published version directory of a store, replaced atomically on commit
+CURRENT_FILE_NAME = "CURRENT"
+# Version directories are named {VERSION_DIR_PREFIX}{time_ns}.{pid}
+VERSION_DIR_PREFIX = "v"
+# Attempts to open a store whose version is replaced meanwhile
+LOAD_ATTEMPTS = 3
+
+def _get_version_path(store_path: str) -> Optional[str]:
+    """The directory of the published version of a store, None if there is none."""
+    try:
+        with open(os.path.join(store_path, CURRENT_FILE_NAME), "r", encoding="utf-8") as f:
+            return os.path.join(store_path, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+class MmapVectorStore(Sequence[Document]):
+    """
+    A read-only corpus of embedded chunks. The store directory holds versions of
+    the corpus, and a CURRENT file naming the published one, which has:
+
+    - vectors.npy: a contiguous float32 (N, D) matrix, opened with np.load(mmap_mode='r')
+    - chunks.bin: the JSON payload (text, meta_data, ids) of every chunk, concatenated
+    - offsets.npy: int64 (N + 1) byte offsets of each chunk payload in chunks.bin
+    - duplicates.json: the locations of the copies of deduplicated chunks, by chunk id
+
+    Opening a store only maps the files; a Document is materialised from the
+    payload when it is indexed, e.g. for a retrieved hit. Mapped pages are shared
+    between every process that opens the same store.
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        payload: Optional[mmap.mmap],
+        fingerprint: Optional[str] = None,
+        duplicate_locations: Optional[Dict[str, List[dict]]] = None,
+    ):
+        self.store_path = store_path
+        self.fingerprint = fingerprint
+        self.duplicate_locations = duplicate_locations or {}
+        self._vectors = vectors
+        self._offsets = offsets
+        self._payload = payload
+
+    @staticmethod
+    def exists(store_path: str) -> bool:
+        version_path = _get_version_path(store_path)
+        return version_path is not None and os.path.exists(os.path.join(version_path, META_FILE_NAME))
+
+    @classmethod
+    def load(cls, store_path: str, mmap_mode: Optional[str] = "r") -> "MmapVectorStore":
+        """
+        Open the published version of a store.
+
+        Args:
+            store_path (str): The store directory.
+            mmap_mode (str, optional): Passed to np.load, None reads vectors into memory.
+        """
+        for attempt in range(LOAD_ATTEMPTS):
+            version_path = _get_version_path(store_path)
+            if version_path is None:
+                raise FileNotFoundError(f"No published version in vector store {store_path}")
+            try:
+                return cls._load_version(store_path, version_path, mmap_mode)
+            except FileNotFoundError:
+                # the version was replaced and removed while it was opened
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+
+    @classmethod
+    def _load_version(cls, store_path: str, version_path: str, mmap_mode: Optional[str]) -> "MmapVectorStore":
+        with open(os.path.join(version_path, META_FILE_NAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != VECTOR_STORE_VERSION:
+            raise ValueError(f"Unsupported vector store version {meta.get('version')} in {store_path}")
+        vectors = np.load(os.path.join(version_path, VECTORS_FILE_NAME), mmap_mode=mmap_mode)
+        offsets = np.load(os.path.join(version_path, OFFSETS_FILE_NAME))
+        payload = None
+        chunks_path = os.path.join(version_path, CHUNKS_FILE_NAME)
+        if os.path.getsize(chunks_path) > 0:
+            with open(chunks_path, "rb") as f:
+                payload = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        duplicate_locations = None
+        duplicates_path = os.path.join(version_path, DUPLICATES_FILE_NAME)
+        if os.path.exists(duplicates_path):
+            with open(duplicates_path, "r", encoding="utf-8") as f:
+                duplicate_locations = json.load(f)
+        return cls(
+            store_path,
+            vectors,
+            offsets,
+            payload,
+            fingerprint=meta.get("fingerprint"),
+            duplicate_locations=duplicate_locations,
+        )
+
+    @classmethod
+    def save(
+        cls,
+        store_path: str,
+        documents: Sequence[Document],
+        vectors: Optional[np.ndarray] = None,
+    ) -> "MmapVectorStore":
+        """
+        Write documents to a new store and publish it atomically, replacing any existing store.
+
+        Args:
+            store_path (str): The store directory.
+            documents (Sequence[Document]): The embedded chunks.
+            vectors (np.ndarray, optional): The (N, D) vectors of the documents,
+                taken from Document.vector if not provided.
+
+        Returns:
+            MmapVectorStore: The newly written store, opened with mmap.
+        """
+        with MmapVectorStoreWriter(store_path) as writer:
+            writer.add(documents, vectors)
+            return writer.commit()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _read_record(self, index: int) -> dict:
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return json.loads(self._payload[start:end].decode("utf-8"))
+
+    def get_document(self, index: int, with_vector: bool = True) -> Document:
+        """Materialise the Document of one chunk."""
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError(f"Chunk index {index} out of range")
+        record = self._read_record(index)
+        meta_data = record["meta_data"]
+        if record["id"] in self.duplicate_locations:
+            meta_data = {**(meta_data or {}), DUPLICATE_LOCATIONS_KEY: self.duplicate_locations[record["id"]]}
+        return Document(
+            text=record["text"],
+            meta_data=meta_data,
+            vector=self._vectors[index].tolist() if with_vector else [],
+            id=record["id"],
+            parent_doc_id=record["parent_doc_id"],
+            order=record["order"],
+            estimated_num_tokens=record.get("estimated_num_tokens"),
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get_document(i) for i in range(*index.indices(len(self)))]
+        return self.get_document(index)
+
+    def __iter__(self) -> Iterator[Document]:
+        for ix in range(len(self)):
+            yield self.get_document(ix)
+
+    def get_file_paths(self) -> List[Optional[str]]:
+        """The source file path of every chunk, in order."""
+        return [
+            (self._read_record(ix).get("meta_data") or {}).get("file_path")
+            for ix in range(len(self))
+        ]
+
+    def close(self):
+        if self._payload is not None:
+            self._payload.close()
+            self._payload = None
+
+class ChunkRecord:
+    """The fields of a chunk other than its text and vector, which live in CompactDocuments buffers."""
+
+    __slots__ = ("id", "parent_doc_id", "order", "meta_data", "estimated_num_tokens", "text_start", "text_end")
+
+    def __init__(self, doc: Document, text_start: int, text_end: int):
+        self.id = doc.id
+        self.parent_doc_id = doc.parent_doc_id
+        self.order = doc.order
+        self.meta_data = doc.meta_data
+        self.estimated_num_tokens = doc.estimated_num_tokens
+        self.text_start = text_start
+        self.text_end = text_end
+
+class CompactDocuments(Sequence[Document]):
+    """
+    An in-memory corpus of embedded chunks laid out like a MmapVectorStore:
+
+    - the UTF-8 text of every chunk, concatenated in one bytes buffer
+    - a float32 (N, D) matrix of vectors, or None for a corpus without embeddings
+    - one ChunkRecord per chunk, with the byte offsets of its text in the buffer
+
+    A Document stores its vector as a list of Python floats, about 32 bytes per
+    dimension; here a dimension takes 4 bytes. Like a MmapVectorStore, a Document
+    is materialised when it is indexed, e.g. for a retrieved hit.
+    """
+
+    def __init__(
+        self,
+        records: List[ChunkRecord],
+        text: bytes,
+        vectors: Optional[np.ndarray],
+        fingerprint: Optional[str] = None,
+    ):
+        self.records = records
+        self.text = text
+        self._vectors = vectors
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[Document]) -> "CompactDocuments":
+        """
+        Compact transformed documents. The fingerprint is the one get_corpus_fingerprint
+        computes on the documents themselves.
+
+        Args:
+            documents (Sequence[Document]): The chunks, either all embedded with
+                the same dimensions or none of them embedded.
+        """
+        records, texts = [], []
+        position = 0
+        vectors = None
+        sha = hashlib.sha256()
+        dimensions = len(documents[0].vector if documents and documents[0].vector is not None else [])
+        if dimensions:
+            vectors = np.empty((len(documents), dimensions), dtype=np.float32)
+        for ix, doc in enumerate(documents):
+            text = (doc.text or "").encode("utf-8")
+            records.append(ChunkRecord(doc, position, position + len(text)))
+            texts.append(text)
+            position += len(text)
+            vector = np.asarray(doc.vector if doc.vector is not None else [], dtype=np.float32)
+            if len(vector) != dimensions:
+                raise ValueError(f"Chunk {doc.id} has a {len(vector)}-dimensional vector, expected {dimensions}")
+            if vectors is not None:
+                vectors[ix] = vector
+            sha.update(str(doc.id).encode("utf-8"))
+            sha.update(vector.tobytes())
+        return cls(records, b"".join(texts), vectors, fingerprint=sha.hexdigest())
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.empty((len(self.records), 0), dtype=np.float32)
+        return self._vectors
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the corpus, chunk records included."""
+        vectors_size = self._vectors.nbytes if self._vectors is not None else 0
+        return len(self.text) + vectors_size + 120 * len(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get_text(self, index: int) -> str:
+        record = self.records[index]
+        return self.text[record.text_start:record.text_end].decode("utf-8")
+
+    def get_document(self, index: int, with_vector: bool = True) -> Document:
+        """Materialise the Document of one chunk."""
+        record = self.records[index]
+        vector = []
+        if with_vector and self._vectors is not None:
+            vector = self._vectors[index].tolist()
+        return Document(
+            text=self.text[record.text_start:record.text_end].decode("utf-8"),
+            meta_data=record.meta_data,
+            vector=vector,
+            id=record.id,
+            parent_doc_id=record.parent_doc_id,
+            order=record.order,
+            estimated_num_tokens=record.estimated_num_tokens,
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get_document(i) for i in range(*index.indices(len(self)))]
+        return self.get_document(index)
+
+    def __iter__(self) -> Iterator[Document]:
+        for ix in range(len(self)):
+            yield self.get_document(ix)
+
+    def get_file_paths(self) -> List[Optional[str]]:
+        """The source file path of every chunk, in order."""
+        return [(record.meta_data or {}).get("file_path") for record in self.records]
+
+class MmapVectorStoreWriter:
+    """
+    Write a store incrementally, batch by batch, so that only the current batch
+    is held in memory. The store is written to a new version directory and
+    published atomically by commit(), replacing any existing version; readers
+    that still map the old files keep a valid view. Used as a context manager,
+    the partial version is removed if commit() is not reached.
+
+    Writers of a store are serialized by the build lock of its repository,
+    see CacheManager.build_lock.
+    """
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        os.makedirs(store_path, exist_ok=True)
+        self._version = f"{VERSION_DIR_PREFIX}{time.time_ns()}.{os.getpid()}"
+        self._tmp_path = os.path.join(store_path, f"{self._version}.tmp")
+        os.makedirs(self._tmp_path)
+        self._chunks_file: Optional[BinaryIO] = open(os.path.join(self._tmp_path, CHUNKS_FILE_NAME), "wb")
+        self._vectors_file: Optional[BinaryIO] = open(os.path.join(self._tmp_path, RAW_VECTORS_FILE_NAME), "wb")
+        self._offsets: List[int] = [0]
+        self._dimensions: Optional[int] = None
+        self._vectors_sha = hashlib.sha256()
+        self._records_sha = hashlib.sha256()
+        self._duplicate_locations: Dict[str, List[dict]] = {}
+
+    def __enter__(self) -> "MmapVectorStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.abort()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def add(self, documents: Sequence[Document], vectors: Optional[np.ndarray] = None):
+        """
+        Append embedded chunks to the store. The duplicate locations found in the
+        meta_data of the chunks are moved to duplicates.json.
+
+        Args:
+            documents (Sequence[Document]): The embedded chunks.
+            vectors (np.ndarray, optional): The (N, D) vectors of the documents,
+                taken from Document.vector if not provided.
+        """
+        if len(documents) == 0:
+            return
+        if vectors is None:
+            vectors = np.asarray([doc.vector for doc in documents], dtype=np.float32)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(documents):
+            raise ValueError(f"Got vectors of shape {vectors.shape} for {len(documents)} documents")
+        if self._dimensions is None:
+            self._dimensions = int(vectors.shape[1])
+        elif vectors.shape[1] != self._dimensions:
+            raise ValueError(f"Got {vectors.shape[1]}-dimensional vectors in a {self._dimensions}-dimensional store")
+
+        data = vectors.tobytes()
+        self._vectors_file.write(data)
+        self._vectors_sha.update(data)
+        position = self._offsets[-1]
+        for doc in documents:
+            meta_data = doc.meta_data
+            if meta_data and meta_data.get(DUPLICATE_LOCATIONS_KEY):
+                self.add_duplicate_locations({doc.id: meta_data[DUPLICATE_LOCATIONS_KEY]})
+                meta_data = {k: v for k, v in meta_data.items() if k != DUPLICATE_LOCATIONS_KEY}
+            record = json.dumps({
+                "id": doc.id,
+                "text": doc.text,
+                "meta_data": meta_data,
+                "parent_doc_id": doc.parent_doc_id,
+                "order": doc.order,
+                "estimated_num_tokens": doc.estimated_num_tokens,
+            }, default=str).encode("utf-8")
+            self._chunks_file.write(record)
+            self._records_sha.update(record)
+            position += len(record)
+            self._offsets.append(position)
+
+    def add_duplicate_locations(self, duplicate_locations: Dict[str, List[dict]]):
+        """
+        Record the locations of the copies of stored chunks, which may have been added in a previous batch.
+
+        Args:
+            duplicate_locations (Dict[str, List[dict]]): Locations by chunk id.
+        """
+        for chunk_id, locations in duplicate_locations.items():
+            if locations:
+                self._duplicate_locations.setdefault(chunk_id, []).extend(locations)
+
+    def _write_vectors_npy(self):
+        count, dimensions = len(self), self._dimensions or 0
+        raw_path = os.path.join(self._tmp_path, RAW_VECTORS_FILE_NAME)
+        with open(os.path.join(self._tmp_path, VECTORS_FILE_NAME), "wb") as f:
+            np.lib.format.write_array_header_1_0(f, {
+                "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                "fortran_order": False,
+                "shape": (count, dimensions),
+            })
+            with open(raw_path, "rb") as raw:
+                shutil.copyfileobj(raw, f, length=16 * 1024 * 1024)
+        os.remove(raw_path)
+
+    def commit(self) -> MmapVectorStore:
+        """
+        Publish the store atomically, replacing any existing version.
+
+        Returns:
+            MmapVectorStore: The newly written store, opened with mmap.
+        """
+        self._chunks_file.close()
+        self._vectors_file.close()
+        self._chunks_file = self._vectors_file = None
+        self._write_vectors_npy()
+        np.save(os.path.join(self._tmp_path, OFFSETS_FILE_NAME), np.asarray(self._offsets, dtype=np.int64))
+        duplicates_data = json.dumps(self._duplicate_locations, sort_keys=True, default=str).encode("utf-8")
+        if self._duplicate_locations:
+            with open(os.path.join(self._tmp_path, DUPLICATES_FILE_NAME), "wb") as f:
+                f.write(duplicates_data)
+        with open(os.path.join(self._tmp_path, META_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": VECTOR_STORE_VERSION,
+                "count": len(self),
+                "dimensions": self._dimensions or 0,
+                "fingerprint": hashlib.sha256(
+                    self._vectors_sha.digest()
+                    + self._records_sha.digest()
+                    + (hashlib.sha256(duplicates_data).digest() if self._duplicate_locations else b"")
+                ).hexdigest(),
+            }, f)
+
+        # Point CURRENT to the new version, then remove the other versions. Readers that
+        # still map the old files keep a valid view, since unlinked files stay alive
+        # until they are unmapped; readers opening them meanwhile retry.
+        os.replace(self._tmp_path, os.path.join(self.store_path, self._version))
+        self._tmp_path = None
+        current_tmp_path = os.path.join(self.store_path, f"{CURRENT_FILE_NAME}.tmp.{os.getpid()}")
+        with open(current_tmp_path, "w", encoding="utf-8") as f:
+            f.write(self._version)
+        os.replace(current_tmp_path, os.path.join(self.store_path, CURRENT_FILE_NAME))
+        self._remove_other_versions()
+        logger.info(f"Saved {len(self)} chunks to vector store {self.store_path}")
+        return MmapVectorStore.load(self.store_path)
+
+    def _remove_other_versions(self):
+        """Remove the replaced versions and the partial versions of failed writers."""
+        for name in os.listdir(self.store_path):
+            if name in (CURRENT_FILE_NAME, self._version):
+                continue
+            path = os.path.join(self.store_path, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def abort(self):
+        """Remove the partial store if it was not committed."""
+        for f in (self._chunks_file, self._vectors_file):
+            if f is not None:
+                f.close()
+        self._chunks_file = self._vectors_file = None
+        if self._tmp_path is not None:
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+            self._tmp_path = None
+            try:
+                # the store directory created for the first version
+                os.rmdir(self.store_path)
+            except OSError:
+                pass
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Iterator
 import logging
 
 from bioguider.utils.r_file_handler import RFileHandler
@@ -6,6 +7,7 @@ from bioguider.utils.r_file_handler import RFileHandler
 from .gitignore_checker import GitignoreChecker
 from .python_file_handler import PythonFileHandler
 from ..database.code_structure_db import CodeStructureDb
+from ..rag.cache_manager import CacheManager
 from ..rag.config import configs
 
 logger = logging.getLogger(__name__)
@@ -30,6 +32,22 @@ class CodeStructureBuilder:
     def build_code_structure(self):
         if self.code_structure_db.is_database_built():
             return
+        db = self.code_structure_db
+        cache_manager = CacheManager(db.data_folder)
+        with cache_manager.build_lock(f"{db.author}_{db.repo_name}"):
+            # a concurrent job may have built the database while we waited
+            if db.is_database_built():
+                return
+            staging_db = db.create_staging_db()
+            self._insert_code_structure(staging_db)
+            db.publish_staging_db(staging_db)
+
+    def _insert_code_structure(self, code_structure_db: CodeStructureDb):
+        # all symbols in one transaction, streamed from the parsers
+        if not code_structure_db.insert_code_structures(self._iter_code_structures()):
+            raise RuntimeError(f"Unable to build code structure database {code_structure_db.get_db_file()}")
+
+    def _iter_code_structures(self) -> Iterator[tuple]:
         files = self.gitignore_checker.check_files_and_folders()
         for file in files:
             if not file.endswith(".py") and not file.endswith(".R"):
@@ -46,7 +64,7 @@ class CodeStructureBuilder:
                 continue
             # fixme: currently, we don't extract reference graph for each function or class
             for function_or_class in functions_and_classes:
-                self.code_structure_db.insert_code_structure(
+                yield (
                     function_or_class[0], # name
                     file,
                     function_or_class[2], # start line number
@@ -55,5 +73,3 @@ class CodeStructureBuilder:
                     function_or_class[4], # doc string
                     function_or_class[5], # params
                 )
-        
-
@@ -0,0 +1,78 @@
+import os
+import time
+import logging
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class FileLock:
+    """
+    An advisory lock on a file, shared (readers) or exclusive (writer), held
+    between processes and between threads of one process, since each FileLock
+    opens the file on its own. The lock is released when the holder exits, even
+    if it crashes. Locking is a no-op on platforms without fcntl.
+    """
+
+    def __init__(self, path: str, shared: bool = False, poll_interval: float = 0.05):
+        self.path = path
+        self.shared = shared
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def is_locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Acquire the lock.
+
+        Args:
+            blocking (bool): Wait for the lock, or give up at once if it is held.
+            timeout (float, optional): The maximum wait in seconds, None waits forever.
+
+        Returns:
+            bool: Whether the lock was acquired.
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"Lock {self.path} is already held")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            self._fd = fd
+            return True
+        operation = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(fd)
+                    return False
+                time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __del__(self):
+        self.release()
@@ -2,8 +2,14 @@ import ast
 import os
 
 class PythonFileHandler:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, content: str | None = None):
+        """
+        Args:
+            file_path: The Python file.
+            content: The file content, if already read; the file is read otherwise.
+        """
         self.file_path = file_path
+        self.content = content
 
     def get_functions_and_classes(self) -> list[str]:
         """
@@ -16,30 +22,32 @@ class PythonFileHandler:
         5. doc string,
         6. params.
         """
-        with open(self.file_path, 'r') as f:
-            tree = ast.parse(f.read())
-            functions_and_classes = []
-            for node in tree.body:
-                if isinstance(node, ast.FunctionDef) or isinstance(node, ast.ClassDef):
-                    start_lineno = node.lineno
-                    end_lineno = self.get_end_lineno(node)
-                    doc_string = ast.get_docstring(node)
-                    params = (
-                        [arg.arg for arg in node.args.args] if "args" in dir(node) else []
-                    )
-                    parent = None
-                    functions_and_classes.append((node.name, parent, start_lineno, end_lineno, doc_string, params))
-                    for child in node.body:
-                        if isinstance(child, ast.FunctionDef):
-                            start_lineno = child.lineno
-                            end_lineno = self.get_end_lineno(child)
-                            doc_string = ast.get_docstring(child)
-                            params = (
-                                [arg.arg for arg in child.args.args] if "args" in dir(child) else []
-                            )
-                            parent = node.name
-                            functions_and_classes.append((child.name, parent, start_lineno, end_lineno, doc_string, params))
-            return functions_and_classes
+        if self.content is None:
+            with open(self.file_path, 'r') as f:
+                self.content = f.read()
+        tree = ast.parse(self.content)
+        functions_and_classes = []
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) or isinstance(node, ast.ClassDef):
+                start_lineno = node.lineno
+                end_lineno = self.get_end_lineno(node)
+                doc_string = ast.get_docstring(node)
+                params = (
+                    [arg.arg for arg in node.args.args] if "args" in dir(node) else []
+                )
+                parent = None
+                functions_and_classes.append((node.name, parent, start_lineno, end_lineno, doc_string, params))
+                for child in node.body:
+                    if isinstance(child, ast.FunctionDef):
+                        start_lineno = child.lineno
+                        end_lineno = self.get_end_lineno(child)
+                        doc_string = ast.get_docstring(child)
+                        params = (
+                            [arg.arg for arg in child.args.args] if "args" in dir(child) else []
+                        )
+                        parent = node.name
+                        functions_and_classes.append((child.name, parent, start_lineno, end_lineno, doc_string, params))
+        return functions_and_classes
     
     def get_imports(self) -> list[str]:
         pass
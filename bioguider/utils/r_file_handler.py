@@ -75,10 +75,12 @@ class RFileHandler:
         re.MULTILINE,
     )
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, content: Optional[str] = None):
         self.file_path = file_path
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            self.text = f.read()
+        if content is None:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        self.text = content
         self.lines = self.text.splitlines()
         self._brace_map = self._build_brace_map_safely()  # FIX: ignore comments/strings
 
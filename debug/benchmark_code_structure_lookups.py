@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Benchmark the per-lookup latency of CodeStructureDb as the table grows.
+
+The table is grown with insert_code_structures to every --sizes row count and
+the lookups ConsistencyQueryStep issues are timed at each size, with the
+secondary indexes of code_structure_migrations ("indexed") and with them
+dropped, as in a database built before the migration ("scan"):
+
+select_by_name               WHERE name = ?
+select_by_parent             WHERE parent = ? AND path = ?
+select_by_name_and_parent    WHERE name = ? AND parent = ?
+lookup_many                  all the (name, parent, path) specs in one call, time per spec
+
+Usage:
+    python debug/benchmark_code_structure_lookups.py --sizes 10000,100000,500000
+    python debug/benchmark_code_structure_lookups.py --modes indexed --lookups 2000
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from bioguider.database.code_structure_db import CodeStructureDb
+
+LOOKUPS = ("select_by_name", "select_by_parent", "select_by_name_and_parent", "lookup_many")
+
+def make_symbols(start: int, stop: int):
+    # 20 functions per file, 10 methods per class
+    return (
+        (f"function_{i}", f"pkg/module{i // 20}.py", i, i + 10, f"Class{i // 10}")
+        for i in range(start, stop)
+    )
+
+def drop_indexes(db: CodeStructureDb):
+    connection = db._get_connection()
+    names = connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_code_structure_%'"
+    ).fetchall()
+    for (name,) in names:
+        connection.execute(f"DROP INDEX {name}")
+    connection.commit()
+
+def time_lookups(db: CodeStructureDb, size: int, num_lookups: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    ids = [rng.randrange(size) for _ in range(num_lookups)]
+    calls = {
+        "select_by_name": lambda i: db.select_by_name(f"function_{i}"),
+        "select_by_parent": lambda i: db.select_by_parent(f"Class{i // 10}", f"pkg/module{i // 20}.py"),
+        "select_by_name_and_parent": lambda i: db.select_by_name_and_parent(f"function_{i}", f"Class{i // 10}"),
+    }
+    latencies = {}
+    for name, call in calls.items():
+        start = time.perf_counter()
+        for i in ids:
+            assert call(i)
+        latencies[name] = (time.perf_counter() - start) / num_lookups
+    specs = [(f"function_{i}", f"Class{i // 10}", f"pkg/module{i // 20}.py") for i in ids]
+    start = time.perf_counter()
+    assert all(db.lookup_many(specs))
+    latencies["lookup_many"] = (time.perf_counter() - start) / num_lookups
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000,100000,250000,500000")
+    parser.add_argument("--modes", default="scan,indexed")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    work_dir = tempfile.mkdtemp(prefix="bioguider_bench_")
+    try:
+        print(f"{'mode':<9}{'rows':>9}" + "".join(f"{name:>28}" for name in LOOKUPS) + "   (us per lookup)")
+        for mode in args.modes.split(","):
+            db = CodeStructureDb("bench", mode, data_folder=work_dir)
+            if mode == "scan":
+                drop_indexes(db)
+            num_rows = 0
+            for size in sizes:
+                db.insert_code_structures(make_symbols(num_rows, size))
+                num_rows = size
+                latencies = time_lookups(db, size, args.lookups, args.seed)
+                print(
+                    f"{mode:<9}{size:>9,}" + "".join(f"{latencies[name] * 1e6:>28.1f}" for name in LOOKUPS),
+                    flush=True,
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
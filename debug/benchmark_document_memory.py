@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark the memory held by a loaded corpus of transformed chunks, per representation.
+
+documents:  a list of adalflow Documents, vectors as lists of Python floats
+            (what the pickled LocalDB holds once loaded)
+compact:    CompactDocuments, one text buffer, a float32 vector matrix and slotted records
+mmap:       a MmapVectorStore, of which only the chunk offsets are read into memory
+
+Memory is measured with tracemalloc, which also tracks numpy buffers, as the
+bytes still allocated once the corpus is loaded. The chunks are synthetic, of
+about --chunk-chars characters, with the meta_data of the text splitter.
+
+Usage:
+    python debug/benchmark_document_memory.py --chunks 100000 --dimensions 256
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from adalflow.core.types import Document
+
+from bioguider.rag.vector_store import CompactDocuments, MmapVectorStore
+
+def make_documents(num_chunks: int, dimensions: int, chunk_chars: int) -> list[Document]:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(num_chunks, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    line = "def synthetic_function(x):\n    return x\n"
+    text = (line * (chunk_chars // len(line) + 1))[:chunk_chars]
+    return [
+        Document(
+            # distinct texts, so that no string is shared between chunks
+            text=f"{i} {text}",
+            meta_data={"file_path": f"src/file{i // 20}.py", "type": "py", "is_code": True},
+            vector=vectors[i].tolist(),
+            parent_doc_id=f"doc{i // 20}",
+            order=i % 20,
+            estimated_num_tokens=chunk_chars // 4,
+        )
+        for i in range(num_chunks)
+    ]
+
+def measure(load):
+    """Call load and return its result, the bytes it keeps allocated and the time it took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    corpus = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return corpus, size, elapsed
+
+def report(name: str, size: int, elapsed: float, num_chunks: int, baseline: int | None = None):
+    per_100k = size / num_chunks * 100_000 / 2 ** 20
+    ratio = f"{baseline / size:>8.1f}x" if baseline and size else ""
+    print(f"{name:<11}{size / 2 ** 20:>12.1f} MB{per_100k:>14.1f} MB{elapsed:>10.2f} s{ratio}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bioguider_bench_")
+    try:
+        print(f"Creating {args.chunks} chunks x {args.dimensions} dims of {args.chunk_chars} characters...")
+        print(f"{'':<11}{'resident':>15}{'per 100k':>17}{'load':>12}{'smaller':>9}")
+        documents, documents_size, elapsed = measure(
+            lambda: make_documents(args.chunks, args.dimensions, args.chunk_chars)
+        )
+        report("documents", documents_size, elapsed, args.chunks)
+
+        compact, size, elapsed = measure(lambda: CompactDocuments.from_documents(documents))
+        report("compact", size, elapsed, args.chunks, documents_size)
+        assert compact[args.chunks - 1].text == documents[-1].text
+
+        store_path = os.path.join(work_dir, "repo_code.store")
+        MmapVectorStore.save(store_path, documents).close()
+        del documents, compact
+        store, size, elapsed = measure(lambda: MmapVectorStore.load(store_path))
+        report("mmap", size, elapsed, args.chunks, documents_size)
+        store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Benchmark embedding wall-clock time against the number of batches in flight.
+
+Starts a local OpenAI-compatible /v1/embeddings stub that answers every request
+after a fixed latency, then embeds the same texts through EmbeddingExecutor at
+each concurrency level. Vectors are kept small by default so that the request
+latency, not the client-side parsing of the responses, dominates.
+
+Usage:
+    python debug/benchmark_embedding_concurrency.py --texts 4000 --batch-size 100 --latency 0.25
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import adalflow as adal
+from adalflow.components.model_client.openai_client import OpenAIClient
+
+from bioguider.rag.embedding_executor import EmbeddingExecutor
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        payload = json.dumps({
+            "object": "list",
+            "model": body["model"],
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [float(len(text))] * self.server.dimensions}
+                for i, text in enumerate(body["input"])
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_stub(latency: float, dimensions: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.dimensions = dimensions
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=4000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.25, help="Seconds per embedding request")
+    parser.add_argument("--dimensions", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    server = start_stub(args.latency, args.dimensions)
+    embedder = adal.Embedder(
+        model_client=OpenAIClient(api_key="benchmark", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1/"),
+        model_kwargs={"model": "text-embedding-3-small", "encoding_format": "float"},
+    )
+    texts = [f"chunk {i} " * 20 for i in range(args.texts)]
+    try:
+        print(f"{'concurrency':<14}{'seconds':>10}{'speedup':>10}")
+        baseline = None
+        for concurrency in args.concurrency:
+            executor = EmbeddingExecutor(embedder, batch_size=args.batch_size, max_concurrency=concurrency)
+            start = time.perf_counter()
+            vectors = executor.embed(texts)
+            elapsed = time.perf_counter() - start
+            assert len(vectors) == len(texts)
+            baseline = baseline or elapsed
+            print(f"{concurrency:<14}{elapsed:>10.2f}{baseline / elapsed:>9.1f}x")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare FAISS index types on a synthetic clustered corpus: recall@k against
+exact search, query latency, index memory and build (train + add) time.
+
+Configurations: Flat, the one choose_index_factory picks for the corpus size,
+and IVF-Flat / IVF-SQ8 / IVF-PQ with nprobe calibrated to --recall-target.
+
+Usage:
+    python debug/benchmark_faiss_index_types.py --vectors 200000 --dims 256
+"""
+
+import argparse
+import math
+import time
+
+import faiss
+import numpy as np
+
+from bioguider.rag.faiss_index import _exact_search, choose_index_factory, train_faiss_index
+
+def make_corpus(num_vectors: int, dims: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dims)).astype(np.float32)
+    vectors = np.empty((num_vectors, dims), dtype=np.float32)
+    for start in range(0, num_vectors, 65536):
+        end = min(start + 65536, num_vectors)
+        vectors[start:end] = centers[rng.integers(clusters, size=end - start)]
+        vectors[start:end] += 0.5 * rng.normal(size=(end - start, dims)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def index_memory(index: faiss.Index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = make_corpus(args.vectors, args.dims, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(args.vectors, size=args.queries, replace=False)].copy()
+    queries += 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+    exact = _exact_search(queries, vectors, args.top_k, inner_product=True)
+
+    nlist = max(1, min(int(4 * math.sqrt(args.vectors)), args.vectors // 39))
+    chosen = choose_index_factory(args.vectors, args.dims, recall_target=args.recall_target)
+    factories = ["Flat", f"IVF{nlist},Flat", f"IVF{nlist},SQ8"]
+    if args.dims % 8 == 0:
+        factories.append(f"IVF{nlist},PQ{args.dims // 8}")
+    print(f"{args.vectors} vectors x {args.dims} dims, {args.queries} queries, chosen: {chosen}")
+    print(f"{'factory':<22}{'nprobe':>8}{'recall@' + str(args.top_k):>12}{'ms/query':>10}{'memory MB':>11}{'build s':>9}")
+    for factory in factories:
+        start = time.perf_counter()
+        index = train_faiss_index(
+            vectors,
+            top_k=args.top_k,
+            index_config={"factory": factory, "recall_target": args.recall_target},
+        )
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query[None, :], args.top_k)
+        latency = (time.perf_counter() - start) / len(queries) * 1000
+        _, found = index.search(queries, args.top_k)
+        recall = np.mean([len(set(f) & set(e)) / args.top_k for f, e in zip(found.tolist(), exact.tolist())])
+        nprobe = faiss.extract_index_ivf(index).nprobe if factory != "Flat" else "-"
+        name = f"{factory}{' *' if factory == chosen else ''}"
+        print(
+            f"{name:<22}{nprobe:>8}{recall:>12.3f}{latency:>10.3f}"
+            f"{index_memory(index) / 2**20:>11.1f}{build_time:>9.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Benchmark the ingestion pipeline end to end on a synthetic repository, offline.
+
+Embeddings come from the local hashing backend (BIOGUIDER_EMBEDDER_BACKEND=local),
+so the timings measure this process only: no network, no provider rate limits.
+The embedding cache is disabled unless --embedding-cache is passed.
+
+Stages, run one after the other on the whole repository:
+list    list_repo_files
+read    iter_documents, both corpora
+split   the configured text splitter
+dedup   the chunk deduplicator, if configs["deduplication"] enables it
+embed   EmbeddingExecutor over the local embedder
+store   MmapVectorStoreWriter, chunks and vectors
+faiss   train_faiss_index on the stored vectors
+Then "pipeline" times DatabaseManager.prepare_database, which streams the same
+stages (reading, splitting and embedding overlap) on a fresh data folder.
+
+Usage:
+    python debug/benchmark_ingestion_pipeline.py --files 100000
+    python debug/benchmark_ingestion_pipeline.py --repo-dir /tmp/synthetic --keep
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import adalflow as adal
+import numpy as np
+
+from bioguider.rag.chunk_dedup import create_chunk_deduplicator
+from bioguider.rag.config import configs, create_model_client, create_model_kwargs
+from bioguider.rag.data_pipeline import DatabaseManager, create_text_splitter, iter_documents, list_repo_files
+from bioguider.rag.embedding_executor import create_embedding_executor
+from bioguider.rag.faiss_index import train_faiss_index
+from bioguider.rag.vector_store import MmapVectorStoreWriter
+
+WORDS = [
+    "sample", "gene", "expression", "matrix", "cluster", "cell", "read", "align", "count", "normalize",
+    "filter", "quality", "plot", "model", "fit", "predict", "score", "batch", "config", "result",
+]
+
+def make_python_file(rng: np.random.Generator, index: int) -> str:
+    functions = []
+    for f in range(int(rng.integers(2, 8))):
+        name = "_".join(rng.choice(WORDS, size=2))
+        body = "\n".join(
+            f"    {rng.choice(WORDS)} = {rng.choice(WORDS)}(x, {int(rng.integers(100))})"
+            for _ in range(int(rng.integers(3, 15)))
+        )
+        functions.append(f'def {name}_{index}_{f}(x):\n    """{" ".join(rng.choice(WORDS, size=8))}"""\n{body}\n    return x\n')
+    return "import os\nimport numpy as np\n\n\n" + "\n\n".join(functions)
+
+def make_markdown_file(rng: np.random.Generator, index: int) -> str:
+    sections = [
+        f"## {' '.join(rng.choice(WORDS, size=3)).title()}\n\n" + " ".join(rng.choice(WORDS, size=int(rng.integers(40, 200))))
+        for _ in range(int(rng.integers(1, 5)))
+    ]
+    return f"# Module {index}\n\n" + "\n\n".join(sections) + "\n"
+
+def make_repo(repo_dir: str, num_files: int, doc_ratio: float, duplicate_ratio: float, seed: int):
+    """num_files Python and Markdown files, 1000 per directory, some of them copies of others."""
+    rng = np.random.default_rng(seed)
+    contents = []
+    for i in range(num_files):
+        is_doc = rng.random() < doc_ratio
+        if contents and rng.random() < duplicate_ratio:
+            is_doc, content = contents[int(rng.integers(len(contents)))]
+        else:
+            content = make_markdown_file(rng, i) if is_doc else make_python_file(rng, i)
+            contents.append((is_doc, content))
+        directory = os.path.join(repo_dir, f"pkg{i // 1000}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module{i}.{'md' if is_doc else 'py'}"), "w", encoding="utf-8") as f:
+            f.write(content)
+
+def report(stage: str, elapsed: float, items: int, unit: str, num_bytes: int | None = None):
+    rate = f"{items / elapsed:>12,.0f} {unit}/s" if elapsed > 0 else f"{'-':>12} {unit}/s"
+    throughput = f"{num_bytes / elapsed / 2 ** 20:>9.1f} MB/s" if num_bytes is not None and elapsed > 0 else ""
+    print(f"{stage:<10}{elapsed:>9.2f} s{items:>12,} {unit:<8}{rate}{throughput}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--doc-ratio", type=float, default=0.3, help="Share of Markdown files")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="Share of files copied from another one")
+    parser.add_argument("--repo-dir", default=None, help="Reuse or create the synthetic repository here")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary repository and data folder")
+    parser.add_argument("--embedding-cache", action="store_true", help="Keep the embedding cache enabled")
+    parser.add_argument("--skip-pipeline", action="store_true", help="Only time the separate stages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configs["embedder"]["backend"] = "local"
+    configs["retrieval"]["mode"] = "vector"
+    configs["embedding_cache"]["enabled"] = args.embedding_cache
+    work_dir = tempfile.mkdtemp(prefix="bioguider-benchmark-")
+    repo_dir = os.path.abspath(args.repo_dir or os.path.join(work_dir, "repo"))
+    os.environ["DATA_FOLDER"] = os.path.join(work_dir, "data")
+    try:
+        if not os.path.isdir(repo_dir) or not os.listdir(repo_dir):
+            start = time.perf_counter()
+            make_repo(repo_dir, args.files, args.doc_ratio, args.duplicate_ratio, args.seed)
+            print(f"Generated {args.files:,} files in {repo_dir} in {time.perf_counter() - start:.1f} s")
+
+        print(f"{'stage':<10}{'time':>11}{'items':>12}{'':9}{'throughput':>17}")
+        start = time.perf_counter()
+        doc_files, code_files = list_repo_files(repo_dir)
+        report("list", time.perf_counter() - start, len(doc_files) + len(code_files), "files")
+
+        start = time.perf_counter()
+        documents = list(iter_documents(doc_files, repo_dir, is_code=False))
+        documents += list(iter_documents(code_files, repo_dir, is_code=True))
+        num_bytes = sum(len(doc.text.encode("utf-8")) for doc in documents)
+        report("read", time.perf_counter() - start, len(documents), "files", num_bytes)
+
+        start = time.perf_counter()
+        chunks = create_text_splitter()(documents)
+        report("split", time.perf_counter() - start, len(chunks), "chunks", num_bytes)
+
+        deduplicator = create_chunk_deduplicator()
+        if deduplicator is not None:
+            start = time.perf_counter()
+            num_chunks = len(chunks)
+            chunks = deduplicator(chunks)
+            report("dedup", time.perf_counter() - start, num_chunks, "chunks")
+        chunk_bytes = sum(len(chunk.text.encode("utf-8")) for chunk in chunks)
+
+        embedder = adal.Embedder(model_client=create_model_client(), model_kwargs=create_model_kwargs())
+        executor = create_embedding_executor(embedder, configs["embedder"]["batch_size"])
+        start = time.perf_counter()
+        vectors = np.asarray(
+            executor.embed([chunk.text for chunk in chunks], [chunk.estimated_num_tokens for chunk in chunks]),
+            dtype=np.float32,
+        )
+        report("embed", time.perf_counter() - start, len(chunks), "chunks", chunk_bytes)
+
+        start = time.perf_counter()
+        batch_size = configs["ingestion"]["batch_documents"]
+        with MmapVectorStoreWriter(os.path.join(work_dir, "benchmark.store")) as writer:
+            for offset in range(0, len(chunks), batch_size):
+                writer.add(chunks[offset:offset + batch_size], vectors[offset:offset + batch_size])
+            store = writer.commit()
+        report("store", time.perf_counter() - start, len(store), "chunks", chunk_bytes + vectors.nbytes)
+
+        start = time.perf_counter()
+        index = train_faiss_index(store.vectors, top_k=configs["retriever"]["top_k"])
+        report("faiss", time.perf_counter() - start, index.ntotal, "vectors", vectors.nbytes)
+        store.close()
+        del documents, chunks, vectors
+
+        if not args.skip_pipeline:
+            start = time.perf_counter()
+            manager = DatabaseManager()
+            manager.reset_database_and_create_repo(repo_dir)
+            doc_chunks, code_chunks = manager.prepare_database()
+            report("pipeline", time.perf_counter() - start, len(doc_chunks) + len(code_chunks), "chunks", num_bytes)
+    finally:
+        if args.keep:
+            print(f"Kept {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
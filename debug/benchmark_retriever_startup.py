@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark cold vs warm retriever-ready time for a large synthetic corpus.
+
+cold:       build the FAISS index from the vectors (first RAG instance on a corpus)
+warm:       read the index persisted for the corpus fingerprint
+warm-mmap:  memory-map the persisted index
+
+Usage:
+    python debug/benchmark_retriever_startup.py --chunks 200000 --dimensions 256
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from adalflow.core.types import Document
+
+from bioguider.rag.faiss_index import build_retriever
+from bioguider.rag.vector_store import MmapVectorStore
+
+def make_store(store_path: str, num_chunks: int, dimensions: int) -> MmapVectorStore:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(num_chunks, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [
+        Document(
+            text=f"synthetic chunk {i}",
+            meta_data={"file_path": f"src/file{i // 20}.py"},
+            estimated_num_tokens=3,
+        )
+        for i in range(num_chunks)
+    ]
+    return MmapVectorStore.save(store_path, documents, vectors=vectors)
+
+def time_retriever_ready(store_path: str, db_path: str, dimensions: int, mmap: bool) -> float:
+    start = time.perf_counter()
+    store = MmapVectorStore.load(store_path)
+    retriever = build_retriever(
+        store, embedder=None, db_path=db_path, mmap=mmap, top_k=20, dimensions=dimensions,
+    )
+    assert retriever.indexed
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bioguider_bench_")
+    try:
+        store_path = os.path.join(work_dir, "repo_doc.store")
+        db_path = os.path.join(work_dir, "repo_doc.pkl")
+        print(f"Creating a corpus of {args.chunks} chunks x {args.dimensions} dims...")
+        make_store(store_path, args.chunks, args.dimensions)
+
+        cold = time_retriever_ready(store_path, db_path, args.dimensions, mmap=False)
+        warm = time_retriever_ready(store_path, db_path, args.dimensions, mmap=False)
+        warm_mmap = time_retriever_ready(store_path, db_path, args.dimensions, mmap=True)
+
+        print(f"{'mode':<12}{'seconds':>10}")
+        print(f"{'cold':<12}{cold:>10.3f}")
+        print(f"{'warm':<12}{warm:>10.3f}")
+        print(f"{'warm-mmap':<12}{warm_mmap:>10.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark single-row lookups on CodeStructureDb and SummarizedFilesDb.
+
+A CodeStructureDb is filled with --symbols synthetic functions (--per-file per
+file) with a single insert_code_structures call, as CodeStructureBuilder does,
+and another one with one insert_code_structure call per symbol. A SummarizedFilesDb
+gets one summary per file. Then random lookups are timed one call at a time,
+the way the consistency and summarization steps run them:
+
+select_by_name               CodeStructureDb.select_by_name
+select_by_name_and_parent    CodeStructureDb.select_by_name_and_parent
+is_database_built            CodeStructureDb.is_database_built
+select_summarized_text       SummarizedFilesDb.select_summarized_text
+
+Usage:
+    python debug/benchmark_sqlite_lookups.py --symbols 20000 --lookups 5000
+    python debug/benchmark_sqlite_lookups.py --threads 8
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bioguider.database.code_structure_db import CodeStructureDb
+from bioguider.database.summarized_file_db import SummarizedFilesDb
+
+def make_symbols(num_symbols: int, per_file: int):
+    return (
+        (f"function_{i}", f"pkg/module{i // per_file}.py", i, i + 10, f"Class{i // 10}")
+        for i in range(num_symbols)
+    )
+
+def fill(code_db: CodeStructureDb, summary_db: SummarizedFilesDb, num_symbols: int, per_file: int):
+    rows_db = CodeStructureDb(code_db.author, f"{code_db.repo_name}_rows", data_folder=code_db.data_folder)
+    start = time.perf_counter()
+    for symbol in make_symbols(num_symbols, per_file):
+        rows_db.insert_code_structure(*symbol)
+    print(f"Inserted {num_symbols} symbols one by one in {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    code_db.insert_code_structures(make_symbols(num_symbols, per_file))
+    print(f"Inserted {num_symbols} symbols in one transaction in {time.perf_counter() - start:.2f} s")
+    for i in range(num_symbols // per_file):
+        summary_db.upsert_summarized_file(f"pkg/module{i}.py", "", 3, "N/A", f"summary of module {i}")
+
+def run(name: str, lookup, num_lookups: int, threads: int):
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(num_lookups):
+            lookup(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lookup, range(num_lookups)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{num_lookups / elapsed:>12,.0f} lookups/s{elapsed / num_lookups * 1e6:>10.1f} us", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=20_000)
+    parser.add_argument("--per-file", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=5_000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bioguider_bench_")
+    try:
+        code_db = CodeStructureDb("bench", "repo", data_folder=work_dir)
+        summary_db = SummarizedFilesDb("bench", "repo", data_folder=work_dir)
+        fill(code_db, summary_db, args.symbols, args.per_file)
+
+        rng = random.Random(0)
+        ids = [rng.randrange(args.symbols) for _ in range(args.lookups)]
+        run("select_by_name", lambda i: code_db.select_by_name(f"function_{ids[i]}"), args.lookups, args.threads)
+        run(
+            "select_by_name_and_parent",
+            lambda i: code_db.select_by_name_and_parent(f"function_{ids[i]}", f"Class{ids[i] // 10}"),
+            args.lookups,
+            args.threads,
+        )
+        run("is_database_built", lambda i: code_db.is_database_built(), args.lookups, args.threads)
+        run(
+            "select_summarized_text",
+            lambda i: summary_db.select_summarized_text(f"pkg/module{ids[i] // args.per_file}.py", "", 3),
+            args.lookups,
+            args.threads,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
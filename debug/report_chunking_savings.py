@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Report embedding requests and tokens of the token splitter + batch packer
+against the previous word splitter with fixed-size batches, on a repository.
+
+word:   TextSplitter(split_by="word", 350 words, 100 overlap), batches of 500 chunks,
+        files over 8192 tokens skipped
+token:  TokenTextSplitter with configs["text_splitter"] sizes, on the same files
+symbol: the configured splitter (Python and R files split along their symbols), on the
+        same files, and on all files including the large ones ("symbol+large")
+All but "word" are packed with configs["embedder"] (batch_size, max_batch_tokens).
+
+Usage:
+    python debug/report_chunking_savings.py /path/to/repo
+"""
+
+import argparse
+import os
+
+from adalflow.components.data_process import TextSplitter
+
+from bioguider.rag.config import configs
+from bioguider.rag.data_pipeline import create_text_splitter, list_repo_files, read_documents
+from bioguider.rag.embedding_executor import pack_batches
+from bioguider.rag.token_splitter import TokenTextSplitter
+from bioguider.rag.tokenizer import count_tokens_batch
+
+WORD_SPLITTER_CONFIG = {"split_by": "word", "chunk_size": 350, "chunk_overlap": 100}
+WORD_BATCH_SIZE = 500
+WORD_MAX_FILE_TOKENS = 8192
+
+def summarize(chunk_tokens: list[int], batches: list[range], provider_limit: int) -> dict:
+    request_tokens = [sum(chunk_tokens[ix] for ix in batch) for batch in batches]
+    return {
+        "chunks": len(chunk_tokens),
+        "tokens": sum(chunk_tokens),
+        "requests": len(batches),
+        "max_request_tokens": max(request_tokens, default=0),
+        "requests_over_limit": sum(1 for tokens in request_tokens if tokens > provider_limit),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repo_path")
+    parser.add_argument("--provider-limit", type=int, default=300_000, help="Maximum tokens per embedding request")
+    args = parser.parse_args()
+
+    repo_path = os.path.abspath(args.repo_path)
+    doc_files, code_files = list_repo_files(repo_path)
+    documents = read_documents(doc_files, repo_path, is_code=False) + read_documents(code_files, repo_path, is_code=True)
+    skipped = [doc for doc in documents if doc.meta_data["token_count"] > WORD_MAX_FILE_TOKENS]
+    print(f"{len(documents)} files, {len(skipped)} over {WORD_MAX_FILE_TOKENS} tokens (skipped by the word splitter)")
+
+    word_documents = [doc for doc in documents if doc.meta_data["token_count"] <= WORD_MAX_FILE_TOKENS]
+    word_chunks = TextSplitter(**WORD_SPLITTER_CONFIG)(word_documents)
+    word_tokens = count_tokens_batch([chunk.text for chunk in word_chunks])
+    word_batches = [
+        range(start, min(start + WORD_BATCH_SIZE, len(word_chunks)))
+        for start in range(0, len(word_chunks), WORD_BATCH_SIZE)
+    ]
+    word = summarize(word_tokens, word_batches, args.provider_limit)
+
+    token_splitter = TokenTextSplitter(
+        chunk_size=configs["text_splitter"]["chunk_size"],
+        chunk_overlap=configs["text_splitter"]["chunk_overlap"],
+    )
+    splitter = create_text_splitter()
+    max_batch_size, max_batch_tokens = configs["embedder"]["batch_size"], configs["embedder"].get("max_batch_tokens")
+    results = {"word": word}
+    for name, selected_splitter, selected in (
+        ("token", token_splitter, word_documents),
+        ("symbol", splitter, word_documents),
+        ("symbol+large", splitter, documents),
+    ):
+        chunk_tokens = [chunk.estimated_num_tokens for chunk in selected_splitter(selected)]
+        batches = pack_batches(chunk_tokens, max_batch_size, max_batch_tokens)
+        results[name] = summarize(chunk_tokens, batches, args.provider_limit)
+
+    # "token" and "symbol" embed the same files as "word", "symbol+large" also chunks the files "word" skipped
+    print(f"{'':<22}" + "".join(f"{name:>14}" for name in results) + f"{'saved':>10}")
+    for key in word:
+        token_value = results["symbol"][key]
+        saved = f"{1 - token_value / word[key]:.0%}" if key in ("tokens", "requests") and word[key] else ""
+        print(f"{key:<22}" + "".join(f"{result[key]:>14}" for result in results.values()) + f"{saved:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from adalflow.core.types import RetrieverOutput
+
+from bioguider.rag.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "def read_all_documents(path):\n    return read_documents(path)",
+    "Install the package with pip install bioguider",
+    "class DatabaseManager:\n    def prepare_database(self): pass",
+    "Documents are read from the repository and split into chunks",
+]
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("read_all_documents(DatabaseManager)") == [
+        "read_all_documents", "read", "all", "documents",
+        "databasemanager", "database", "manager",
+    ]
+    assert tokenize("HTTPServer x2") == ["httpserver", "http", "server", "x2", "x", "2"]
+
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index.build(TEXTS)
+    output = index.search("read_all_documents", top_k=3)
+    assert output.doc_indices[0] == 0
+    assert output.doc_scores == sorted(output.doc_scores, reverse=True)
+    assert index.search("DatabaseManager", top_k=3).doc_indices == [2]
+    assert index.search("unrelated words", top_k=3).doc_indices == []
+
+def test_save_and_load(tmp_path):
+    index = BM25Index.build(TEXTS)
+    index_path = str(tmp_path / "repo_doc.bm25.npz")
+    index.save(index_path)
+    loaded = BM25Index.load(index_path)
+    assert len(loaded) == len(TEXTS)
+    expected = index.search("install documents", top_k=4)
+    output = loaded.search("install documents", top_k=4)
+    assert output.doc_indices == expected.doc_indices
+    assert output.doc_scores == expected.doc_scores
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion(
+        [RetrieverOutput(doc_indices=[1, 2, 3]), RetrieverOutput(doc_indices=[3, 4])], top_k=3,
+    )
+    # 3 is ranked by both retrievers
+    assert fused.doc_indices == [3, 1, 2]
@@ -0,0 +1,111 @@
+import os
+import multiprocessing
+
+from bioguider.rag.cache_manager import CacheManager, main
+from bioguider.rag.data_pipeline import DatabaseManager
+from bioguider.utils.file_lock import FileLock
+
+def _make_repo(data_folder, name: str, size: int, accessed_at: float):
+    """Assets of a cached repository, size bytes in each of its three locations."""
+    repo_dir = data_folder / ".adalflow" / "repos" / name
+    repo_dir.mkdir(parents=True)
+    (repo_dir / "main.py").write_bytes(b"x" * size)
+    (data_folder / ".adalflow" / "repos" / f"{name}.repo.json").write_text("{}")
+    rag_dir = data_folder / ".adalflow" / "databases"
+    rag_dir.mkdir(parents=True, exist_ok=True)
+    (rag_dir / f"{name}_doc.pkl").write_bytes(b"x" * size)
+    (rag_dir / f"{name}_code.store").mkdir()
+    db_dir = data_folder / "databases"
+    db_dir.mkdir(parents=True, exist_ok=True)
+    (db_dir / f"{name}_code_structure.db").write_bytes(b"x" * size)
+    manager = CacheManager(str(data_folder))
+    manager.touch(name)
+    os.utime(manager.get_lock_path(name), (accessed_at, accessed_at))
+
+def _hold_lease(data_folder: str, name: str, ready, done):
+    lease = CacheManager(data_folder).lease(name)
+    ready.set()
+    done.wait(10)
+    lease.release()
+
+def test_entries_group_assets_by_repo(tmp_path):
+    _make_repo(tmp_path, "owner_a", 1000, 100)
+    _make_repo(tmp_path, "owner_b", 2000, 50)
+    entries = CacheManager(str(tmp_path)).list_entries()
+    assert [e.name for e in entries] == ["owner_b", "owner_a"]
+    assert len(entries[1].paths) == 5
+    assert entries[1].size >= 3000
+    assert entries[1].last_access == 100
+
+def test_collect_evicts_least_recently_used(tmp_path):
+    _make_repo(tmp_path, "owner_a", 1000, 300)
+    _make_repo(tmp_path, "owner_b", 1000, 100)
+    _make_repo(tmp_path, "owner_c", 1000, 200)
+    manager = CacheManager(str(tmp_path))
+    quota = sum(e.size for e in manager.list_entries()) - 1
+
+    assert manager.collect(quota, dry_run=True).evicted == ["owner_b"]
+    assert len(manager.list_entries()) == 3
+
+    result = manager.collect(quota)
+    assert result.evicted == ["owner_b"]
+    assert [e.name for e in manager.list_entries()] == ["owner_c", "owner_a"]
+    assert not (tmp_path / ".adalflow" / "repos" / "owner_b").exists()
+    assert not (tmp_path / "databases" / "owner_b_code_structure.db").exists()
+
+def test_repos_in_use_are_not_evicted(tmp_path):
+    _make_repo(tmp_path, "owner_a", 1000, 100)
+    _make_repo(tmp_path, "owner_b", 1000, 200)
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Event(), ctx.Event()
+    job = ctx.Process(target=_hold_lease, args=(str(tmp_path), "owner_a", ready, done))
+    job.start()
+    try:
+        assert ready.wait(30)
+        result = CacheManager(str(tmp_path)).collect(0)
+        assert result.skipped == ["owner_a"]
+        assert result.evicted == ["owner_b"]
+        assert (tmp_path / ".adalflow" / "repos" / "owner_a").exists()
+    finally:
+        done.set()
+        job.join()
+
+def test_repos_being_built_are_not_evicted(tmp_path):
+    _make_repo(tmp_path, "owner_a", 1000, 100)
+    manager = CacheManager(str(tmp_path))
+    with manager.build_lock("owner_a"):
+        result = manager.collect(0)
+    assert result.skipped == ["owner_a"]
+    assert (tmp_path / ".adalflow" / "repos" / "owner_a").exists()
+    assert manager.collect(0).evicted == ["owner_a"]
+
+def test_database_manager_leases_its_repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path))
+    repo_dir = tmp_path / "local_repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("hello")
+    db_manager = DatabaseManager()
+    db_manager.reset_database_and_create_repo(str(repo_dir))
+    name = db_manager.repo_paths["repo_name"]
+    (tmp_path / ".adalflow" / "databases" / f"{name}_doc.pkl").write_bytes(b"x")
+
+    manager = CacheManager(str(tmp_path))
+    assert manager.collect(0).skipped == [name]
+    db_manager.release_repo()
+    assert manager.collect(0).evicted == [name]
+
+def test_exclusive_lock_waits_for_shared_locks(tmp_path):
+    path = str(tmp_path / "repo.lock")
+    reader = FileLock(path, shared=True)
+    assert reader.acquire()
+    assert FileLock(path, shared=True).acquire(blocking=False)
+    assert not FileLock(path).acquire(timeout=0.1)
+    reader.release()
+    assert FileLock(path).acquire(blocking=False)
+
+def test_command_line(tmp_path, capsys):
+    _make_repo(tmp_path, "owner_a", 1000, 100)
+    assert main(["--data-folder", str(tmp_path), "list"]) == 0
+    assert "owner_a" in capsys.readouterr().out
+    assert main(["--data-folder", str(tmp_path), "evict", "owner_a", "owner_z"]) == 1
+    assert CacheManager(str(tmp_path)).list_entries() == []
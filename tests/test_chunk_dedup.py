@@ -0,0 +1,71 @@
+from adalflow.core.types import Document, RetrieverOutput
+
+from bioguider.rag.chunk_dedup import (
+    DUPLICATE_LOCATIONS_KEY,
+    ChunkDeduplicator,
+    deduplicate_retriever_output,
+)
+from bioguider.rag.config import configs
+from bioguider.rag.data_pipeline import (
+    read_documents,
+    transform_documents_and_save_to_store,
+    update_documents_in_store,
+)
+
+LICENSE = "Licensed under the MIT License.\nCopyright (c) the authors.\n"
+
+def _chunk(text: str, file_path: str, order: int = 0) -> Document:
+    return Document(text=text, meta_data={"file_path": file_path}, order=order)
+
+def test_exact_duplicates_are_dropped_across_batches():
+    deduplicator = ChunkDeduplicator()
+    first = deduplicator([_chunk(LICENSE, "a.py"), _chunk("def a(): pass", "a.py", 1)])
+    second = deduplicator([_chunk("  " + LICENSE.replace("\n", " \n"), "b.py"), _chunk("def b(): pass", "b.py", 1)])
+    assert [doc.meta_data["file_path"] for doc in first + second] == ["a.py", "a.py", "b.py"]
+    assert deduplicator.duplicate_locations[first[0].id] == [{"file_path": "b.py", "order": 0}]
+
+def test_near_duplicates_need_minhash():
+    text = " ".join(f"word{i}" for i in range(300))
+    near_copy = text.replace("word150", "changed")
+    assert len(ChunkDeduplicator()([_chunk(text, "a.md"), _chunk(near_copy, "b.md")])) == 2
+    deduplicator = ChunkDeduplicator(near_duplicates=True)
+    assert len(deduplicator([_chunk(text, "a.md"), _chunk(near_copy, "b.md"), _chunk("unrelated text", "c.md")])) == 2
+
+def test_store_keeps_one_copy_with_its_locations(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "vignettes").mkdir(parents=True)
+    (repo_dir / "inst" / "doc").mkdir(parents=True)
+    for path in ("vignettes/intro.Rmd", "inst/doc/intro.Rmd"):
+        (repo_dir / path).write_text("# Introduction\nInstall the package.\n")
+    (repo_dir / "README.md").write_text("Another text")
+    file_paths = [str(repo_dir / p) for p in ("vignettes/intro.Rmd", "inst/doc/intro.Rmd", "README.md")]
+
+    store_path = str(tmp_path / "repo_doc.store")
+    store = transform_documents_and_save_to_store(read_documents(file_paths, str(repo_dir), is_code=False), store_path)
+    assert len(store) == 2
+    assert store[0].meta_data["file_path"] == "vignettes/intro.Rmd"
+    assert [loc["file_path"] for loc in store[0].meta_data[DUPLICATE_LOCATIONS_KEY]] == ["inst/doc/intro.Rmd"]
+    assert DUPLICATE_LOCATIONS_KEY not in store[1].meta_data
+
+    # the copy takes over when the stored file is deleted
+    store = update_documents_in_store(store, {"vignettes/intro.Rmd"}, [], store_path)
+    assert len(store) == 2
+    assert store[0].meta_data["file_path"] == "inst/doc/intro.Rmd"
+    assert DUPLICATE_LOCATIONS_KEY not in store[0].meta_data
+
+    # a new copy of a kept chunk is not stored again
+    (repo_dir / "vignettes" / "intro.Rmd").write_text("# Introduction\nInstall the package.\n")
+    new_documents = read_documents([file_paths[0]], str(repo_dir), is_code=False)
+    store = update_documents_in_store(store, {"vignettes/intro.Rmd"}, new_documents, store_path)
+    assert len(store) == 2
+    assert [loc["file_path"] for loc in store[0].meta_data[DUPLICATE_LOCATIONS_KEY]] == ["vignettes/intro.Rmd"]
+
+def test_retriever_output_is_deduplicated():
+    documents = [_chunk("same", "a.md"), _chunk("other", "b.md"), _chunk("same ", "c.md")]
+    output = deduplicate_retriever_output(
+        RetrieverOutput(doc_indices=[0, 1, 2], doc_scores=[0.9, 0.8, 0.7], query="q", documents=documents)
+    )
+    assert output.doc_indices == [0, 1]
+    assert output.doc_scores == [0.9, 0.8]
+    assert [doc.meta_data["file_path"] for doc in output.documents] == ["a.md", "b.md"]
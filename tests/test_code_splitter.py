@@ -0,0 +1,72 @@
+from adalflow.core.types import Document
+
+from bioguider.rag.code_splitter import CodeTextSplitter
+
+PYTHON_SOURCE = '''import os
+
+def small_a():
+    return 1
+
+def small_b():
+    return 2
+
+class Loader:
+    """Loads things."""
+
+    def load(self, path):
+{load_body}
+        return path
+
+    def close(self):
+        pass
+'''
+
+R_SOURCE = '''#' Add two numbers
+add <- function(a, b) {
+  a + b
+}
+
+mult <- function(a, b) {
+  a * b
+}
+'''
+
+def _document(text: str, file_path: str) -> Document:
+    return Document(text=text, meta_data={"file_path": file_path, "is_code": True})
+
+def test_small_symbols_are_merged_with_their_neighbours():
+    source = PYTHON_SOURCE.replace("{load_body}", "        x = 1")
+    chunks = CodeTextSplitter(chunk_size=512, min_chunk_size=64)([_document(source, "loader.py")])
+    assert len(chunks) == 1
+    assert chunks[0].text == source
+    assert [s["name"] for s in chunks[0].meta_data["symbols"]] == ["small_a", "small_b", "Loader"]
+    assert (chunks[0].meta_data["start_line"], chunks[0].meta_data["end_line"]) == (1, 17)
+
+def test_large_classes_are_split_into_methods():
+    body = "\n".join(f"        value_{i} = compute(path, {i})" for i in range(40))
+    source = PYTHON_SOURCE.replace("{load_body}", body)
+    chunks = CodeTextSplitter(chunk_size=256, min_chunk_size=32)([_document(source, "loader.py")])
+    load_chunks = [chunk for chunk in chunks if chunk.meta_data["symbol"] == "load"]
+    assert len(load_chunks) >= 2
+    assert all(chunk.meta_data["parent"] == "Loader" for chunk in load_chunks)
+    assert all(chunk.estimated_num_tokens <= 256 for chunk in chunks)
+    # windows of the oversized method cover it exactly, line by line
+    assert load_chunks[0].text.startswith("    def load(self, path):")
+    lines = source.splitlines(keepends=True)
+    for chunk in chunks:
+        start, end = chunk.meta_data["start_line"], chunk.meta_data["end_line"]
+        assert chunk.text == "".join(lines[start - 1:end])
+
+def test_r_functions_carry_their_line_range():
+    chunks = CodeTextSplitter(chunk_size=512, min_chunk_size=1)([_document(R_SOURCE, "R/math.R")])
+    symbols = [(s["name"], s["start_line"], s["end_line"]) for c in chunks for s in c.meta_data["symbols"]]
+    assert symbols == [("add", 2, 4), ("mult", 6, 8)]
+    assert chunks[0].text.startswith("#' Add two numbers")
+
+def test_other_files_are_split_by_tokens():
+    chunks = CodeTextSplitter(chunk_size=16, chunk_overlap=4)([
+        _document("word " * 40, "README.md"),
+        _document("def broken(:\n" * 10, "broken.py"),
+    ])
+    assert all("symbol" not in chunk.meta_data for chunk in chunks)
+    assert {chunk.meta_data["file_path"] for chunk in chunks} == {"README.md", "broken.py"}
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+
+from bioguider.database.code_structure_db import (
+    CodeStructureDb,
+    code_structure_create_table_query,
+    code_structure_insert_query,
+    code_structure_migrations,
+    code_structure_select_by_parent_query,
+)
+
+def test_insert_code_structures_in_batches(tmp_path):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    symbols = (
+        (f"function_{i}", f"pkg/module{i // 10}.py", i, i + 5, None, f"doc {i}", {"x": "int"})
+        for i in range(2500)
+    )
+    assert db.insert_code_structures(symbols, batch_size=1000)
+    assert len(db.select_by_path("pkg/module7.py")) == 10
+    row = db.select_by_name("function_42")[0]
+    assert (row["parent"], row["doc_string"], row["params"]) == ("", "doc 42", '{"x": "int"}')
+
+    # entries that already exist are updated
+    assert db.insert_code_structures([("function_42", "pkg/module4.py", 42, 47, None, "new doc")])
+    assert [row["doc_string"] for row in db.select_by_name("function_42")] == ["new doc"]
+
+def test_insert_code_structures_is_atomic(tmp_path):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    symbols = [("add", "main.py", 1, 2), (None, "main.py", 3, 4)]
+    assert not db.insert_code_structures(symbols)
+    assert not db.is_database_built()
+    assert db.insert_code_structures([])
+
+def test_existing_database_is_migrated(tmp_path):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    os.makedirs(os.path.dirname(db.get_db_file()))
+    connection = sqlite3.connect(db.get_db_file())
+    connection.execute(code_structure_create_table_query)
+    connection.execute(code_structure_insert_query, ("add", "main.py", 1, 2, "", None, None, None, None))
+    connection.commit()
+    connection.close()
+
+    assert db.select_by_name("add")[0]["path"] == "main.py"
+    connection = sqlite3.connect(db.get_db_file())
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == len(code_structure_migrations)
+    plan = connection.execute(f"EXPLAIN QUERY PLAN {code_structure_select_by_parent_query}", ("",)).fetchall()
+    assert "USING INDEX idx_code_structure_parent_path" in plan[0][-1]
+    connection.close()
+
+def _lookup_one(db: CodeStructureDb, name, parent, path) -> list:
+    """The single-row queries ConsistencyQueryStep issued for one symbol."""
+    if name is None:
+        if path is not None:
+            return db.select_by_path(path)
+        return db.select_by_parent(parent) if parent is not None else []
+    if path is not None:
+        row = db.select_by_name_and_parent_and_path(name, parent, path) if parent is not None else None
+        row = row or db.select_by_name_and_path(name, path)
+        if row is not None:
+            return [row]
+    if parent is not None:
+        rows = db.select_by_name_and_parent(name, parent)
+        if rows:
+            return rows
+    return db.select_by_name(name)
+
+def test_lookup_many_matches_single_lookups(tmp_path):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    # "run" is defined as a method of two classes and as a function in several files
+    db.insert_code_structures([
+        ("Model", "model.py", 1, 50, None),
+        ("run", "model.py", 10, 20, "Model"),
+        ("Trainer", "train.py", 1, 80, None),
+        ("run", "train.py", 10, 20, "Trainer"),
+        ("run", "cli.py", 1, 5, None),
+        ("run", "scripts/main.R", 1, 5, None),
+        ("fit", "train.py", 30, 40, "Trainer"),
+    ])
+    specs = [
+        ("run", "Trainer", "train.py"),
+        ("run", "Model", "train.py"),
+        ("run", "Trainer", "other.py"),
+        ("run", "Unknown", "other.py"),
+        ("run", None, "cli.py"),
+        ("run", None, "other.py"),
+        ("run", "Model", None),
+        ("run", None, None),
+        ("missing", "Trainer", "train.py"),
+        (None, None, "train.py"),
+        (None, "Trainer", None),
+        (None, "Trainer", "missing.py"),
+        (None, None, None),
+    ]
+    results = db.lookup_many(specs)
+    assert len(results) == len(specs)
+    for spec, rows in zip(specs, results):
+        assert sorted(row["id"] for row in rows) == sorted(row["id"] for row in _lookup_one(db, *spec)), spec
+    assert [row["path"] for row in results[2]] == ["train.py"]
+    assert len(results[7]) == 4
+    assert results[8] == [] and results[12] == []
+    assert db.lookup_many([]) == []
+    # the temporary table is reset between calls
+    assert [len(rows) for rows in db.lookup_many([("fit", None, None)])] == [1]
@@ -0,0 +1,49 @@
+import os
+import threading
+
+from bioguider.database.code_structure_db import CodeStructureDb
+from bioguider.database.connection_pool import close_connections, get_connection
+
+SCHEMA = ["CREATE TABLE IF NOT EXISTS t (x INTEGER)"]
+
+def test_connections_are_reused_per_thread(tmp_path):
+    db_file = str(tmp_path / "databases" / "test.db")
+    connection = get_connection(db_file, SCHEMA)
+    assert get_connection(db_file, SCHEMA) is connection
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1
+    connection.execute("INSERT INTO t VALUES (1)")
+    connection.commit()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_connection(db_file, SCHEMA).execute("SELECT x FROM t").fetchall()))
+    thread.start()
+    thread.join()
+    assert other == [[(1,)]]
+    close_connections(db_file)
+    assert get_connection(db_file, SCHEMA) is not connection
+    close_connections()
+
+def test_deleted_database_is_recreated(tmp_path):
+    db_file = str(tmp_path / "test.db")
+    connection = get_connection(db_file, SCHEMA)
+    connection.execute("INSERT INTO t VALUES (1)")
+    connection.commit()
+    for path in (db_file, f"{db_file}-wal", f"{db_file}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    connection = get_connection(db_file, SCHEMA)
+    assert connection.execute("SELECT x FROM t").fetchall() == []
+    close_connections()
+
+def test_published_staging_db_is_seen_by_open_connections(tmp_path):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    assert not db.is_database_built()
+    staging_db = db.create_staging_db()
+    staging_db.insert_code_structure("add", "main.py", 1, 2)
+    db.publish_staging_db(staging_db)
+    assert db.is_database_built()
+    assert db.select_by_name("add")[0]["path"] == "main.py"
+    assert not os.path.exists(staging_db.get_db_file())
+    assert not any(".tmp." in name for name in os.listdir(tmp_path / "databases"))
+    close_connections()
@@ -0,0 +1,22 @@
+from bioguider.agents.consistency_query_step import ConsistencyQueryStep
+from bioguider.database.code_structure_db import CodeStructureDb
+
+def test_query_step_looks_up_all_symbols_at_once(tmp_path, monkeypatch):
+    db = CodeStructureDb("foo", "bar", data_folder=str(tmp_path))
+    db.insert_code_structures([("fit", "train.py", 30, 40, "Trainer"), ("run", "cli.py", 1, 5, None)])
+    calls = []
+    lookup_many = db.lookup_many
+    monkeypatch.setattr(db, "lookup_many", lambda specs: calls.append(specs) or lookup_many(specs))
+    outputs = []
+    state = {
+        "step_output_callback": lambda **kwargs: outputs.append(kwargs["step_output"]),
+        "functions_and_classes": [
+            {"name": "fit", "file_path": "N/A", "parent": "Trainer", "parameters": "x"},
+            {"name": "missing"},
+            {"name": "run", "file_path": "cli.py"},
+        ],
+    }
+    state, _ = ConsistencyQueryStep(code_structure_db=db)._execute_directly(state)
+    assert calls == [[("fit", "Trainer", None), ("missing", None, None), ("run", None, "cli.py")]]
+    assert [row["name"] for row in state["all_query_rows"]] == ["fit", "run"]
+    assert "No such function or class missing" in outputs
@@ -0,0 +1,79 @@
+import os
+import threading
+
+from adalflow.core.types import Document
+
+import bioguider.rag.data_pipeline as data_pipeline
+from bioguider.rag.data_pipeline import (
+    create_text_splitter,
+    iter_document_batches,
+    iter_documents,
+    list_repo_files,
+    read_documents,
+)
+
+R_SOURCE = """add <- function(a, b) {
+  a + b
+}
+
+mult <- function(a, b) {
+  a * b
+}
+"""
+
+def test_iter_documents_keeps_order_and_skips_unreadable_files(tmp_path):
+    file_paths = []
+    for i in range(50):
+        file_path = tmp_path / f"file{i}.md"
+        file_path.write_text(f"content {i}")
+        file_paths.append(str(file_path))
+    file_paths.insert(10, str(tmp_path / "missing.md"))
+    documents = list(iter_documents(file_paths, str(tmp_path), is_code=False, max_workers=4, prefetch=8))
+    assert [doc.meta_data["file_path"] for doc in documents] == [f"file{i}.md" for i in range(50)]
+    assert documents[3].text == "content 3"
+    assert documents[3].estimated_num_tokens == documents[3].meta_data["token_count"]
+
+def test_iter_documents_reads_ahead_a_bounded_number_of_files(tmp_path, monkeypatch):
+    reads = []
+    lock = threading.Lock()
+    read_document = data_pipeline._read_document
+
+    def _counting_read_document(*args):
+        with lock:
+            reads.append(args[0])
+        return read_document(*args)
+    monkeypatch.setattr(data_pipeline, "_read_document", _counting_read_document)
+    file_paths = []
+    for i in range(100):
+        file_path = tmp_path / f"file{i}.py"
+        file_path.write_text("x = 1")
+        file_paths.append(str(file_path))
+
+    documents = iter_documents(file_paths, str(tmp_path), is_code=True, max_workers=2, prefetch=10)
+    next(documents)
+    assert len(reads) <= 11
+    documents.close()
+
+def test_iter_document_batches():
+    documents = [Document(text="x", estimated_num_tokens=n) for n in [5, 5, 5, 20, 1, 1, 1]]
+    batches = list(iter_document_batches(documents, max_tokens=10, max_documents=2))
+    assert [[doc.estimated_num_tokens for doc in batch] for batch in batches] == [
+        [5, 5], [5], [20], [1, 1], [1],
+    ]
+
+def test_r_files_are_split_by_symbol_in_the_code_corpus(tmp_path):
+    for gitignore in (False, True):
+        repo_dir = tmp_path / f"repo_{gitignore}"
+        (repo_dir / "R").mkdir(parents=True)
+        (repo_dir / "R" / "math.R").write_text(R_SOURCE)
+        (repo_dir / "scripts").mkdir()
+        (repo_dir / "scripts" / "run.r").write_text(R_SOURCE)
+        if gitignore:
+            (repo_dir / ".gitignore").write_text("*.log\n")
+        doc_files, code_files = list_repo_files(str(repo_dir))
+        assert sorted(os.path.relpath(f, repo_dir) for f in code_files) == ["R/math.R", "scripts/run.r"]
+        assert doc_files == []
+
+        chunks = create_text_splitter()(read_documents(code_files, str(repo_dir), is_code=True))
+        symbols = sorted(s["name"] for chunk in chunks for s in chunk.meta_data["symbols"])
+        assert symbols == ["add", "add", "mult", "mult"]
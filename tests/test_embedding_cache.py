@@ -0,0 +1,77 @@
+import adalflow as adal
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import Document, Embedding, EmbedderOutput, ModelType
+
+from bioguider.rag.embedding_cache import CachedToEmbeddings, EmbeddingCache
+
+class CountingEmbeddingClient(ModelClient):
+    """Embeds a text as [len(text), 1.0] and records every request."""
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def convert_inputs_to_api_kwargs(self, input=None, model_kwargs={}, model_type=ModelType.UNDEFINED):
+        return {"input": input if isinstance(input, list) else [input], **model_kwargs}
+
+    def call(self, api_kwargs={}, model_type=ModelType.UNDEFINED):
+        self.requests.append(list(api_kwargs["input"]))
+        return api_kwargs["input"]
+
+    def parse_embedding_response(self, response) -> EmbedderOutput:
+        return EmbedderOutput(data=[
+            Embedding(embedding=[float(len(text)), 1.0], index=i) for i, text in enumerate(response)
+        ])
+
+def test_cache_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"))
+    key = EmbeddingCache.make_key("hello", "model", 2)
+    assert cache.get_many([key]) == {}
+    cache.put_many({key: [0.5, 0.25]})
+    assert cache.get_many([key]) == {key: [0.5, 0.25]}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert EmbeddingCache.make_key("hello", "model", 4) != key
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    # each vector of 64 float32 takes 256 bytes, the cap holds 3 of them
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"), max_size_mb=800 / (1024 * 1024))
+    for key in ["a", "b", "c"]:
+        cache.put_many({key: [1.0] * 64})
+    cache.get_many(["a"])
+    cache.put_many({"d": [1.0] * 64})
+    found = cache.get_many(["a", "b", "c", "d"])
+    assert "a" in found
+    assert "d" in found
+    assert "b" not in found
+
+def test_cache_size_is_not_read_on_every_put(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"), max_size_mb=800 / (1024 * 1024))
+    cache.put_many({"a": [1.0] * 64})
+    size_queries = []
+    cache._connect().set_trace_callback(lambda sql: size_queries.append(sql) if "SUM(nbytes)" in sql else None)
+    cache.put_many({"b": [1.0] * 64})
+    cache.put_many({"c": [1.0] * 64})
+    assert size_queries == []
+
+    # replacing vectors overestimates the size, which is read again instead of evicting
+    cache.put_many({"a": [2.0] * 64})
+    assert len(size_queries) == 1
+    assert len(cache.get_many(["a", "b", "c"])) == 3
+
+def test_cached_to_embeddings_only_embeds_misses(tmp_path):
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"))
+    client = CountingEmbeddingClient()
+    embedder = adal.Embedder(model_client=client, model_kwargs={"model": "fake", "dimensions": 2})
+    to_embeddings = CachedToEmbeddings(embedder=embedder, batch_size=2, cache=cache)
+
+    docs = [Document(text=t) for t in ["aa", "bbb", "aa", "c"]]
+    output = to_embeddings(docs)
+    assert [doc.vector for doc in output] == [[2.0, 1.0], [3.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert client.requests == [["aa", "bbb"], ["c"]]
+
+    client.requests.clear()
+    output = to_embeddings([Document(text=t) for t in ["c", "dddd", "aa"]])
+    assert [doc.vector for doc in output] == [[1.0, 1.0], [4.0, 1.0], [2.0, 1.0]]
+    assert client.requests == [["dddd"]]
@@ -0,0 +1,145 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import adalflow as adal
+from adalflow.components.model_client.openai_client import OpenAIClient
+from adalflow.core.types import ModelType
+
+from bioguider.rag.embedding_executor import EmbeddingExecutor, TokenBucket, pack_batches
+
+class EmbeddingStubServer(ThreadingHTTPServer):
+    """An OpenAI-compatible /v1/embeddings endpoint embedding a text as [len(text), 1.0]."""
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, rate_limited_requests: int = 0):
+        super().__init__(("127.0.0.1", 0), EmbeddingStubHandler)
+        self.latency = latency
+        self.rate_limited_requests = rate_limited_requests
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+class EmbeddingStubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server: EmbeddingStubServer = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        with server.lock:
+            server.requests.append(texts)
+            rate_limited = server.rate_limited_requests > 0
+            if rate_limited:
+                server.rate_limited_requests -= 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if rate_limited:
+                self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}})
+                return
+            self._send_json(200, {
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]}
+                    for i, text in enumerate(texts)
+                ],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def _start(**kwargs) -> EmbeddingStubServer:
+        server = EmbeddingStubServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    yield _start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+class NoRetryOpenAIClient(OpenAIClient):
+    """OpenAIClient without the retries of adalflow and of the openai SDK, so that only the executor retries."""
+    def init_sync_client(self):
+        return super().init_sync_client().with_options(max_retries=0)
+
+    def call(self, api_kwargs={}, model_type=ModelType.UNDEFINED):
+        return self.sync_client.embeddings.create(**api_kwargs)
+
+def _make_embedder(server: EmbeddingStubServer) -> adal.Embedder:
+    client = NoRetryOpenAIClient(api_key="test", base_url=server.base_url)
+    return adal.Embedder(
+        model_client=client,
+        model_kwargs={"model": "text-embedding-3-small", "encoding_format": "float"},
+    )
+
+def test_batches_run_concurrently_and_keep_order(stub_server):
+    server = stub_server(latency=0.2)
+    executor = EmbeddingExecutor(_make_embedder(server), batch_size=2, max_concurrency=4)
+    texts = ["x" * i for i in range(1, 17)]
+    start = time.perf_counter()
+    vectors = executor.embed(texts)
+    elapsed = time.perf_counter() - start
+    assert vectors == [[float(i), 1.0] for i in range(1, 17)]
+    assert len(server.requests) == 8
+    assert server.max_in_flight == 4
+    # 8 batches of 0.2s, 4 at a time
+    assert elapsed < 1.2
+
+def test_rate_limited_requests_are_retried(stub_server):
+    server = stub_server(rate_limited_requests=2)
+    executor = EmbeddingExecutor(_make_embedder(server), batch_size=10, backoff_base=0.01)
+    assert executor.embed(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    assert len(server.requests) == 3
+
+def test_gives_up_after_max_retries(stub_server):
+    server = stub_server(rate_limited_requests=10)
+    executor = EmbeddingExecutor(_make_embedder(server), batch_size=10, max_retries=1, backoff_base=0.01)
+    with pytest.raises(ValueError):
+        executor.embed(["a"])
+    assert len(server.requests) == 2
+
+def test_token_bucket_limits_rate():
+    # 600 per minute refills 10 per second, starting with a full bucket of 600
+    bucket = TokenBucket(rate_per_minute=600)
+    bucket.acquire(600)
+    start = time.perf_counter()
+    bucket.acquire(3)
+    assert 0.2 < time.perf_counter() - start < 1.0
+    unlimited = TokenBucket(None)
+    unlimited.acquire(10 ** 9)
+
+def test_pack_batches_by_count_and_tokens():
+    assert pack_batches([1] * 5, max_batch_size=2) == [range(0, 2), range(2, 4), range(4, 5)]
+    assert pack_batches([40, 40, 40, 100, 10], max_batch_size=10, max_batch_tokens=100) == [
+        range(0, 2), range(2, 3), range(3, 4), range(4, 5),
+    ]
+    # a text over the ceiling gets its own batch
+    assert pack_batches([10, 500, 10], max_batch_size=10, max_batch_tokens=100) == [
+        range(0, 1), range(1, 2), range(2, 3),
+    ]
+    assert pack_batches([], max_batch_size=10) == []
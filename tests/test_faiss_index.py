@@ -0,0 +1,124 @@
+import os
+
+import faiss
+import numpy as np
+from adalflow.core.types import Document
+
+from bioguider.rag.config import configs
+from bioguider.rag.faiss_index import (
+    build_retriever,
+    calibrate_nprobe,
+    choose_index_factory,
+    get_corpus_fingerprint,
+    get_or_train_faiss_index,
+    search_retriever,
+    train_faiss_index,
+)
+from bioguider.rag.vector_store import MmapVectorStore
+
+def _make_store(tmp_path, n: int = 50, dims: int = 16, seed: int = 0) -> MmapVectorStore:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [Document(text=f"chunk {i}", meta_data={"file_path": f"f{i}.md"}) for i in range(n)]
+    return MmapVectorStore.save(str(tmp_path / "repo_doc.store"), documents, vectors=vectors)
+
+def _index_files(tmp_path) -> list[str]:
+    return sorted(p for p in os.listdir(tmp_path) if p.endswith(".faiss"))
+
+def test_index_is_persisted_and_reloaded(tmp_path, monkeypatch):
+    store = _make_store(tmp_path)
+    db_path = str(tmp_path / "repo_doc.pkl")
+    retriever = build_retriever(store, embedder=None, db_path=db_path, top_k=3)
+    assert len(_index_files(tmp_path)) == 1
+    expected = retriever(np.asarray(store.vectors[:2]))
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the persisted index should be reused")
+    monkeypatch.setattr(
+        "adalflow.components.retriever.faiss_retriever.FAISSRetriever.build_index_from_documents", _fail
+    )
+    for mmap in (False, True):
+        reloaded = build_retriever(store, embedder=None, db_path=db_path, top_k=3, mmap=mmap)
+        output = reloaded(np.asarray(store.vectors[:2]))
+        assert [o.doc_indices for o in output] == [o.doc_indices for o in expected]
+        assert output[0].doc_indices[0] == 0
+
+def test_index_is_rebuilt_when_corpus_changes(tmp_path):
+    db_path = str(tmp_path / "repo_doc.pkl")
+    store = _make_store(tmp_path, seed=0)
+    build_retriever(store, embedder=None, db_path=db_path)
+    first_files = _index_files(tmp_path)
+
+    changed_store = _make_store(tmp_path, seed=1)
+    assert get_corpus_fingerprint(changed_store) != get_corpus_fingerprint(store)
+    build_retriever(changed_store, embedder=None, db_path=db_path)
+    second_files = _index_files(tmp_path)
+    assert len(second_files) == 1
+    assert second_files != first_files
+
+def _clustered_vectors(n: int, dims: int = 32, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dims))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dims))
+    return vectors.astype(np.float32)
+
+def test_choose_index_factory():
+    assert choose_index_factory(1_000, 256) == "Flat"
+    assert choose_index_factory(500_000, 256, recall_target=0.995) == "Flat"
+    assert choose_index_factory(500_000, 256).startswith("IVF") and choose_index_factory(500_000, 256).endswith(",Flat")
+    assert choose_index_factory(5_000_000, 256, recall_target=0.95).endswith(",SQ8")
+    assert choose_index_factory(5_000_000, 256, recall_target=0.8).endswith(",PQ32")
+    assert choose_index_factory(2_000, 16, flat_max_vectors=100) == "IVF51,Flat"
+
+def test_ivf_index_reaches_recall_target():
+    vectors = _clustered_vectors(5_000)
+    index = train_faiss_index(vectors, top_k=10, index_config={"flat_max_vectors": 1_000})
+    ivf = faiss.extract_index_ivf(index)
+    assert ivf.nlist > 1 and index.ntotal == len(vectors)
+    # the calibrated nprobe is a trade-off, not a full scan
+    assert 1 <= ivf.nprobe <= ivf.nlist
+    nprobe, recall = calibrate_nprobe(index, vectors, top_k=10, recall_target=0.95, seed=1)
+    assert recall >= 0.95
+
+def test_ivf_index_is_trained_once_and_keeps_nprobe(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["faiss_index"], "flat_max_vectors", 1_000)
+    vectors = _clustered_vectors(4_000)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [Document(text=f"chunk {i}", meta_data={}) for i in range(len(vectors))]
+    store = MmapVectorStore.save(str(tmp_path / "repo_doc.store"), documents, vectors=vectors)
+    db_path = str(tmp_path / "repo_doc.pkl")
+
+    # ingest only persists the index
+    assert get_or_train_faiss_index(store, db_path=db_path, top_k=5, load=False) is not None
+    assert get_or_train_faiss_index(store, db_path=db_path, top_k=5, load=False) is None
+    trained_nprobe = faiss.extract_index_ivf(faiss.read_index(str(tmp_path / _index_files(tmp_path)[0]))).nprobe
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the persisted index should be reused")
+    monkeypatch.setattr("bioguider.rag.faiss_index.train_faiss_index", _fail)
+    retriever = build_retriever(store, embedder=None, db_path=db_path, top_k=5, mmap=True)
+    assert retriever.dimensions == 32
+    assert faiss.extract_index_ivf(retriever.index).nprobe == trained_nprobe
+    output = retriever(np.asarray(store.vectors[:3]))
+    assert [o.doc_indices[0] for o in output] == [0, 1, 2]
+
+def test_missing_hits_are_dropped_per_query(tmp_path):
+    store = _make_store(tmp_path, n=64)
+    vectors = np.asarray(store.vectors)
+    index = faiss.index_factory(vectors.shape[1], "IVF8,Flat", faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = 1
+    retriever = build_retriever(store, embedder=None, persist=False, top_k=20, metric="prob")
+    retriever.index = index
+
+    outputs = search_retriever(retriever, vectors[:8], 20)
+    # a probed list holds fewer than 20 vectors: every query keeps all of its own hits
+    hits = [len(output.doc_indices) for output in outputs]
+    assert len(set(hits)) > 1
+    _, indices = index.search(vectors[:8], 20)
+    assert hits == [int((row >= 0).sum()) for row in indices]
+    assert all(-1 not in output.doc_indices for output in outputs)
+    assert all(len(output.doc_scores) == len(output.doc_indices) for output in outputs)
+    assert [output.doc_indices[0] for output in outputs] == list(range(8))
@@ -0,0 +1,48 @@
+import os
+
+from bioguider.rag.file_manifest import FileManifest
+
+def _write(path, content: str):
+    with open(path, "w") as f:
+        f.write(content)
+
+def test_manifest_diff(tmp_path):
+    _write(tmp_path / "a.md", "aaa")
+    _write(tmp_path / "b.md", "bbb")
+    _write(tmp_path / "c.md", "ccc")
+    previous = FileManifest.build(str(tmp_path), ["a.md", "b.md", "c.md"])
+
+    _write(tmp_path / "b.md", "bbb changed")
+    os.remove(tmp_path / "c.md")
+    _write(tmp_path / "d.md", "ddd")
+    current = FileManifest.build(str(tmp_path), ["a.md", "b.md", "d.md"], previous=previous)
+
+    diff = previous.diff(current)
+    assert diff.added == ["d.md"]
+    assert diff.modified == ["b.md"]
+    assert diff.deleted == ["c.md"]
+    assert diff.unchanged == ["a.md"]
+    assert sorted(diff.changed) == ["b.md", "d.md"]
+    assert sorted(diff.removed) == ["b.md", "c.md"]
+
+def test_manifest_touched_file_is_unchanged(tmp_path):
+    _write(tmp_path / "a.md", "aaa")
+    previous = FileManifest.build(str(tmp_path), ["a.md"])
+    stat = os.stat(tmp_path / "a.md")
+    os.utime(tmp_path / "a.md", (stat.st_atime, stat.st_mtime + 10))
+
+    current = FileManifest.build(str(tmp_path), ["a.md"], previous=previous)
+    assert previous.diff(current).is_empty
+    assert current.entries["a.md"].mtime != previous.entries["a.md"].mtime
+
+def test_manifest_save_and_load(tmp_path):
+    _write(tmp_path / "a.md", "aaa")
+    manifest = FileManifest.build(str(tmp_path), ["a.md"], settings={"chunk_size": 350})
+    manifest_path = str(tmp_path / "db" / "repo_doc.manifest.json")
+    manifest.save(manifest_path)
+
+    loaded = FileManifest.load(manifest_path)
+    assert loaded is not None
+    assert loaded.settings == {"chunk_size": 350}
+    assert loaded.entries == manifest.entries
+    assert FileManifest.load(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from adalflow.core.types import Document
+
+from bioguider.rag.config import configs
+from bioguider.rag.data_pipeline import DatabaseManager
+from bioguider.rag.index_registry import IndexRegistry, LoadedCorpus
+
+def _corpus(memory_bytes: int) -> LoadedCorpus:
+    return LoadedCorpus(documents=[Document(text="chunk")], memory_bytes=memory_bytes)
+
+def test_least_recently_used_corpora_are_evicted_over_budget():
+    registry = IndexRegistry(max_memory_bytes=250)
+    registry.get_or_load("a", lambda: _corpus(100))
+    registry.get_or_load("b", lambda: _corpus(100))
+    registry.get_or_load("a", lambda: _corpus(100))
+    registry.get_or_load("c", lambda: _corpus(100))
+    assert registry.peek("b") is None
+    assert registry.peek("a") is not None and registry.peek("c") is not None
+    stats = registry.stats()
+    assert stats["entries"] == 2
+    assert stats["resident_bytes"] == 200
+    assert (stats["hits"], stats["misses"], stats["loads"], stats["evictions"]) == (1, 3, 3, 1)
+    assert stats["hit_rate"] == 0.25
+
+def test_corpus_over_budget_stays_loaded_alone():
+    registry = IndexRegistry(max_memory_bytes=100)
+    registry.get_or_load("a", lambda: _corpus(50))
+    corpus = registry.get_or_load("b", lambda: _corpus(500))
+    assert registry.peek("a") is None
+    assert registry.peek("b") is corpus
+
+def test_concurrent_misses_load_once():
+    registry = IndexRegistry()
+    loads = []
+    lock = threading.Lock()
+
+    def _load():
+        with lock:
+            loads.append(1)
+        time.sleep(0.1)
+        return _corpus(10)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        corpora = list(executor.map(lambda _: registry.get_or_load("a", _load), range(8)))
+    assert len(loads) == 1
+    assert all(corpus is corpora[0] for corpus in corpora)
+
+def test_failed_load_is_retried():
+    registry = IndexRegistry()
+
+    def _fail():
+        raise OSError("corpus unavailable")
+
+    with pytest.raises(OSError):
+        registry.get_or_load("a", _fail)
+    assert registry._loading == {}
+    corpus = registry.get_or_load("a", lambda: _corpus(10))
+    assert registry.peek("a") is corpus
+    assert registry._loading == {}
+
+def test_rag_instances_share_and_reload_corpora(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("install the package with pip\n" * 20)
+    (repo_dir / "main.py").write_text("def add(a, b):\n    return a + b\n" * 20)
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    monkeypatch.setitem(configs["embedder"], "backend", "local")
+    monkeypatch.setitem(configs["embedding_cache"], "enabled", False)
+    registry = IndexRegistry()
+
+    rag = registry.open_repo(str(repo_dir))
+    other_rag = registry.open_repo(str(repo_dir))
+    expected = rag.query_doc("install")[0].doc_indices
+    assert other_rag.query_doc("install")[0].doc_indices == expected
+    assert other_rag.doc_retriever is rag.doc_retriever
+    assert registry.stats()["loads"] == 1
+
+    # an evicted corpus is reloaded from disk, without checking the working tree again
+    prepared = []
+    original_prepare_corpus = DatabaseManager.prepare_corpus
+    monkeypatch.setattr(
+        DatabaseManager, "prepare_corpus",
+        lambda self, kind: prepared.append(kind) or original_prepare_corpus(self, kind),
+    )
+    registry.clear()
+    assert rag.doc_retriever is None
+    assert rag.query_doc("install")[0].doc_indices == expected
+    assert prepared == []
+    assert registry.stats()["loads"] == 2
@@ -0,0 +1,58 @@
+import adalflow as adal
+import numpy as np
+import pytest
+
+import bioguider.rag.data_pipeline as data_pipeline
+from bioguider.rag.config import configs, create_model_client, create_model_kwargs
+from bioguider.rag.local_embedder import LOCAL_EMBEDDING_MODEL, HashingEmbeddingClient, hashing_embeddings
+from bioguider.rag.rag import RAG
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    texts = ["def add(a, b):\n    return a + b\n", "install the package with pip", "", "add"]
+    vectors = hashing_embeddings(texts, 256)
+    assert vectors.shape == (4, 256)
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1.0, rtol=1e-5)
+    # texts shorter than an n-gram have no feature
+    assert not vectors[2].any() and not vectors[3].any()
+    # vectors do not depend on the other texts of the batch
+    np.testing.assert_array_equal(hashing_embeddings(texts[1:2], 256)[0], vectors[1])
+    assert not np.array_equal(hashing_embeddings(texts[:1], 256, seed=1)[0], vectors[0])
+
+def test_hashing_embeddings_reflect_lexical_overlap():
+    query, related, unrelated = hashing_embeddings(
+        ["install the package with pip", "pip install the package", "def add(a, b): return a + b"], 256
+    )
+    assert query @ related > query @ unrelated
+
+def test_hashing_client_through_embedder():
+    embedder = adal.Embedder(model_client=HashingEmbeddingClient(), model_kwargs={"dimensions": 64})
+    output = embedder(input=["first text", "second text"])
+    assert output.error is None
+    assert [len(e.embedding) for e in output.data] == [64, 64]
+    assert embedder(input="first text").data[0].embedding == output.data[0].embedding
+
+def test_local_backend_is_selected_by_config(monkeypatch):
+    monkeypatch.setitem(configs["embedder"], "backend", "local")
+    assert isinstance(create_model_client(), HashingEmbeddingClient)
+    assert create_model_kwargs() == {"model": LOCAL_EMBEDDING_MODEL, "dimensions": 256}
+    monkeypatch.setitem(configs["embedder"], "backend", "unknown")
+    with pytest.raises(ValueError):
+        create_model_client()
+
+def test_rag_runs_offline_with_local_backend(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("install the package with pip\n" * 20)
+    (repo_dir / "main.py").write_text("def add(a, b):\n    return a + b\n" * 20)
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    monkeypatch.setitem(configs["embedder"], "backend", "local")
+    monkeypatch.setitem(configs["embedding_cache"], "enabled", False)
+    rag = RAG()
+    rag.initialize_repo(str(repo_dir))
+    retrieved = rag.query_doc("install the package")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "README.md"
+    store = data_pipeline.MmapVectorStore.load(
+        data_pipeline.get_store_path(rag.db_manager.repo_paths["save_doc_db_file"])
+    )
+    assert store.vectors.shape[1] == 256
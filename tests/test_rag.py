@@ -0,0 +1,161 @@
+import os
+
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import Embedding, EmbedderOutput, ModelType
+
+import bioguider.rag.data_pipeline as data_pipeline
+import bioguider.rag.rag as rag_module
+from bioguider.rag.chunk_dedup import DUPLICATE_LOCATIONS_KEY
+from bioguider.rag.config import configs
+from bioguider.rag.rag import RAG
+
+class CharCountEmbeddingClient(ModelClient):
+    """Embeds a text as the counts of its 256 byte values and records every request."""
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def convert_inputs_to_api_kwargs(self, input=None, model_kwargs={}, model_type=ModelType.UNDEFINED):
+        return {"input": input if isinstance(input, list) else [input]}
+
+    def call(self, api_kwargs={}, model_type=ModelType.UNDEFINED):
+        self.requests.append(list(api_kwargs["input"]))
+        return api_kwargs["input"]
+
+    def parse_embedding_response(self, response) -> EmbedderOutput:
+        return EmbedderOutput(data=[
+            Embedding(embedding=[float(text.count(chr(c))) + 0.1 for c in range(256)], index=i)
+            for i, text in enumerate(response)
+        ])
+
+def _make_rag(tmp_path, monkeypatch) -> RAG:
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("install the package with pip\n" * 20)
+    (repo_dir / "main.py").write_text("def add(a, b):\n    return a + b\n" * 20)
+    (repo_dir / "utils.py").write_text("def read_all_documents(path):\n    return []\n")
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    monkeypatch.setattr(rag_module, "create_model_client", CharCountEmbeddingClient)
+    monkeypatch.setattr(data_pipeline, "create_model_client", CharCountEmbeddingClient)
+    rag = RAG()
+    rag.initialize_repo(str(repo_dir))
+    return rag
+
+def test_query_doc_does_not_prepare_code_corpus(tmp_path, monkeypatch):
+    rag = _make_rag(tmp_path, monkeypatch)
+    retrieved = rag.query_doc("how to install")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "README.md"
+    assert rag.code_retriever is None
+    assert rag.db_manager.code_db is None
+    assert not os.path.exists(rag.db_manager.repo_paths["save_code_db_file"])
+    assert not os.path.exists(data_pipeline.get_store_path(rag.db_manager.repo_paths["save_code_db_file"]))
+
+    retrieved = rag.query_code("add")
+    assert retrieved[0].documents[0].meta_data["file_path"] in ("main.py", "utils.py")
+    assert rag.code_retriever is not None
+
+def test_pickle_format_keeps_compact_documents(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["database"], "format", "pickle")
+    monkeypatch.setitem(configs["retrieval"], "mode", "hybrid")
+    rag = _make_rag(tmp_path, monkeypatch)
+    retrieved = rag.query_doc("how to install")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "README.md"
+    assert isinstance(rag.transformed_doc_documents, data_pipeline.CompactDocuments)
+    assert rag.transformed_doc_documents.vectors.shape[1] == 256
+    assert os.path.exists(rag.db_manager.repo_paths["save_doc_db_file"])
+
+def test_lexical_mode_needs_no_model_client(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+    rag = _make_rag(tmp_path, monkeypatch)
+
+    def _offline(*args, **kwargs):
+        raise AssertionError("the lexical mode should not embed anything")
+    monkeypatch.setattr(rag_module, "create_model_client", _offline)
+    monkeypatch.setattr(data_pipeline, "create_model_client", _offline)
+    assert rag.embedder is None
+    retrieved = rag.query_code("read_all_documents")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "utils.py"
+    assert rag.code_retriever is None
+
+def test_hybrid_mode_fuses_rankings(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["retrieval"], "mode", "hybrid")
+    rag = _make_rag(tmp_path, monkeypatch)
+    retrieved = rag.query_code("read_all_documents")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "utils.py"
+    assert rag.code_retriever is not None
+    assert rag.code_bm25_index is not None
+
+def test_lexical_mode_reuses_up_to_date_embedded_corpus(tmp_path, monkeypatch):
+    rag = _make_rag(tmp_path, monkeypatch)
+    rag.query_doc("install")
+    store_path = data_pipeline.get_store_path(rag.db_manager.repo_paths["save_doc_db_file"])
+    fingerprint = data_pipeline.MmapVectorStore.load(store_path).fingerprint
+
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+    lexical_rag = RAG()
+    lexical_rag.initialize_repo(str(tmp_path / "repo"))
+    lexical_rag.query_doc("install")
+    assert data_pipeline.MmapVectorStore.load(store_path).fingerprint == fingerprint
+
+    (tmp_path / "repo" / "NEWS.md").write_text("new release")
+    lexical_rag = RAG()
+    lexical_rag.initialize_repo(str(tmp_path / "repo"))
+    retrieved = lexical_rag.query_doc("release")
+    assert retrieved[0].documents[0].meta_data["file_path"] == "NEWS.md"
+    assert data_pipeline.MmapVectorStore.load(store_path).vectors.shape[1] == 0
+
+def test_query_many_embeds_all_queries_in_one_request(tmp_path, monkeypatch):
+    rag = _make_rag(tmp_path, monkeypatch)
+    expected = [rag.query_code(query)[0].doc_indices for query in ["add numbers", "read documents"]]
+    requests = rag.embedder.model_client.requests
+    requests.clear()
+
+    queries = ["add", "read_all_documents", "add", "return a + b"]
+    retrieved = rag.query_code_many(queries)
+    assert requests == [["add", "read_all_documents", "return a + b"]]
+    assert [output.query for output in retrieved] == queries
+    assert retrieved[0].doc_indices == retrieved[2].doc_indices
+    assert all(len(output.documents) == len(output.doc_indices) > 0 for output in retrieved)
+
+    # cached query embeddings are reused by other RAG instances
+    requests.clear()
+    other_rag = RAG()
+    other_rag.initialize_repo(str(tmp_path / "repo"))
+    other_requests = other_rag.embedder.model_client.requests
+    retrieved = other_rag.query_code_many(["add numbers", "read documents"])
+    assert other_requests == []
+    assert [output.doc_indices for output in retrieved] == expected
+
+def test_update_interrupted_before_the_manifest_is_saved_is_reapplied(tmp_path, monkeypatch):
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+    for database_format in ("mmap", "pickle"):
+        for deduplication in (True, False):
+            monkeypatch.setitem(configs["database"], "format", database_format)
+            monkeypatch.setitem(configs["deduplication"], "enabled", deduplication)
+            (tmp_path / f"{database_format}_{deduplication}").mkdir()
+            rag = _make_rag(tmp_path / f"{database_format}_{deduplication}", monkeypatch)
+            rag.db_manager.prepare_corpus("doc")
+            (tmp_path / f"{database_format}_{deduplication}" / "repo" / "NEWS.md").write_text("new release")
+
+            # the corpus is committed, then the process dies before the manifest is saved
+            with monkeypatch.context() as m:
+                m.setattr(data_pipeline.FileManifest, "save", lambda self, path: None)
+                rag.db_manager.prepare_corpus("doc")
+            documents = rag.db_manager.prepare_corpus("doc")
+            locations = [doc.meta_data["file_path"] for doc in documents] + [
+                location["file_path"]
+                for doc in documents
+                for location in doc.meta_data.get(DUPLICATE_LOCATIONS_KEY, [])
+            ]
+            assert locations.count("NEWS.md") == 1, (database_format, deduplication)
+
+def test_top_k_over_the_corpus_size_keeps_every_hit_of_every_query(tmp_path, monkeypatch):
+    rag = _make_rag(tmp_path, monkeypatch)
+    monkeypatch.setitem(configs["retriever"], "top_k", 50)
+    num_chunks = len(rag.transformed_code_documents or rag.db_manager.load_corpus("code"))
+    retrieved = rag.query_code_many(["add", "read_all_documents"])
+    assert num_chunks < 50
+    for output in retrieved:
+        assert -1 not in output.doc_indices
+        assert len(output.doc_scores) == len(output.doc_indices) > 0
+    assert retrieved[0].documents and retrieved[1].documents
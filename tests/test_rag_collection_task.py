@@ -0,0 +1,98 @@
+import threading
+import time
+
+from adalflow.core.types import Document, RetrieverOutput
+
+import bioguider.agents.rag_collection_task as rag_collection_task
+from bioguider.agents.rag_collection_task import RAGCollectionTask, RAGCollectionTaskItem
+from bioguider.rag.config import configs
+
+class FakeAgent:
+    """Judges a document relevant if its text contains "relevant"."""
+    calls = []
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, llm):
+        pass
+
+    def go(self, system_prompt, instruction_prompt, schema):
+        with FakeAgent.lock:
+            FakeAgent.running += 1
+            FakeAgent.max_running = max(FakeAgent.max_running, FakeAgent.running)
+        time.sleep(0.05)
+        lines = [line for line in system_prompt.splitlines() if line.startswith(" - ")]
+        with FakeAgent.lock:
+            FakeAgent.running -= 1
+            FakeAgent.calls.append(lines)
+        relevance = ["irrelevant" not in line for line in lines]
+        return {"query": "query", "documents": lines, "relevance": relevance}, None, {"total_tokens": 1}, "reasoning"
+
+def _item(monkeypatch, **kwargs):
+    FakeAgent.calls, FakeAgent.running, FakeAgent.max_running = [], 0, 0
+    monkeypatch.setattr(rag_collection_task, "CommonAgentTwoSteps", FakeAgent)
+    outputs = []
+    item = RAGCollectionTaskItem(
+        llm=None, rag=None, step_callback=lambda **kwargs: outputs.append(kwargs), batch_size=2, **kwargs
+    )
+    return item, outputs
+
+def test_batches_run_concurrently_and_merge_in_order(monkeypatch):
+    item, outputs = _item(monkeypatch, max_concurrency=4)
+    docs = [Document(text=f"doc {i} {'irrelevant' if i % 3 else 'relevant'}") for i in range(8)]
+    collected = item.collect("query", docs)
+    assert [doc.text for doc in collected] == ["doc 0 relevant", "doc 3 relevant", "doc 6 relevant"]
+    assert len(FakeAgent.calls) == 4
+    assert FakeAgent.max_running > 1
+    results = [output["step_output"] for output in outputs if "RAG Collection Result" in output.get("step_output", "")]
+    assert [result.count("doc ") for result in results] == [2, 2, 2, 2]
+    assert [results[i].index(f"doc {2 * i} ") < results[i].index(f"doc {2 * i + 1} ") for i in range(4)] == [True] * 4
+
+def test_scores_decide_documents_without_llm(monkeypatch):
+    item, _ = _item(monkeypatch, accept_score=0.9, reject_score=0.2)
+    docs = [
+        Document(text="high irrelevant"),
+        Document(text="middle relevant"),
+        Document(text="low relevant"),
+        Document(text="middle irrelevant"),
+    ]
+    retrieved = RetrieverOutput(doc_indices=[0, 1, 2, 3], doc_scores=[0.95, 0.5, 0.1, 0.3], documents=docs)
+    collected = item.collect_retrieved("query", retrieved)
+    assert [doc.text for doc in collected] == ["high irrelevant", "middle relevant"]
+    assert FakeAgent.calls == [[" - middle relevant", " - middle irrelevant"]]
+
+    # every document decided by its score: no LLM call
+    item, outputs = _item(monkeypatch, accept_score=0.5, reject_score=0.5)
+    assert item.collect_retrieved("query", retrieved) == docs[:2]
+    assert FakeAgent.calls == [] and outputs == []
+
+class FakeRag:
+    def __init__(self, retrieval_mode: str, retrieved: RetrieverOutput):
+        self.retrieval_mode = retrieval_mode
+        self.retrieved = retrieved
+
+    def query_doc(self, query):
+        return [self.retrieved]
+
+def test_thresholds_of_the_retrieval_mode_are_applied(monkeypatch):
+    FakeAgent.calls = []
+    monkeypatch.setattr(rag_collection_task, "CommonAgentTwoSteps", FakeAgent)
+    monkeypatch.setitem(configs["rag_collection"], "score_thresholds", {
+        "vector": {"accept": 0.9, "reject": 0.2},
+        "hybrid": {"accept": 0.03, "reject": 0.01},
+    })
+    docs = [Document(text="top irrelevant"), Document(text="middle relevant"), Document(text="last relevant")]
+    # reciprocal rank fusion scores, all under the vector thresholds
+    retrieved = RetrieverOutput(doc_indices=[0, 1, 2], doc_scores=[0.032, 0.02, 0.005], documents=docs)
+
+    task = RAGCollectionTask(rag=FakeRag("hybrid", retrieved))
+    collected = task.collect("query", llm=None, step_callback=lambda **kwargs: None)
+    assert [doc.text for doc in collected] == ["top irrelevant", "middle relevant"]
+    assert FakeAgent.calls == [[" - middle relevant"]]
+
+    FakeAgent.calls = []
+    task = RAGCollectionTask(rag=FakeRag("lexical", retrieved))
+    collected = task.collect("query", llm=None, step_callback=lambda **kwargs: None)
+    assert [doc.text for doc in collected] == ["middle relevant", "last relevant"]
+    assert len(FakeAgent.calls) == 1
@@ -0,0 +1,113 @@
+import subprocess
+
+import pytest
+
+from bioguider.rag.config import configs
+from bioguider.rag.data_pipeline import DatabaseManager, get_manifest_path
+from bioguider.rag.file_manifest import FileManifest
+from bioguider.rag.repo_cache import load_repo_record, sync_repo
+
+def _git(*args, cwd=None) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    ).stdout.decode("utf-8").strip()
+
+@pytest.fixture
+def remote(tmp_path):
+    """A bare repository with three commits on main, and a working clone to push from."""
+    bare = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    _git("init", "-q", "--bare", "-b", "main", str(bare))
+    _git("clone", "-q", str(bare), str(work))
+    for i in range(3):
+        (work / "README.md").write_text(f"version {i}\n")
+        _git("add", "README.md", cwd=work)
+        _git("commit", "-q", "-m", f"commit {i}", cwd=work)
+    _git("push", "-q", "origin", "HEAD:main", cwd=work)
+    return bare, work
+
+def _push(work, text: str) -> str:
+    (work / "README.md").write_text(text)
+    _git("commit", "-q", "-am", text, cwd=work)
+    _git("push", "-q", "origin", "HEAD:main", cwd=work)
+    return _git("rev-parse", "HEAD", cwd=work)
+
+def test_clone_is_shallow_and_records_the_commit(remote, tmp_path):
+    bare, work = remote
+    repo_dir = tmp_path / "cache" / "repo"
+    commit = sync_repo(f"file://{bare}", str(repo_dir))
+    assert commit == _git("rev-parse", "HEAD", cwd=work)
+    assert _git("rev-parse", "--is-shallow-repository", cwd=repo_dir) == "true"
+    assert _git("rev-list", "--count", "HEAD", cwd=repo_dir) == "1"
+    assert (repo_dir / "README.md").read_text() == "version 2\n"
+    assert load_repo_record(str(repo_dir))["commit"] == commit
+    assert not list((tmp_path / "cache").glob("*.tmp.*"))
+
+def test_refresh_fetches_and_resets(remote, tmp_path, monkeypatch):
+    bare, work = remote
+    repo_dir = tmp_path / "repo"
+    sync_repo(f"file://{bare}", str(repo_dir))
+    new_commit = _push(work, "version 3\n")
+
+    # within the refresh interval the checkout is reused as is
+    assert sync_repo(f"file://{bare}", str(repo_dir)) != new_commit
+
+    monkeypatch.setitem(configs["repo_cache"], "refresh_interval", 0)
+    (repo_dir / "README.md").write_text("local change")
+    (repo_dir / "untracked.txt").write_text("stale")
+    assert sync_repo(f"file://{bare}", str(repo_dir)) == new_commit
+    assert (repo_dir / "README.md").read_text() == "version 3\n"
+    assert not (repo_dir / "untracked.txt").exists()
+
+def test_checkout_of_a_tag_or_commit(remote, tmp_path):
+    bare, work = remote
+    first_commit = _git("rev-list", "--max-parents=0", "HEAD", cwd=work)
+    _git("tag", "v0", first_commit, cwd=work)
+    _git("push", "-q", "origin", "v0", cwd=work)
+
+    assert sync_repo(f"file://{bare}", str(tmp_path / "tag"), ref="v0") == first_commit
+    assert sync_repo(f"file://{bare}", str(tmp_path / "sha"), ref=first_commit) == first_commit
+    assert (tmp_path / "sha" / "README.md").read_text() == "version 0\n"
+
+def test_failed_refresh_keeps_the_checkout(remote, tmp_path, monkeypatch):
+    bare, work = remote
+    repo_dir = tmp_path / "repo"
+    commit = sync_repo(f"file://{bare}", str(repo_dir))
+    monkeypatch.setitem(configs["repo_cache"], "refresh_interval", 0)
+    bare.rename(tmp_path / "moved.git")
+    assert sync_repo(f"file://{bare}", str(repo_dir)) == commit
+
+def test_database_manager_clones_file_urls(remote, tmp_path, monkeypatch):
+    bare, work = remote
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    manager = DatabaseManager()
+    manager.reset_database_and_create_repo(f"file://{bare}")
+    assert manager.repo_paths["commit_sha"] == _git("rev-parse", "HEAD", cwd=work)
+    assert manager.repo_dir.endswith("remote")
+    assert (tmp_path / "data").exists()
+
+def test_manifest_is_keyed_on_the_commit(remote, tmp_path, monkeypatch):
+    bare, work = remote
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+    manager = DatabaseManager()
+    manager.reset_database_and_create_repo(f"file://{bare}")
+    manager.prepare_corpus("doc")
+    manifest_path = get_manifest_path(manager.repo_paths["save_doc_db_file"])
+    assert FileManifest.load(manifest_path).commit == _git("rev-parse", "HEAD", cwd=work)
+
+    # at the same commit the cached clone is not walked again
+    with monkeypatch.context() as m:
+        m.setattr(FileManifest, "build", classmethod(lambda cls, *args, **kwargs: pytest.fail("manifest rebuilt")))
+        manager = DatabaseManager()
+        manager.reset_database_and_create_repo(f"file://{bare}")
+        assert "version 2" in manager.prepare_corpus("doc")[0].text
+
+    # a fetch + reset updates the corpus
+    new_commit = _push(work, "version 3\n")
+    monkeypatch.setitem(configs["repo_cache"], "refresh_interval", 0)
+    manager = DatabaseManager()
+    manager.reset_database_and_create_repo(f"file://{bare}")
+    assert "version 3" in manager.prepare_corpus("doc")[0].text
+    assert FileManifest.load(manifest_path).commit == new_commit
@@ -0,0 +1,114 @@
+import os
+import multiprocessing
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import bioguider.rag.data_pipeline as data_pipeline
+import bioguider.rag.repo_cache as repo_cache
+from bioguider.rag.config import configs
+from bioguider.rag.data_pipeline import DatabaseManager
+from bioguider.database.code_structure_db import CodeStructureDb
+from bioguider.utils.code_structure_builder import CodeStructureBuilder
+from bioguider.utils.python_file_handler import PythonFileHandler
+
+NUM_CALLERS = 16
+
+def _make_repo(repo_dir):
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("install the package with pip\n" * 20)
+    (repo_dir / "main.py").write_text("def main():\n    return helper()\n")
+    (repo_dir / "utils.py").write_text("class Helper:\n    def run(self):\n        pass\n")
+
+def _build_code_structure(repo_dir: str, data_folder: str):
+    db = CodeStructureDb("owner", "repo", data_folder)
+    CodeStructureBuilder(repo_dir, os.path.join(repo_dir, ".gitignore"), db).build_code_structure()
+    return db.select_by_name("run")
+
+def _build_code_structure_counted(repo_dir: str, data_folder: str, calls_path: str):
+    original = PythonFileHandler.get_functions_and_classes
+
+    def _counting(self):
+        with open(calls_path, "a") as f:
+            f.write("call\n")
+        return original(self)
+
+    PythonFileHandler.get_functions_and_classes = _counting
+    _build_code_structure(repo_dir, data_folder)
+
+def test_concurrent_code_structure_builds_run_once(tmp_path, monkeypatch):
+    _make_repo(tmp_path / "repo")
+    calls = []
+    original = PythonFileHandler.get_functions_and_classes
+
+    def _counting(self):
+        calls.append(self.file_path)
+        return original(self)
+
+    monkeypatch.setattr(PythonFileHandler, "get_functions_and_classes", _counting)
+    with ThreadPoolExecutor(max_workers=NUM_CALLERS) as executor:
+        results = list(executor.map(
+            lambda _: _build_code_structure(str(tmp_path / "repo"), str(tmp_path / "data")),
+            range(NUM_CALLERS),
+        ))
+    # one build parses each file once, every caller sees the complete database
+    assert len(calls) == 2
+    assert all(len(rows) == 1 and rows[0]["parent"] == "Helper" for rows in results)
+    assert not list((tmp_path / "data" / "databases").glob("*.tmp.*"))
+
+def test_concurrent_code_structure_builds_run_once_across_processes(tmp_path):
+    _make_repo(tmp_path / "repo")
+    calls_path = tmp_path / "calls.txt"
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(
+            target=_build_code_structure_counted,
+            args=(str(tmp_path / "repo"), str(tmp_path / "data"), str(calls_path)),
+        )
+        for _ in range(8)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    assert len(calls_path.read_text().splitlines()) == 2
+    assert len(_build_code_structure(str(tmp_path / "repo"), str(tmp_path / "data"))) == 1
+
+def test_concurrent_repo_preparation_clones_and_indexes_once(tmp_path, monkeypatch):
+    _make_repo(tmp_path / "work")
+    work = tmp_path / "work"
+    for args in (["init", "-q", "-b", "main"], ["add", "-A"], ["commit", "-q", "-m", "init"]):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=work, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+    monkeypatch.setenv("DATA_FOLDER", str(tmp_path / "data"))
+    monkeypatch.setitem(configs["retrieval"], "mode", "lexical")
+
+    clones, builds = [], []
+    original_clone = repo_cache._clone
+    original_transform = data_pipeline.transform_documents_and_save_to_store
+
+    def _counting_clone(*args, **kwargs):
+        clones.append(args)
+        return original_clone(*args, **kwargs)
+
+    def _counting_transform(*args, **kwargs):
+        builds.append(args)
+        return original_transform(*args, **kwargs)
+
+    monkeypatch.setattr(repo_cache, "_clone", _counting_clone)
+    monkeypatch.setattr(data_pipeline, "transform_documents_and_save_to_store", _counting_transform)
+
+    def _prepare(_):
+        manager = DatabaseManager()
+        manager.reset_database_and_create_repo(f"file://{work}")
+        doc_documents, _ = manager.prepare_database()
+        return len(doc_documents)
+
+    with ThreadPoolExecutor(max_workers=NUM_CALLERS) as executor:
+        results = list(executor.map(_prepare, range(NUM_CALLERS)))
+    assert len(clones) == 1
+    # one doc and one code corpus
+    assert len(builds) == 2
+    assert len(set(results)) == 1 and results[0] > 0
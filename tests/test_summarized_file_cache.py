@@ -0,0 +1,116 @@
+import os
+import sqlite3
+
+from langchain_core.messages import AIMessage
+
+import bioguider.database.summarized_file_db as summarized_file_db
+from bioguider.agents.agent_utils import summarize_file
+from bioguider.database.summarized_file_db import (
+    SummarizedFilesDb,
+    summarized_files_create_table_query,
+    summarized_files_migrations,
+)
+
+def _write(path, content: str, mtime_ns: int):
+    path.write_text(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def _no_hashing(monkeypatch):
+    def _hash_file(path):
+        raise AssertionError(f"{path} was hashed")
+    monkeypatch.setattr(summarized_file_db, "_hash_file", _hash_file)
+
+def test_summary_is_invalidated_when_the_file_changes(tmp_path, monkeypatch):
+    db = SummarizedFilesDb("foo", "bar", data_folder=str(tmp_path))
+    source = tmp_path / "main.py"
+    _write(source, "print(1)", 1_000_000_000)
+    assert db.upsert_summarized_file("main.py", None, 3, "N/A", "prints 1", source_path=str(source))
+    assert db.select_summarized_text("main.py", "", 3, source_path=str(source)) == "prints 1"
+
+    # same size, new content
+    _write(source, "print(2)", 2_000_000_000)
+    assert db.select_summarized_text("main.py", "", 3, source_path=str(source)) is None
+    assert db.upsert_summarized_file("main.py", "", 3, "N/A", "prints 2", source_path=str(source))
+    assert db.select_summarized_text("main.py", "", 3, source_path=str(source)) == "prints 2"
+
+    # reverted: the summary of the first version is found by hash, then by size and mtime
+    _write(source, "print(1)", 3_000_000_000)
+    assert db.select_summarized_text("main.py", "", 3, source_path=str(source)) == "prints 1"
+    _no_hashing(monkeypatch)
+    assert db.select_summarized_text("main.py", "", 3, source_path=str(source)) == "prints 1"
+
+def test_summary_is_keyed_by_model_and_content(tmp_path):
+    db = SummarizedFilesDb("foo", "bar", data_folder=str(tmp_path))
+    assert db.upsert_summarized_file("a.md", "", 3, "N/A", "by gpt", content="# A", model_id="gpt-4o")
+    assert db.select_summarized_text("a.md", "", 3, content="# A", model_id="gpt-4o") == "by gpt"
+    assert db.select_summarized_text("a.md", "", 3, content="# A", model_id="kimi-k2.5") is None
+    assert db.select_summarized_text("a.md", "", 3, content="# B", model_id="gpt-4o") is None
+
+def test_purge_missing_sources(tmp_path):
+    db = SummarizedFilesDb("foo", "bar", data_folder=str(tmp_path))
+    (tmp_path / "kept.py").write_text("x = 1")
+    (tmp_path / "deleted.py").write_text("y = 1")
+    for file_path in ("kept.py", "deleted.py"):
+        for level in (3, 6):
+            db.upsert_summarized_file(file_path, "", level, "N/A", "summary", source_path=str(tmp_path / file_path))
+    os.remove(tmp_path / "deleted.py")
+    connection = sqlite3.connect(db.get_db_file())
+    connection.execute("INSERT INTO SummarizedFiles(file_path, summarize_level, summarized_text) VALUES (NULL, 3, 'no file')")
+    connection.commit()
+    connection.close()
+    assert db.purge_missing_sources(str(tmp_path)) == 3
+    assert db.purge_missing_sources(str(tmp_path)) == 0
+    assert db.select_summarized_text("kept.py", "", 6, source_path=str(tmp_path / "kept.py")) == "summary"
+
+def test_existing_database_is_migrated(tmp_path):
+    db = SummarizedFilesDb("foo", "bar", data_folder=str(tmp_path))
+    os.makedirs(os.path.dirname(db.get_db_file()))
+    connection = sqlite3.connect(db.get_db_file())
+    connection.execute(summarized_files_create_table_query)
+    connection.execute(
+        "INSERT INTO SummarizedFiles(file_path, instruction, summarize_prompt, summarize_level, summarized_text) "
+        "VALUES ('gone.py', NULL, 'N/A', 3, 'old summary')"
+    )
+    connection.commit()
+    connection.close()
+
+    # summaries without a content hash only serve files that cannot be read
+    assert db.select_summarized_text("gone.py", "", 3) == "old summary"
+    (tmp_path / "gone.py").write_text("z = 1")
+    assert db.select_summarized_text("gone.py", "", 3, source_path=str(tmp_path / "gone.py")) is None
+    connection = sqlite3.connect(db.get_db_file())
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == len(summarized_files_migrations)
+    connection.close()
+
+class CountingLLM:
+    """Answers every prompt with the number of calls so far."""
+    model_name = "gpt-4o"
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, config=None):
+        self.calls += 1
+        return AIMessage(
+            content=f"summary {self.calls}",
+            usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12},
+        )
+
+def test_summarize_file_is_cached_by_prompt_and_clamped_level(tmp_path):
+    db = SummarizedFilesDb("foo", "bar", data_folder=str(tmp_path))
+    llm = CountingLLM()
+    assert summarize_file(llm, "a.md", "# A", 3, summarize_prompt="short", db=db)[0] == "summary 1"
+    assert summarize_file(llm, "a.md", "# A", 3, summarize_prompt="short", db=db)[0] == "summary 1"
+
+    # a summary made for another prompt is not served, not even for the default one
+    assert summarize_file(llm, "a.md", "# A", 3, summarize_prompt="detailed", db=db)[0] == "summary 2"
+    assert summarize_file(llm, "a.md", "# A", 3, db=db)[0] == "summary 3"
+    # nor is the summary made for the default prompt served for other prompts
+    assert summarize_file(llm, "a.md", "# A", 3, summarize_prompt="brief", db=db)[0] == "summary 4"
+
+    # levels are clamped before the lookup, as they are when the summary is saved
+    assert summarize_file(llm, "a.md", "# A", 0, db=db)[0] == "summary 5"
+    assert summarize_file(llm, "a.md", "# A", 1, db=db)[0] == "summary 5"
+    assert summarize_file(llm, "a.md", "# A", 100, db=db)[0] == "summary 6"
+    assert summarize_file(llm, "a.md", "# A", 200, db=db)[0] == "summary 6"
+    assert llm.calls == 6
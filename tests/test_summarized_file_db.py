@@ -1,36 +1,41 @@
 
 import pytest
 import unittest
-import os
+import shutil
+import tempfile
 
+from bioguider.database.connection_pool import close_connections
 from bioguider.database.summarized_file_db import SummarizedFilesDb
 
 class SummarizedFilesDbTestCase(unittest.TestCase):
     def setUp(self):
+        self.data_folder = tempfile.mkdtemp()
         self.db = SummarizedFilesDb(
             author="foo",
             repo_name="bar",
+            data_folder=self.data_folder,
         )
         res = self.db.upsert_summarized_file(
             "111/222/333",
             "",
             3,
-            "balahbalah balahbalah balahbalah",
             "N/A",
+            "balahbalah balahbalah balahbalah",
         )
     def tearDown(self):
         if self.db is None:
             return
-        db_path = self.db.get_db_file()
-        os.unlink(db_path)
+        # the pooled connection keeps the -wal and -shm files next to the database
+        close_connections(self.db.get_db_file())
+        shutil.rmtree(self.data_folder, ignore_errors=True)
 
     def test_upsert(self):
         res = self.db.upsert_summarized_file(
             "aaa/bbb/ccc",
             "",
             3,
-            "balahbalah balahbalah balahbalah",
             "N/A",
+            "balahbalah balahbalah balahbalah",
         )
         self.assertTrue(res)
 
@@ -52,8 +57,8 @@ class SummarizedFilesDbTestCase(unittest.TestCase):
             "123/456/789",
             "",
             3,
-            "balahbalah",
             "N/A",
+            "balahbalah",
             token_usage,
         )
         self.assertTrue(res)
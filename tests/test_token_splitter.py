@@ -0,0 +1,34 @@
+from adalflow.core.types import Document
+
+from bioguider.rag.token_splitter import TokenTextSplitter
+from bioguider.rag.tokenizer import count_tokens_batch, get_encoding
+
+def test_split_text_into_overlapping_token_windows():
+    text = " ".join(f"word{i} 世界" for i in range(500))
+    splitter = TokenTextSplitter(chunk_size=100, chunk_overlap=20)
+    chunks = splitter.split_text(text)
+    assert len(chunks) > 1
+    for chunk_text, num_tokens in chunks:
+        assert chunk_text in text
+        assert num_tokens <= 100
+        assert count_tokens_batch([chunk_text])[0] <= 101
+    assert text.startswith(chunks[0][0])
+    assert text.endswith(chunks[-1][0])
+    # consecutive windows overlap
+    first, second = chunks[0][0], chunks[1][0]
+    assert second[:20] in first
+
+def test_small_documents_are_kept_whole():
+    splitter = TokenTextSplitter(chunk_size=100, chunk_overlap=20)
+    assert splitter.split_text("") == []
+    assert splitter.split_text("hello world") == [("hello world", 2)]
+
+def test_split_documents():
+    encoding = get_encoding()
+    assert get_encoding() is encoding
+    doc = Document(text="token " * 1000, meta_data={"file_path": "big.md"})
+    chunks = TokenTextSplitter(chunk_size=256, chunk_overlap=32)([doc])
+    assert [chunk.order for chunk in chunks] == list(range(len(chunks)))
+    assert all(chunk.parent_doc_id == doc.id for chunk in chunks)
+    assert all(chunk.meta_data["file_path"] == "big.md" for chunk in chunks)
+    assert all(0 < chunk.estimated_num_tokens <= 256 for chunk in chunks)
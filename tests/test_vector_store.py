@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+from bioguider.rag.faiss_index import get_corpus_fingerprint
+from bioguider.rag.vector_store import (
+    CURRENT_FILE_NAME,
+    CompactDocuments,
+    MmapVectorStore,
+    MmapVectorStoreWriter,
+)
+
+def _make_documents(n: int) -> list[Document]:
+    return [
+        Document(
+            text=f"chunk {i}",
+            meta_data={"file_path": f"docs/file{i % 2}.md", "is_code": False},
+            vector=[float(i), 1.0, 0.5],
+            parent_doc_id=f"doc{i % 2}",
+            order=i,
+        )
+        for i in range(n)
+    ]
+
+def test_save_and_load(tmp_path):
+    store_path = str(tmp_path / "repo_doc.store")
+    documents = _make_documents(4)
+    MmapVectorStore.save(store_path, documents)
+
+    store = MmapVectorStore.load(store_path)
+    assert len(store) == 4
+    assert isinstance(store.vectors, np.memmap)
+    assert store.vectors.dtype == np.float32
+    assert store.vectors.shape == (4, 3)
+    doc = store[2]
+    assert doc.text == "chunk 2"
+    assert doc.id == documents[2].id
+    assert doc.meta_data == {"file_path": "docs/file0.md", "is_code": False}
+    assert doc.vector == [2.0, 1.0, 0.5]
+    assert store[-1].text == "chunk 3"
+    assert [d.order for d in store[1:3]] == [1, 2]
+    assert store.get_file_paths() == ["docs/file0.md", "docs/file1.md"] * 2
+
+def test_save_replaces_existing_store(tmp_path):
+    store_path = str(tmp_path / "repo_doc.store")
+    old_store = MmapVectorStore.save(store_path, _make_documents(4))
+    new_store = MmapVectorStore.save(store_path, _make_documents(2))
+    assert len(new_store) == 2
+    # readers of the replaced store keep a valid view
+    assert old_store[3].text == "chunk 3"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["repo_doc.store"]
+
+def test_empty_store(tmp_path):
+    store_path = str(tmp_path / "repo_code.store")
+    store = MmapVectorStore.save(store_path, [])
+    assert len(store) == 0
+    assert MmapVectorStore.exists(store_path)
+    assert list(MmapVectorStore.load(store_path)) == []
+
+def test_writer_appends_batches(tmp_path):
+    store_path = str(tmp_path / "repo_doc.store")
+    documents = _make_documents(5)
+    with MmapVectorStoreWriter(store_path) as writer:
+        writer.add(documents[:2])
+        writer.add([])
+        writer.add(documents[2:])
+        store = writer.commit()
+    assert [doc.text for doc in store] == [doc.text for doc in documents]
+    assert store.vectors.shape == (5, 3)
+    assert store.fingerprint == MmapVectorStore.save(str(tmp_path / "other.store"), documents).fingerprint
+
+def test_writer_leaves_existing_store_on_error(tmp_path):
+    store_path = str(tmp_path / "repo_doc.store")
+    MmapVectorStore.save(store_path, _make_documents(2))
+    with pytest.raises(ValueError):
+        with MmapVectorStoreWriter(store_path) as writer:
+            writer.add(_make_documents(2))
+            writer.add([Document(text="bad", vector=[1.0])])
+    assert len(MmapVectorStore.load(store_path)) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["repo_doc.store"]
+
+def test_commit_replaces_the_published_version(tmp_path):
+    store_path = str(tmp_path / "repo_doc.store")
+    MmapVectorStore.save(store_path, _make_documents(3))
+
+    with MmapVectorStoreWriter(store_path) as writer:
+        writer.add(_make_documents(2))
+        # the published version is served until the new one is committed
+        assert len(MmapVectorStore.load(store_path)) == 3
+        writer.commit()
+    assert len(MmapVectorStore.load(store_path)) == 2
+    names = sorted(os.listdir(store_path))
+    assert len(names) == 2 and names[0] == CURRENT_FILE_NAME
+
+def test_compact_documents():
+    documents = _make_documents(4)
+    documents[1].text = "chunk é 1"
+    compact = CompactDocuments.from_documents(documents)
+    assert len(compact) == 4
+    assert compact.vectors.dtype == np.float32
+    assert compact.vectors.shape == (4, 3)
+    doc = compact[1]
+    assert doc.text == "chunk é 1"
+    assert doc.id == documents[1].id
+    assert doc.meta_data == {"file_path": "docs/file1.md", "is_code": False}
+    assert doc.vector == [1.0, 1.0, 0.5]
+    assert compact.get_document(1, with_vector=False).vector == []
+    assert [d.order for d in compact[1:3]] == [1, 2]
+    assert compact.get_file_paths() == ["docs/file0.md", "docs/file1.md"] * 2
+    # indexes persisted for the documents are reused for their compact form
+    assert compact.fingerprint == get_corpus_fingerprint(documents)
+
+def test_compact_documents_without_vectors():
+    documents = [Document(text=f"chunk {i}") for i in range(3)]
+    compact = CompactDocuments.from_documents(documents)
+    assert compact.vectors.shape == (3, 0)
+    assert [doc.text for doc in compact] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert compact.fingerprint == get_corpus_fingerprint(documents)
+    with pytest.raises(ValueError):
+        CompactDocuments.from_documents(_make_documents(2) + documents)